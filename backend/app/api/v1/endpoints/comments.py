@@ -1,9 +1,13 @@
-from fastapi import APIRouter, Body
-from typing import List
+from fastapi import APIRouter, Body, Query, Request, Response
+from typing import List, Optional
 from backend.app.schemas.post import Comment
 from backend.app.db.mongodb import db
 from backend.app.db.repositories.post_repository import PostRepository
 from backend.app.services.post_service import PostService
+from backend.app.services.like_accumulator import like_accumulator
+from backend.app.db.versions import CollectionVersions
+from backend.app.core.serialization import json_response, ndjson_response, wants_ndjson
+from backend.app.core.http_cache import make_etag, conditional, COMMENTS_POLICY
 
 router = APIRouter()
 
@@ -12,16 +16,37 @@ router = APIRouter()
 async def like_post(post_id: str):
     """Like a post"""
     post_repo = PostRepository(db.get_db())
-    post_service = PostService(post_repo)
+    post_service = PostService(post_repo, like_counter=like_accumulator)
     return await post_service.like_post(post_id)
 
 
 @router.get("/posts/{post_id}/comments", response_model=List[Comment])
-async def get_comments(post_id: str):
-    """Get comments for a post"""
+async def get_comments(
+    post_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    after: Optional[str] = Query(None)
+):
+    """
+    Get comments for a post, oldest first. Pass X-Next-Cursor back as `after` for the next page.
+    Send `Accept: application/x-ndjson` to stream them all one per line.
+    """
+    stream = wants_ndjson(request)
+    response.headers["Vary"] = "Accept"
+    versions = await CollectionVersions(db.get_db()).get("comments")
+    etag = make_etag("comments", post_id, limit, after, stream, versions)
+    not_modified = conditional(request, response, etag, COMMENTS_POLICY)
+    if not_modified:
+        return not_modified
     post_repo = PostRepository(db.get_db())
     post_service = PostService(post_repo)
-    return await post_service.get_comments(post_id)
+    if stream:
+        return ndjson_response(Comment, post_service.stream_comments(post_id), response)
+    comments, cursor = await post_service.get_comments(post_id, limit, after)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return json_response(Comment, comments, response)
 
 
 @router.post("/posts/{post_id}/comments", response_model=Comment)
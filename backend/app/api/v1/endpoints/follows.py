@@ -0,0 +1,90 @@
+from fastapi import APIRouter, Body, Request, Response, Query
+from typing import List, Optional
+from backend.app.schemas.follow import Follow, FollowStatus
+from backend.app.schemas.post import Post
+from backend.app.db.mongodb import db
+from backend.app.db.versions import CollectionVersions
+from backend.app.services.timeline_service import get_timeline_service
+from backend.app.core.serialization import json_response
+from backend.app.core.http_cache import make_etag, conditional, FOLLOWS_POLICY, TIMELINE_POLICY
+from backend.app.core.config import get_settings
+
+router = APIRouter()
+settings = get_settings()
+
+
+@router.post("/users/{user_id}/follow", response_model=FollowStatus)
+async def follow_user(user_id: str, follower_id: str = Body(..., embed=True)):
+    """Follow a user"""
+    return await get_timeline_service(db.get_db()).follow(follower_id, user_id)
+
+
+@router.post("/users/{user_id}/unfollow", response_model=FollowStatus)
+async def unfollow_user(user_id: str, follower_id: str = Body(..., embed=True)):
+    """Unfollow a user"""
+    return await get_timeline_service(db.get_db()).unfollow(follower_id, user_id)
+
+
+@router.get("/users/{user_id}/followers", response_model=List[Follow])
+async def get_followers(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[str] = Query(None)
+):
+    """Get a user's followers, newest first. Pass X-Next-Cursor back as `before` for the next page."""
+    versions = await CollectionVersions(db.get_db()).get("follows")
+    not_modified = conditional(request, response, make_etag("followers", user_id, limit, before, versions), FOLLOWS_POLICY)
+    if not_modified:
+        return not_modified
+    edges, cursor = await get_timeline_service(db.get_db()).get_followers(user_id, limit, before)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return json_response(Follow, edges, response)
+
+
+@router.get("/users/{user_id}/following", response_model=List[Follow])
+async def get_following(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[str] = Query(None)
+):
+    """Get the users a user follows, newest first. Pass X-Next-Cursor back as `before` for the next page."""
+    versions = await CollectionVersions(db.get_db()).get("follows")
+    not_modified = conditional(request, response, make_etag("following", user_id, limit, before, versions), FOLLOWS_POLICY)
+    if not_modified:
+        return not_modified
+    edges, cursor = await get_timeline_service(db.get_db()).get_following(user_id, limit, before)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return json_response(Follow, edges, response)
+
+
+@router.get("/users/{user_id}/timeline", response_model=List[Post])
+async def get_home_timeline(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[str] = Query(None),
+    comments: int = Query(0, ge=0, le=10, description="Latest comments to embed under each post")
+):
+    """
+    Get a user's home timeline: their own posts and those of the accounts
+    they follow, newest first. Pass X-Next-Cursor back as `before` for the next page.
+    """
+    # Like the feed, the timeline tolerates replication lag
+    database = db.get_db(settings.feed_read_preference)
+    sources = ("timelines", "follows", "posts", "users") + (("comments",) if comments else ())
+    versions = await CollectionVersions(database).get(*sources)
+    etag = make_etag("timeline", user_id, limit, before, comments, versions)
+    not_modified = conditional(request, response, etag, TIMELINE_POLICY)
+    if not_modified:
+        return not_modified
+    posts, cursor = await get_timeline_service(database).get_home_timeline(user_id, limit, before, comments)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return json_response(Post, posts, response)
@@ -0,0 +1,15 @@
+from fastapi import APIRouter, HTTPException
+from backend.app.schemas.job import Job
+from backend.app.db.mongodb import db
+from backend.app.db.repositories.job_repository import JobRepository
+
+router = APIRouter()
+
+
+@router.get("/jobs/{job_id}", response_model=Job)
+async def get_job(job_id: str):
+    """Status of a background job"""
+    job = await JobRepository(db.get_db()).get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
@@ -1,23 +1,88 @@
-from fastapi import APIRouter, Form, File, UploadFile, Response
+from fastapi import APIRouter, Form, File, UploadFile, Request, Response, Query
 from typing import List, Optional
 from backend.app.schemas.post import Post
 from backend.app.schemas.opportunity import Opportunity
 from backend.app.db.mongodb import db
 from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.user_repository import get_user_repository
+from backend.app.db.repositories.follow_repository import FollowRepository
 from backend.app.db.repositories.training_repository import OpportunityRepository
 from backend.app.services.post_service import PostService
 from backend.app.services.training_service import OpportunityService
+from backend.app.services.timeline_service import get_timeline_service, TIMELINE_FANOUT_JOB
+from backend.app.services.job_worker import job_worker
+from backend.app.db.versions import CollectionVersions
 from backend.app.infrastructure.storage import storage
+from backend.app.core.serialization import json_response, ndjson_response, wants_ndjson
+from backend.app.core.fieldsets import parse_fields, projection_for, sparse_model
+from backend.app.core.http_cache import make_etag, conditional, FEED_POLICY, OPPORTUNITIES_POLICY
+from backend.app.core.config import get_settings
+import time
 
 router = APIRouter()
+settings = get_settings()
 
 
 @router.get("/feed", response_model=List[Post])
-async def get_feed():
-    """Get feed posts"""
-    post_repo = PostRepository(db.get_db())
-    post_service = PostService(post_repo)
-    return await post_service.get_feed()
+async def get_feed(
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[str] = Query(None),
+    fields: Optional[str] = Query(None, description="Comma-separated post fields to return"),
+    comments: int = Query(0, ge=0, le=10, description="Latest comments to embed under each post"),
+    mode: str = Query("latest", pattern="^(latest|ranked)$"),
+    user_id: Optional[str] = Query(None, description="Reader, for author affinity in ranked mode")
+):
+    """
+    Get feed posts, newest first. Pass X-Next-Cursor back as `before` for the next page.
+    `comments=N` embeds each post's N latest comments as `latest_comments`,
+    fetched for the whole page with one query.
+    `mode=ranked` orders recent posts by engagement, recency and whether
+    `user_id` follows their author instead; pages stay consistent for
+    RANK_CACHE_TTL_SECONDS.
+    With `Accept: application/x-ndjson` the whole (latest) feed after `before`
+    is streamed one post per line and `limit` does not apply.
+    """
+    selected = parse_fields(Post, fields)
+    if selected is not None and "latest_comments" not in selected:
+        comments = 0
+    stream = wants_ndjson(request) and mode == "latest"
+    response.headers["Vary"] = "Accept"
+    # The feed tolerates replication lag; versions come from the same handle as the page
+    database = db.get_db(settings.feed_read_preference)
+    # Posts embed author summaries (and comment previews), so a change to any of these changes the page
+    sources = ("posts", "users", "comments") if comments else ("posts", "users")
+    ranking = None
+    if mode == "ranked":
+        # Rankings also follow the reader's follows and age with the clock;
+        # like the cached ranking itself, the ETag holds for one cache TTL
+        sources += ("follows",)
+        ranking = (user_id, int(time.time() // settings.rank_cache_ttl_seconds))
+    versions = await CollectionVersions(database).get(*sources)
+    etag = make_etag("feed", limit, before, selected, comments, stream, ranking, versions)
+    not_modified = conditional(request, response, etag, FEED_POLICY)
+    if not_modified:
+        return not_modified
+    post_repo = PostRepository(database)
+    post_service = PostService(post_repo, get_user_repository(database), follow_repository=FollowRepository(database))
+    if selected is None:
+        model, projection, with_authors = Post, None, True
+    else:
+        # The author and comment previews are embedded, not stored on the post
+        with_authors = "author" in selected
+        stored = [name for name in selected if name not in ("author", "latest_comments")]
+        projection = projection_for(Post, stored, extra=("author_id",) if with_authors else ())
+        model = sparse_model(Post, selected)
+    if stream:
+        return ndjson_response(model, post_service.stream_feed(before, projection, with_authors, comments), response)
+    if mode == "ranked":
+        posts, cursor = await post_service.get_ranked_feed(user_id, limit, before, with_authors, comments)
+    else:
+        posts, cursor = await post_service.get_feed(limit, before, projection, with_authors, comments)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return json_response(model, posts, response)
 
 
 @router.post("/posts", response_model=Post)
@@ -27,23 +92,49 @@ async def create_post(
     type: str = Form(...),
     file: Optional[UploadFile] = File(None)
 ):
-    """Create new post"""
+    """Create new post; it reaches the author's followers' timelines through a background job"""
     post_repo = PostRepository(db.get_db())
-    post_service = PostService(post_repo)
+    post_service = PostService(post_repo, timelines=get_timeline_service(db.get_db(), jobs=job_worker))
     return await post_service.create_post(user_id, content, type, file, storage)
 
 
+async def run_timeline_fanout_job(payload):
+    """Job handler: copy a new post onto its author's followers' timelines"""
+    return await get_timeline_service(db.get_db()).fan_out_post(payload["post_id"])
+
+
+job_worker.register(TIMELINE_FANOUT_JOB, run_timeline_fanout_job)
+
+
 @router.get("/users/{user_id}/posts", response_model=List[Post])
-async def get_user_posts(user_id: str):
-    """Get posts by user"""
+async def get_user_posts(
+    user_id: str,
+    request: Request,
+    response: Response,
+    limit: int = Query(100, ge=1, le=100),
+    before: Optional[str] = Query(None)
+):
+    """Get posts by user, newest first. Pass X-Next-Cursor back as `before` for the next page."""
+    versions = await CollectionVersions(db.get_db()).get("posts", "users")
+    etag = make_etag("user_posts", user_id, limit, before, versions)
+    not_modified = conditional(request, response, etag, FEED_POLICY)
+    if not_modified:
+        return not_modified
     post_repo = PostRepository(db.get_db())
-    post_service = PostService(post_repo)
-    return await post_service.get_user_posts(user_id)
+    post_service = PostService(post_repo, get_user_repository(db.get_db()))
+    posts, cursor = await post_service.get_user_posts(user_id, limit, before)
+    if cursor:
+        response.headers["X-Next-Cursor"] = cursor
+    return json_response(Post, posts, response)
 
 
 @router.get("/opportunities", response_model=List[Opportunity])
-async def get_opportunities():
+async def get_opportunities(request: Request, response: Response):
     """Get all opportunities"""
+    versions = await CollectionVersions(db.get_db()).get("opportunities")
+    not_modified = conditional(request, response, make_etag("opportunities", versions), OPPORTUNITIES_POLICY)
+    if not_modified:
+        return not_modified
     opp_repo = OpportunityRepository(db.get_db())
     opp_service = OpportunityService(opp_repo)
-    return await opp_service.get_opportunities()
+    return json_response(Opportunity, await opp_service.get_opportunities(), response)
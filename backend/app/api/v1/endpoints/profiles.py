@@ -1,26 +1,40 @@
-from fastapi import APIRouter, File, UploadFile
-from backend.app.schemas.user import User, ProfileCreateRequest, ProfileUpdateRequest
+from fastapi import APIRouter, File, UploadFile, Request, Response, Query
+from typing import Optional
+from backend.app.schemas.user import User, ProfileCreateRequest, ProfileUpdateRequest, USER_FIELDSETS
 from backend.app.db.mongodb import db
-from backend.app.db.repositories.user_repository import UserRepository
+from backend.app.db.repositories.user_repository import get_user_repository
 from backend.app.services.user_service import UserService
 from backend.app.infrastructure.storage import storage
+from backend.app.core.serialization import document_response
+from backend.app.core.fieldsets import parse_fields, projection_for, sparse_model
+from backend.app.core.http_cache import make_etag, conditional, PROFILE_POLICY
 import traceback
 
 router = APIRouter()
 
 
 @router.get("/profiles/{user_id}", response_model=User)
-async def get_profile(user_id: str):
+async def get_profile(
+    user_id: str,
+    request: Request,
+    response: Response,
+    fields: Optional[str] = Query(None, description="Comma-separated user fields to return, or `summary`")
+):
     """Get user profile"""
-    user_repo = UserRepository(db.get_db())
+    selected = parse_fields(User, fields, USER_FIELDSETS)
+    user_repo = get_user_repository(db.get_db())
     user_service = UserService(user_repo)
-    return await user_service.get_profile(user_id)
+    profile = await user_service.get_profile(user_id, projection_for(User, selected) if selected else None)
+    not_modified = conditional(request, response, make_etag(profile), PROFILE_POLICY)
+    if not_modified or selected is None:
+        return not_modified or profile
+    return document_response(sparse_model(User, selected), profile, response)
 
 
 @router.post("/profiles", response_model=User)
 async def create_profile(profile: ProfileCreateRequest):
     """Create new profile"""
-    user_repo = UserRepository(db.get_db())
+    user_repo = get_user_repository(db.get_db())
     user_service = UserService(user_repo)
     return await user_service.create_profile(profile.model_dump())
 
@@ -28,7 +42,7 @@ async def create_profile(profile: ProfileCreateRequest):
 @router.put("/profiles/{user_id}", response_model=User)
 async def update_profile(user_id: str, profile: ProfileUpdateRequest):
     """Update profile"""
-    user_repo = UserRepository(db.get_db())
+    user_repo = get_user_repository(db.get_db())
     user_service = UserService(user_repo)
     return await user_service.update_profile(user_id, profile.model_dump(exclude_unset=True))
 
@@ -37,7 +51,7 @@ async def update_profile(user_id: str, profile: ProfileUpdateRequest):
 async def upload_profile_image(user_id: str, file: UploadFile = File(...)):
     """Upload profile image"""
     try:
-        user_repo = UserRepository(db.get_db())
+        user_repo = get_user_repository(db.get_db())
         user_service = UserService(user_repo)
         return await user_service.upload_profile_image(user_id, file, storage)
     except Exception as e:
@@ -49,7 +63,7 @@ async def upload_profile_image(user_id: str, file: UploadFile = File(...)):
 async def upload_cover_image(user_id: str, file: UploadFile = File(...)):
     """Upload cover image"""
     try:
-        user_repo = UserRepository(db.get_db())
+        user_repo = get_user_repository(db.get_db())
         user_service = UserService(user_repo)
         return await user_service.upload_cover_image(user_id, file, storage)
     except Exception as e:
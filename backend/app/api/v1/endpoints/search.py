@@ -0,0 +1,35 @@
+from fastapi import APIRouter, Request, Response, Query
+from typing import Optional
+from backend.app.schemas.search import SearchResults
+from backend.app.db.mongodb import db
+from backend.app.db.repositories.user_repository import get_user_repository
+from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.training_repository import TrainingRepository
+from backend.app.db.versions import CollectionVersions
+from backend.app.services.search_service import SearchService
+from backend.app.core.serialization import document_response
+from backend.app.core.http_cache import make_etag, conditional, SEARCH_POLICY
+
+router = APIRouter()
+
+
+@router.get("/search", response_model=SearchResults)
+async def search(
+    request: Request,
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=200),
+    types: Optional[str] = Query(None, description="Comma-separated subset of users, posts, videos"),
+    limit: int = Query(20, ge=1, le=50)
+):
+    """Full-text search over athletes, posts and training videos"""
+    selected = SearchService.parse_types(types)
+    versions = await CollectionVersions(db.get_db()).get("users", "posts", "training_videos")
+    not_modified = conditional(request, response, make_etag("search", q, selected, limit, versions), SEARCH_POLICY)
+    if not_modified:
+        return not_modified
+    search_service = SearchService(
+        get_user_repository(db.get_db()),
+        PostRepository(db.get_db()),
+        TrainingRepository(db.get_db())
+    )
+    return document_response(SearchResults, await search_service.search(q, selected, limit), response)
@@ -1,21 +1,64 @@
-from fastapi import APIRouter, Form, File, UploadFile, Response
-from typing import List, Optional
-from backend.app.schemas.training import TrainingVideo
+from fastapi import APIRouter, Form, File, UploadFile, Request, Response, Query
+from typing import List, Literal, Optional
+from backend.app.schemas.training import TrainingVideo, TrainingFacets
+from backend.app.schemas.upload import ChunkedUploadInit, ChunkedUploadStatus
 from backend.app.db.mongodb import db
 from backend.app.db.repositories.training_repository import TrainingRepository
-from backend.app.services.training_service import TrainingService
+from backend.app.services.training_service import TrainingService, VIDEO_METADATA_JOB
+from backend.app.services.job_worker import job_worker
+from backend.app.services.view_counter import view_counter
+from backend.app.services.chunked_upload_service import get_chunked_upload_service
+from backend.app.db.versions import CollectionVersions
 from backend.app.infrastructure.storage import storage
+from backend.app.core.serialization import json_response
+from backend.app.core.http_cache import make_etag, conditional, TRAINING_POLICY
+from backend.app.core.config import get_settings
 
 router = APIRouter()
+settings = get_settings()
 
 
 @router.get("/training/videos", response_model=List[TrainingVideo])
-async def get_training_videos(response: Response):
-    """Get all training videos"""
-    response.headers["Cache-Control"] = "no-cache, no-store, must-revalidate"
-    training_repo = TrainingRepository(db.get_db())
+async def get_training_videos(
+    request: Request,
+    response: Response,
+    category: Optional[str] = Query(None, description="Only videos in this category"),
+    author: Optional[str] = Query(None, description="Only videos by this author"),
+    sort: Literal["latest", "most_viewed"] = Query("latest"),
+    limit: int = Query(100, ge=1, le=100)
+):
+    """Get training videos, newest or most viewed first"""
+    database = db.get_db(settings.training_read_preference)
+    # Flushed view counts change `views` and the most_viewed order
+    versions = await CollectionVersions(database).get("training_videos", "training_views")
+    etag = make_etag("training_videos", versions, category, author, sort, limit)
+    not_modified = conditional(request, response, etag, TRAINING_POLICY)
+    if not_modified:
+        return not_modified
+    training_repo = TrainingRepository(database)
     training_service = TrainingService(training_repo)
-    return await training_service.get_training_videos()
+    videos = await training_service.get_training_videos(limit, category, author, sort)
+    return json_response(TrainingVideo, videos, response)
+
+
+@router.get("/training/videos/facets", response_model=TrainingFacets)
+async def get_training_facets(request: Request, response: Response):
+    """Number of videos in each category"""
+    database = db.get_db(settings.training_read_preference)
+    versions = await CollectionVersions(database).get("training_facets")
+    not_modified = conditional(request, response, make_etag("training_facets", versions), TRAINING_POLICY)
+    if not_modified:
+        return not_modified
+    training_service = TrainingService(TrainingRepository(database))
+    return await training_service.get_facets()
+
+
+@router.post("/training/videos/{video_id}/views", status_code=202)
+async def record_training_view(video_id: str):
+    """Count a view of a video; counts are written in batches"""
+    training_service = TrainingService(TrainingRepository(db.get_db()), view_counter=view_counter)
+    await training_service.record_view(video_id)
+    return {"video_id": video_id, "queued": True}
 
 
 @router.post("/training/videos", response_model=TrainingVideo)
@@ -25,11 +68,58 @@ async def create_training_video(
     description: str = Form(None),
     type: str = Form(...),
     video_url: str = Form(None),
+    categories: List[str] = Form([]),
     file: Optional[UploadFile] = File(None)
 ):
     """Create new training video"""
     training_repo = TrainingRepository(db.get_db())
-    training_service = TrainingService(training_repo)
+    training_service = TrainingService(training_repo, jobs=job_worker)
     return await training_service.create_training_video(
-        title, author, description, type, video_url, file, storage
+        title, author, description, type, video_url, file, storage, categories
     )
+
+
+# Resumable chunked upload: start, PUT each chunk at its offset, complete
+
+@router.post("/training/videos/uploads", response_model=ChunkedUploadStatus, status_code=201)
+async def start_training_upload(upload: ChunkedUploadInit):
+    """Start a resumable upload for a new training video"""
+    upload_service = get_chunked_upload_service(db.get_db(), jobs=job_worker)
+    return await upload_service.start(upload.model_dump(), storage)
+
+
+@router.get("/training/videos/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+async def get_training_upload(upload_id: str):
+    """Progress of an upload, including the offset to resume from"""
+    upload_service = get_chunked_upload_service(db.get_db(), jobs=job_worker)
+    return await upload_service.get_status(upload_id, storage)
+
+
+@router.put("/training/videos/uploads/{upload_id}", response_model=ChunkedUploadStatus)
+async def put_training_upload_chunk(upload_id: str, request: Request, offset: int = Query(...)):
+    """Upload the chunk starting at `offset`; it is buffered (one chunk at most) and stored as one part"""
+    upload_service = get_chunked_upload_service(db.get_db(), jobs=job_worker)
+    return await upload_service.write_chunk(upload_id, offset, request.stream(), storage)
+
+
+@router.post("/training/videos/uploads/{upload_id}/complete", response_model=TrainingVideo)
+async def complete_training_upload(upload_id: str):
+    """Assemble the chunks and create the training video"""
+    upload_service = get_chunked_upload_service(db.get_db(), jobs=job_worker)
+    return await upload_service.complete(upload_id, storage)
+
+
+@router.delete("/training/videos/uploads/{upload_id}", status_code=204)
+async def abort_training_upload(upload_id: str):
+    """Abandon an upload and discard its chunks"""
+    upload_service = get_chunked_upload_service(db.get_db(), jobs=job_worker)
+    await upload_service.abort(upload_id, storage)
+
+
+async def run_video_metadata_job(payload):
+    """Job handler: fill in an uploaded video's duration and resolution"""
+    training_service = TrainingService(TrainingRepository(db.get_db()))
+    return await training_service.extract_metadata(payload["video_id"], payload["key"], storage)
+
+
+job_worker.register(VIDEO_METADATA_JOB, run_video_metadata_job)
@@ -0,0 +1,103 @@
+from fastapi import APIRouter, HTTPException, Request, Form, File, UploadFile
+from starlette.concurrency import run_in_threadpool
+from backend.app.schemas.upload import (
+    PresignRequest, PresignResponse, UploadCompleteRequest, UploadCompleteResponse
+)
+from backend.app.db.mongodb import db
+from backend.app.db.repositories.user_repository import get_user_repository
+from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.training_repository import TrainingRepository
+from backend.app.services.upload_service import UploadService
+from backend.app.services.job_worker import job_worker
+from backend.app.infrastructure.storage import storage, LocalStorage
+from backend.app.core.config import get_settings
+import os
+
+router = APIRouter()
+settings = get_settings()
+
+
+def get_upload_service() -> UploadService:
+    database = db.get_db()
+    return UploadService(
+        get_user_repository(database), PostRepository(database), TrainingRepository(database), jobs=job_worker
+    )
+
+
+@router.post("/uploads/presign", response_model=PresignResponse, response_model_exclude_none=True)
+async def presign_upload(request: PresignRequest):
+    """Get a presigned URL to upload media directly to storage"""
+    upload_service = get_upload_service()
+    return await upload_service.presign(
+        request.target, request.owner_id, request.filename, request.content_type, request.method, storage
+    )
+
+
+@router.post("/uploads/complete", response_model=UploadCompleteResponse)
+async def complete_upload(request: UploadCompleteRequest):
+    """Record a finished direct upload on its user, post or training video"""
+    upload_service = get_upload_service()
+    return await upload_service.complete(request.target, request.owner_id, request.key, storage)
+
+
+# Local stand-in for S3's presigned endpoints (STORAGE_BACKEND=local only)
+
+def _local_storage() -> LocalStorage:
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Not found")
+    return storage
+
+
+@router.put("/uploads/local/{key:path}", status_code=200, include_in_schema=False)
+async def local_put_upload(key: str, expires: int, signature: str, request: Request):
+    """Accept a presigned PUT, streaming the body to disk"""
+    local = _local_storage()
+    content_type = request.headers.get("content-type", "")
+    if not local.verify(key, content_type, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+    path = local.path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    size = 0
+    with open(path, "wb") as out:
+        async for chunk in request.stream():
+            size += len(chunk)
+            if size > settings.max_upload_bytes:
+                out.close()
+                os.remove(path)
+                raise HTTPException(status_code=413, detail="Upload too large")
+            await run_in_threadpool(out.write, chunk)
+    return {}
+
+
+@router.post("/uploads/local", status_code=204, include_in_schema=False)
+async def local_post_upload(
+    key: str = Form(...),
+    content_type: str = Form(..., alias="Content-Type"),
+    expires: int = Form(...),
+    signature: str = Form(...),
+    file: UploadFile = File(...)
+):
+    """Accept a presigned POST form upload"""
+    local = _local_storage()
+    if not local.verify(key, content_type, expires, signature):
+        raise HTTPException(status_code=403, detail="Invalid or expired signature")
+    path = local.path_for(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def save() -> bool:
+        """Copy the spooled file to disk; False if it runs over the size limit"""
+        size = 0
+        with open(path, "wb") as out:
+            while True:
+                chunk = file.file.read(1024 * 1024)
+                if not chunk:
+                    return True
+                size += len(chunk)
+                if size > settings.max_upload_bytes:
+                    break
+                out.write(chunk)
+        os.remove(path)
+        return False
+
+    if not await run_in_threadpool(save):
+        raise HTTPException(status_code=413, detail="Upload too large")
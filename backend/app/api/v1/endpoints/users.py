@@ -1,24 +1,58 @@
-from fastapi import APIRouter
-from typing import List
-from backend.app.schemas.user import User
+from fastapi import APIRouter, Request, Response, Query
+from typing import List, Optional
+from backend.app.schemas.user import User, UserSuggestion, USER_FIELDSETS
 from backend.app.db.mongodb import db
-from backend.app.db.repositories.user_repository import UserRepository
+from backend.app.db.repositories.user_repository import get_user_repository
+from backend.app.db.versions import CollectionVersions
 from backend.app.services.user_service import UserService
+from backend.app.core.serialization import json_response, document_response, ndjson_response, wants_ndjson
+from backend.app.core.fieldsets import parse_fields, projection_for, sparse_model
+from backend.app.core.http_cache import make_etag, conditional, USERS_POLICY, PROFILE_POLICY
 
 router = APIRouter()
 
+FIELDS_QUERY = Query(None, description="Comma-separated user fields to return, or `summary`")
+
 
 @router.get("/users", response_model=List[User])
-async def get_users():
-    """Get all users"""
-    user_repo = UserRepository(db.get_db())
+async def get_users(request: Request, response: Response, fields: Optional[str] = FIELDS_QUERY):
+    """Get all users. Send `Accept: application/x-ndjson` to stream them one per line."""
+    selected = parse_fields(User, fields, USER_FIELDSETS)
+    stream = wants_ndjson(request)
+    response.headers["Vary"] = "Accept"
+    versions = await CollectionVersions(db.get_db()).get("users")
+    not_modified = conditional(request, response, make_etag("users", selected, stream, versions), USERS_POLICY)
+    if not_modified:
+        return not_modified
+    user_repo = get_user_repository(db.get_db())
+    user_service = UserService(user_repo)
+    model = User if selected is None else sparse_model(User, selected)
+    projection = None if selected is None else projection_for(User, selected)
+    if stream:
+        return ndjson_response(model, user_service.stream_users(projection), response)
+    return json_response(model, await user_service.get_users(projection), response)
+
+
+@router.get("/users/suggest", response_model=List[UserSuggestion])
+async def suggest_users(
+    response: Response,
+    q: str = Query(..., min_length=1, max_length=100),
+    limit: int = Query(10, ge=1, le=10)
+):
+    """Typeahead suggestions for athlete names and academies"""
+    user_repo = get_user_repository(db.get_db())
     user_service = UserService(user_repo)
-    return await user_service.get_users()
+    return json_response(UserSuggestion, await user_service.suggest_users(q, limit), response)
 
 
 @router.get("/users/{user_id}", response_model=User)
-async def get_user(user_id: str):
+async def get_user(user_id: str, request: Request, response: Response, fields: Optional[str] = FIELDS_QUERY):
     """Get user by ID"""
-    user_repo = UserRepository(db.get_db())
+    selected = parse_fields(User, fields, USER_FIELDSETS)
+    user_repo = get_user_repository(db.get_db())
     user_service = UserService(user_repo)
-    return await user_service.get_user(user_id)
+    user = await user_service.get_user(user_id, projection_for(User, selected) if selected else None)
+    not_modified = conditional(request, response, make_etag(user), PROFILE_POLICY)
+    if not_modified or selected is None:
+        return not_modified or user
+    return document_response(sparse_model(User, selected), user, response)
@@ -1,5 +1,5 @@
 from fastapi import APIRouter
-from backend.app.api.v1.endpoints import users, profiles, posts, comments, training
+from backend.app.api.v1.endpoints import users, profiles, posts, comments, training, uploads, search, follows, jobs
 
 api_router = APIRouter()
 
@@ -9,3 +9,7 @@ api_router.include_router(profiles.router, tags=["profiles"])
 api_router.include_router(posts.router, tags=["posts"])
 api_router.include_router(comments.router, tags=["comments"])
 api_router.include_router(training.router, tags=["training"])
+api_router.include_router(uploads.router, tags=["uploads"])
+api_router.include_router(search.router, tags=["search"])
+api_router.include_router(follows.router, tags=["follows"])
+api_router.include_router(jobs.router, tags=["jobs"])
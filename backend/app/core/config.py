@@ -1,24 +1,135 @@
 from pydantic_settings import BaseSettings, SettingsConfigDict
 from pydantic import (
-    Field
+    Field,
+    model_validator
 )
 from functools import lru_cache
-from typing import Optional
+from typing import Literal, Optional
 from dotenv import load_dotenv
 import os
 import urllib
 
 load_dotenv()
 
+# MongoDB read preference mode names
+ReadPreference = Literal["primary", "primaryPreferred", "secondary", "secondaryPreferred", "nearest"]
+
 class Settings(BaseSettings):
     mongodb_url: str = Field(default="")
     db_name: str = Field(default="podium_db")
 
+    # Connection pool and timeouts (passed to the driver as maxPoolSize etc.)
+    mongodb_max_pool_size: int = Field(default=100)
+    mongodb_min_pool_size: int = Field(default=0)
+    mongodb_max_idle_time_ms: int = Field(default=300000)
+    mongodb_wait_queue_timeout_ms: int = Field(default=5000)
+    mongodb_server_selection_timeout_ms: int = Field(default=5000)
+    mongodb_connect_timeout_ms: int = Field(default=5000)
+    mongodb_socket_timeout_ms: int = Field(default=30000)
+
+    # Read preference for read-mostly, staleness-tolerant endpoints
+    # (primary, primaryPreferred, secondary, secondaryPreferred, nearest)
+    feed_read_preference: ReadPreference = Field(default="primary")
+    training_read_preference: ReadPreference = Field(default="primary")
+
     aws_access_key_id: str = Field(default=os.getenv("AWS_ACCESS_KEY_ID", None))
     aws_secret_access_key: str = Field(default=os.getenv("AWS_SECRET_ACCESS_KEY", None))
     aws_region: str = Field(default=os.getenv("AWS_REGION", None))
     s3_bucket_name: str = Field(default=os.getenv("S3_BUCKET_NAME", None))
 
+    # Media storage: "s3", or "local" to write under local_storage_path
+    storage_backend: str = Field(default="s3")
+    local_storage_path: str = Field(default="media")
+    local_storage_url: str = Field(default="http://localhost:8000/media")
+    local_storage_latency_ms: int = Field(default=0)
+    # Uploads running at once, and how many more may wait before returning 503
+    upload_concurrency: int = Field(default=4)
+    upload_queue_limit: int = Field(default=16)
+    # Direct-to-storage uploads
+    presigned_url_expiry_seconds: int = Field(default=900)
+    max_upload_bytes: int = Field(default=500 * 1024 * 1024)
+    local_upload_url: str = Field(default="http://localhost:8000/uploads/local")
+    # Shared by every API process, so any of them can verify a signed URL;
+    # required with STORAGE_BACKEND=local
+    upload_signing_secret: str = Field(default="")
+    # Resumable training video uploads: bytes per chunk (S3 parts other than the last must be >= 5 MiB),
+    # and how long an unfinished upload can be resumed
+    chunked_upload_chunk_bytes: int = Field(default=8 * 1024 * 1024, ge=5 * 1024 * 1024)
+    chunked_upload_expiry_hours: int = Field(default=24)
+    # How often expired uploads are swept, aborting their stored parts
+    chunked_upload_sweep_seconds: int = Field(default=600)
+
+    # Image variants: worker processes that render them, and encoder quality
+    image_workers: int = Field(default=2)
+    image_quality: int = Field(default=82)
+    # Largest directly uploaded image fetched back from storage to render variants
+    max_image_bytes: int = Field(default=20 * 1024 * 1024)
+
+    # Per-process cache of post author summaries
+    author_cache_size: int = Field(default=10000)
+    author_cache_ttl_seconds: int = Field(default=60)
+
+    # Read-through cache of user documents for profile and user reads
+    user_cache_enabled: bool = Field(default=True)
+    user_cache_size: int = Field(default=10000)
+    user_cache_ttl_seconds: int = Field(default=30)
+
+    # Typeahead index of user names and academies; rebuilt from the
+    # database this often to pick up writes made by other instances
+    suggest_rebuild_seconds: int = Field(default=300)
+
+    # Home timelines: accounts with this many followers (or flagged
+    # `celebrity`) are pulled at read time instead of fanned out on write;
+    # a new follow copies this many recent posts onto the follower's timeline
+    celebrity_follower_threshold: int = Field(default=10000)
+    timeline_backfill_posts: int = Field(default=20)
+
+    # Ranked feed (/feed?mode=ranked): how many recent posts are scored,
+    # the score weights, and how long a reader's ranking is reused
+    rank_candidates: int = Field(default=1000)
+    rank_likes_weight: float = Field(default=1.0)
+    rank_comments_weight: float = Field(default=2.0)
+    rank_affinity_weight: float = Field(default=3.0)
+    rank_half_life_hours: float = Field(default=24.0)
+    rank_cache_size: int = Field(default=10000)
+    rank_cache_ttl_seconds: int = Field(default=60)
+
+    # Likes are buffered in memory and written in batches this often;
+    # cached counts older than the staleness bound are re-read
+    like_flush_interval_ms: int = Field(default=250)
+    like_max_staleness_ms: int = Field(default=5000)
+    # Training video views are buffered the same way and flushed this often
+    view_flush_interval_ms: int = Field(default=1000)
+    # Ids of videos known to exist, so counting a view rarely needs a read
+    view_known_cache_size: int = Field(default=10000)
+    view_known_cache_ttl_seconds: int = Field(default=300)
+
+    # Background jobs (video metadata extraction, timeline fan-out): worker tasks, queue bound,
+    # attempts per job with exponential backoff, per-attempt timeout, and
+    # how often due jobs are swept from the database into the queue
+    job_workers: int = Field(default=2)
+    job_queue_limit: int = Field(default=100)
+    job_max_attempts: int = Field(default=3)
+    job_retry_backoff_seconds: float = Field(default=5)
+    job_timeout_seconds: float = Field(default=60)
+    job_sweep_seconds: float = Field(default=2)
+
+    # List endpoint serialization: "validated" or "trusted" (skips validation)
+    serialization_mode: str = Field(default="validated")
+
+    # In-memory mode only: directory of <collection>.ndjson fixtures
+    # loaded at startup (see backend/app/db/bulk_data.py)
+    fixtures_path: str = Field(default="")
+
+    # Development: explain repository reads and report collection scans
+    index_advisor: bool = Field(default=False)
+
+    @model_validator(mode="after")
+    def check_local_storage(self):
+        if self.storage_backend == "local" and not self.upload_signing_secret:
+            raise ValueError("UPLOAD_SIGNING_SECRET must be set when STORAGE_BACKEND=local")
+        return self
+
     model_config = SettingsConfigDict(
         extra = "allow",
         env_file = ".env",
@@ -0,0 +1,61 @@
+"""
+Sparse fieldsets: `?fields=name,profile_image` on read endpoints.
+
+The requested fields become both a Mongo projection, so unused fields are
+never transferred or decoded, and a response model holding only those
+fields, so they are not padded back out with defaults on the way out.
+"""
+from fastapi import HTTPException
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple, Type
+from pydantic import BaseModel, create_model
+
+
+def parse_fields(
+    model: Type[BaseModel],
+    raw: Optional[str],
+    presets: Optional[Dict[str, Type[BaseModel]]] = None
+) -> Optional[Tuple[str, ...]]:
+    """
+    Validate a comma-separated field list against a model. Tokens may also
+    name a preset schema, which expands to its fields. Returns the model
+    field names in declaration order (always including id), or None when
+    no fieldset was requested.
+    """
+    if not raw:
+        return None
+    by_key = {}
+    for name, field in model.model_fields.items():
+        by_key[name] = name
+        if field.alias:
+            by_key[field.alias] = name
+    selected = {"id"} if "id" in model.model_fields else set()
+    for token in (token.strip() for token in raw.split(",")):
+        if not token:
+            continue
+        if presets and token in presets:
+            selected.update(name for name in presets[token].model_fields if name in model.model_fields)
+        elif token in by_key:
+            selected.add(by_key[token])
+        else:
+            allowed = ", ".join(list(presets or []) + [name for name in model.model_fields])
+            raise HTTPException(status_code=400, detail=f"Unknown field '{token}'. Allowed: {allowed}")
+    return tuple(name for name in model.model_fields if name in selected)
+
+
+def projection_for(model: Type[BaseModel], fields: Iterable[str], extra: Iterable[str] = ()) -> Dict[str, int]:
+    """Mongo projection for model fields (by stored key) plus any extra stored keys"""
+    projection = {}
+    for name in fields:
+        field = model.model_fields[name]
+        projection[field.alias or name] = 1
+    for key in extra:
+        projection[key] = 1
+    return projection
+
+
+@lru_cache(maxsize=256)
+def sparse_model(model: Type[BaseModel], fields: Tuple[str, ...]) -> Type[BaseModel]:
+    """A model with only the given fields of `model`, keeping their types, aliases and defaults"""
+    definitions = {name: (model.model_fields[name].annotation, model.model_fields[name]) for name in fields}
+    return create_model(f"{model.__name__}Fields", **definitions)
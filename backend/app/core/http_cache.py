@@ -0,0 +1,50 @@
+"""
+Conditional GET support: strong ETags, If-None-Match and per-route
+Cache-Control policies.
+"""
+from fastapi import Request, Response
+from typing import Any, Optional
+import hashlib
+import json
+
+# Per-route Cache-Control policies. "no-cache" lets clients store the
+# response but makes them revalidate it, which a matching ETag answers
+# with an empty 304.
+FEED_POLICY = "private, no-cache"
+TIMELINE_POLICY = "private, no-cache"
+FOLLOWS_POLICY = "private, no-cache"
+PROFILE_POLICY = "private, max-age=30, must-revalidate"
+USERS_POLICY = "private, no-cache"
+COMMENTS_POLICY = "private, no-cache"
+TRAINING_POLICY = "public, no-cache"
+OPPORTUNITIES_POLICY = "public, max-age=300, must-revalidate"
+SEARCH_POLICY = "private, no-cache"
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over the inputs that determine a response body"""
+    raw = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return '"' + hashlib.sha256(raw.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison, as RFC 9110 requires)"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    candidates = [tag.strip() for tag in header.split(",")]
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def conditional(request: Request, response: Response, etag: str, policy: str) -> Optional[Response]:
+    """
+    Attach validators to the response. Returns a 304 response to send
+    instead of the body when the client's copy is still current.
+    """
+    headers = {"ETag": etag, "Cache-Control": policy}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
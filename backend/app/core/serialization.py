@@ -0,0 +1,168 @@
+"""
+Fast-path JSON serialization for list endpoints.
+
+FastAPI's response_model handling validates every document into a model,
+dumps it back to Python objects and runs json.dumps over the result.
+json_response() instead produces the body in one of two ways:
+
+- "validated" (default): a TypeAdapter compiled once per response type
+  validates the documents and writes JSON bytes directly in pydantic-core.
+- "trusted": documents from our own repositories are projected onto the
+  schema's fields in model order, with defaults filled in, and encoded by
+  orjson without validation. This is several times faster but does not
+  coerce values, so it relies on the stored documents already matching
+  the schema.
+
+Both produce the same bytes as the response_model path for well-formed
+documents.
+
+ndjson_response() is the opt-in streaming counterpart (Accept:
+application/x-ndjson): it serializes one document per line as a cursor
+yields them, so memory stays flat and the first byte goes out as soon as
+the first rows are read, however large the result.
+"""
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from functools import lru_cache
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Dict, List, Type
+from pydantic import BaseModel, TypeAdapter
+from backend.app.core.config import get_settings
+import typing
+import orjson
+
+settings = get_settings()
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+# Rows per chunk written to the socket while streaming
+STREAM_CHUNK_ROWS = 200
+
+
+class ORJSONResponse(Response):
+    """JSON response rendered with orjson"""
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return orjson.dumps(content, default=str)
+
+
+@lru_cache(maxsize=None)
+def item_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Compiled validator/serializer for a single model"""
+    return TypeAdapter(model)
+
+
+@lru_cache(maxsize=None)
+def list_adapter(model: Type[BaseModel]) -> TypeAdapter:
+    """Compiled validator/serializer for List[model]"""
+    return TypeAdapter(List[model])
+
+
+def _nested_model(annotation: Any):
+    """The model inside Optional[Model] / List[Model] annotations, if any"""
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in typing.get_args(annotation):
+        model = _nested_model(arg)
+        if model is not None:
+            return model
+    return None
+
+
+@lru_cache(maxsize=None)
+def projector(model: Type[BaseModel]) -> Callable[[Dict[str, Any]], Dict[str, Any]]:
+    """Compile a function mapping a stored document onto the model's serialized shape"""
+    fields = []
+    for name, field in model.model_fields.items():
+        key = field.alias or name
+        nested = _nested_model(field.annotation)
+        required = field.is_required()
+        default_factory = field.default_factory
+        default = None if required or default_factory else field.default
+        fields.append((key, nested and projector(nested), default_factory, default))
+
+    def project(document: Dict[str, Any]) -> Dict[str, Any]:
+        out = {}
+        for key, nested, default_factory, default in fields:
+            if key in document:
+                value = document[key]
+            else:
+                value = default_factory() if default_factory else default
+            if nested is not None and value is not None:
+                value = [nested(item) for item in value] if isinstance(value, list) else nested(value)
+            out[key] = value
+        return out
+
+    return project
+
+
+def dump_list(model: Type[BaseModel], documents: List[Dict[str, Any]]) -> bytes:
+    """Serialize documents as a JSON array of model"""
+    if settings.serialization_mode == "trusted":
+        project = projector(model)
+        return orjson.dumps([project(document) for document in documents], default=str)
+    adapter = list_adapter(model)
+    return adapter.dump_json(adapter.validate_python(documents), by_alias=True)
+
+
+def dump_one(model: Type[BaseModel], document: Dict[str, Any]) -> bytes:
+    """Serialize one document as model"""
+    if settings.serialization_mode == "trusted":
+        return orjson.dumps(projector(model)(document), default=str)
+    return model.model_validate(document).model_dump_json(by_alias=True).encode()
+
+
+def row_serializer(model: Type[BaseModel]) -> Callable[[Dict[str, Any]], bytes]:
+    """Per-document serializer honouring SERIALIZATION_MODE"""
+    if settings.serialization_mode == "trusted":
+        project = projector(model)
+        return lambda document: orjson.dumps(project(document), default=str)
+    adapter = item_adapter(model)
+    return lambda document: adapter.dump_json(adapter.validate_python(document), by_alias=True)
+
+
+async def ndjson_rows(model: Type[BaseModel], documents: AsyncIterable[Dict[str, Any]]) -> AsyncIterator[bytes]:
+    """Serialize documents as NDJSON, a chunk of rows at a time"""
+    serialize = row_serializer(model)
+    rows = []
+    async for document in documents:
+        rows.append(serialize(document))
+        if len(rows) >= STREAM_CHUNK_ROWS:
+            yield b"\n".join(rows) + b"\n"
+            rows = []
+    if rows:
+        yield b"\n".join(rows) + b"\n"
+
+
+def wants_ndjson(request: Request) -> bool:
+    """Whether the client asked for a streamed NDJSON body"""
+    return NDJSON_MEDIA_TYPE in request.headers.get("accept", "")
+
+
+def _with_headers(result: Response, response: Response) -> Response:
+    result.headers.raw.extend(
+        (name, value) for name, value in response.headers.raw if name != b"content-length"
+    )
+    return result
+
+
+def document_response(model: Type[BaseModel], document: Dict[str, Any], response: Response) -> Response:
+    """Build the final response for a single-document endpoint"""
+    return _with_headers(ORJSONResponse(content=dump_one(model, document), status_code=response.status_code or 200), response)
+
+
+def ndjson_response(model: Type[BaseModel], documents: AsyncIterable[Dict[str, Any]], response: Response) -> Response:
+    """Stream documents from a cursor as NDJSON, carrying over headers set on the injected response"""
+    result = StreamingResponse(ndjson_rows(model, documents), media_type=NDJSON_MEDIA_TYPE)
+    return _with_headers(result, response)
+
+
+def json_response(model: Type[BaseModel], documents: List[Dict[str, Any]], response: Response) -> Response:
+    """
+    Build the final response for a list endpoint. Headers already set on
+    the injected response (ETag, cursors) are carried over, since FastAPI
+    does not merge them into a returned Response.
+    """
+    return _with_headers(ORJSONResponse(content=dump_list(model, documents), status_code=response.status_code or 200), response)
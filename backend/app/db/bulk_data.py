@@ -0,0 +1,274 @@
+"""
+Streaming NDJSON import and export, per collection.
+
+    python -m backend.app.db.bulk_data export DIR [--collections users,posts]
+    python -m backend.app.db.bulk_data import DIR [--mode insert|upsert] [--drop]
+                                                  [--batch-size 5000] [--concurrency 4] [--memory]
+
+Each collection is one `<collection>.ndjson` file (`.ndjson.gz` is read and
+written compressed). Documents are streamed: import reads a batch, hands it
+to one of `concurrency` in-flight insert_many / bulk_write calls and moves
+on, so memory stays bounded by batch size times concurrency. Plain JSON is
+parsed with orjson; values that need Extended JSON (ObjectId, datetime)
+are written and read through bson.json_util.
+
+The same functions load fixtures into the in-memory database, and --memory
+runs an import against a throwaway in-memory database to time it or
+validate files without a MongoDB server.
+"""
+from typing import Any, AsyncIterator, Dict, IO, Iterable, List, Optional
+from bson import json_util
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError
+from backend.app.db.versions import CollectionVersions, VERSIONS_COLLECTION
+import argparse
+import asyncio
+import gzip
+import os
+import sys
+import time
+import orjson
+
+# Bookkeeping collections that describe a database rather than hold its data
+INTERNAL_COLLECTIONS = {VERSIONS_COLLECTION, "app_meta"}
+
+JSON_OPTIONS = json_util.RELAXED_JSON_OPTIONS
+
+
+def encode(document: Dict[str, Any]) -> bytes:
+    # orjson would write datetimes as plain strings; passing them through
+    # raises TypeError so they take the Extended JSON ($date) path
+    try:
+        return orjson.dumps(document, option=orjson.OPT_PASSTHROUGH_DATETIME)
+    except TypeError:
+        return json_util.dumps(document, json_options=JSON_OPTIONS).encode()
+
+
+def decode(line: bytes) -> Dict[str, Any]:
+    # Extended JSON always has "$"-prefixed keys; anything else is plain JSON
+    if b'"$' in line:
+        return json_util.loads(line, json_options=JSON_OPTIONS)
+    return orjson.loads(line)
+
+
+def open_file(path: str, mode: str) -> IO[bytes]:
+    return gzip.open(path, mode) if path.endswith(".gz") else open(path, mode)
+
+
+def collection_files(directory: str) -> Dict[str, str]:
+    """collection name -> NDJSON file in a directory"""
+    files = {}
+    for name in sorted(os.listdir(directory)):
+        for suffix in (".ndjson.gz", ".ndjson"):
+            if name.endswith(suffix):
+                files[name[:-len(suffix)]] = os.path.join(directory, name)
+    return files
+
+
+class Progress:
+    """Periodic progress and throughput lines on stderr"""
+
+    def __init__(self, label: str, interval: float = 1.0, quiet: bool = False):
+        self.label = label
+        self.interval = interval
+        self.quiet = quiet
+        self.count = 0
+        self.started = self.reported = time.perf_counter()
+
+    def add(self, count: int) -> None:
+        self.count += count
+        now = time.perf_counter()
+        if not self.quiet and now - self.reported >= self.interval:
+            self.reported = now
+            print(f"  {self.label}: {self.count:,} docs ({self.rate():,.0f} docs/s)", file=sys.stderr)
+
+    def rate(self) -> float:
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed else 0.0
+
+    def summary(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started
+        return {"collection": self.label, "documents": self.count,
+                "seconds": round(elapsed, 3), "docs_per_second": round(self.rate())}
+
+
+async def read_batches(path: str, batch_size: int) -> AsyncIterator[List[Dict[str, Any]]]:
+    """Yield lists of decoded documents; file reads and parsing stay in this thread between batches"""
+    batch = []
+    with open_file(path, "rb") as source:
+        for line in source:
+            if line.strip():
+                batch.append(decode(line))
+            if len(batch) >= batch_size:
+                yield batch
+                batch = []
+                # Let in-flight writes make progress
+                await asyncio.sleep(0)
+    if batch:
+        yield batch
+
+
+async def write_batch(collection, batch: List[Dict[str, Any]], mode: str) -> int:
+    """Write one batch; duplicates are counted as skipped in insert mode"""
+    if mode == "upsert":
+        await collection.bulk_write([ReplaceOne({"_id": doc["_id"]}, doc, upsert=True) for doc in batch], ordered=False)
+        return len(batch)
+    try:
+        await collection.insert_many(batch, ordered=False)
+        return len(batch)
+    except BulkWriteError as e:
+        duplicates = [error for error in e.details.get("writeErrors", []) if error.get("code") == 11000]
+        if len(duplicates) != len(e.details.get("writeErrors", [])):
+            raise
+        return len(batch) - len(duplicates)
+
+
+async def import_collection(
+    database,
+    name: str,
+    path: str,
+    batch_size: int = 5000,
+    concurrency: int = 4,
+    mode: str = "insert",
+    drop: bool = False,
+    quiet: bool = False
+) -> Dict[str, Any]:
+    """Stream an NDJSON file into a collection with at most `concurrency` batches in flight"""
+    collection = database[name]
+    if drop:
+        await collection.delete_many({})
+    progress = Progress(name, quiet=quiet)
+    in_flight = set()
+    written = 0
+
+    async def write(batch):
+        nonlocal written
+        written += await write_batch(collection, batch, mode)
+
+    async for batch in read_batches(path, batch_size):
+        if len(in_flight) >= concurrency:
+            done, in_flight = await asyncio.wait(in_flight, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        in_flight.add(asyncio.ensure_future(write(batch)))
+        progress.add(len(batch))
+    if in_flight:
+        await asyncio.gather(*in_flight)
+    # Cached ETags for this collection must not survive the import
+    await CollectionVersions(database).bump(name)
+    result = progress.summary()
+    result["written"] = written
+    return result
+
+
+async def export_collection(
+    database,
+    name: str,
+    path: str,
+    batch_size: int = 5000,
+    quiet: bool = False
+) -> Dict[str, Any]:
+    """Stream a collection out to an NDJSON file"""
+    progress = Progress(name, quiet=quiet)
+    cursor = database[name].find({})
+    if hasattr(cursor, "batch_size"):
+        cursor = cursor.batch_size(batch_size)
+    with open_file(path, "wb") as out:
+        lines = []
+        async for document in cursor:
+            lines.append(encode(document))
+            if len(lines) >= batch_size:
+                out.write(b"\n".join(lines) + b"\n")
+                progress.add(len(lines))
+                lines = []
+        if lines:
+            out.write(b"\n".join(lines) + b"\n")
+            progress.add(len(lines))
+    return progress.summary()
+
+
+async def import_directory(database, directory: str, collections: Optional[Iterable[str]] = None, **options) -> List[Dict[str, Any]]:
+    """Import every (or each named) collection file in a directory, one collection after another"""
+    files = collection_files(directory)
+    names = list(collections) if collections else list(files)
+    missing = [name for name in names if name not in files]
+    if missing:
+        raise FileNotFoundError(f"No NDJSON file for: {', '.join(missing)}")
+    return [await import_collection(database, name, files[name], **options) for name in names]
+
+
+async def export_directory(
+    database, directory: str, collections: Optional[Iterable[str]] = None, compress: bool = False, **options
+) -> List[Dict[str, Any]]:
+    """Export every (or each named) collection to `<directory>/<collection>.ndjson`"""
+    os.makedirs(directory, exist_ok=True)
+    if collections:
+        names = list(collections)
+    else:
+        names = sorted(set(await database.list_collection_names()) - INTERNAL_COLLECTIONS)
+    suffix = ".ndjson.gz" if compress else ".ndjson"
+    return [
+        await export_collection(database, name, os.path.join(directory, name + suffix), **options)
+        for name in names
+    ]
+
+
+def print_results(results: List[Dict[str, Any]]) -> None:
+    total = sum(result["documents"] for result in results)
+    seconds = sum(result["seconds"] for result in results)
+    for result in results:
+        print(f"✓ {result['collection']}: {result['documents']:,} docs in {result['seconds']:.2f}s "
+              f"({result['docs_per_second']:,} docs/s)")
+    if len(results) > 1:
+        print(f"✓ Total: {total:,} docs in {seconds:.2f}s ({total / seconds if seconds else 0:,.0f} docs/s)")
+
+
+async def run(args) -> None:
+    collections = [name.strip() for name in args.collections.split(",")] if args.collections else None
+    if args.memory:
+        from backend.app.db.memory_db import InMemoryDatabase
+        client, database = None, InMemoryDatabase()
+    else:
+        from motor.motor_asyncio import AsyncIOMotorClient
+        from backend.app.core.config import get_settings
+        settings = get_settings()
+        if not settings.mongodb_url:
+            sys.exit("✗ MONGODB_URL is not set; use --memory to run against an in-memory database")
+        client = AsyncIOMotorClient(settings.mongodb_url, maxPoolSize=max(args.concurrency * 2, 10))
+        database = client[settings.db_name]
+    try:
+        if args.command == "import":
+            results = await import_directory(
+                database, args.directory, collections,
+                batch_size=args.batch_size, concurrency=args.concurrency,
+                mode=args.mode, drop=args.drop, quiet=args.quiet
+            )
+        else:
+            results = await export_directory(
+                database, args.directory, collections,
+                compress=args.gzip, batch_size=args.batch_size, quiet=args.quiet
+            )
+        print_results(results)
+    finally:
+        if client is not None:
+            client.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["import", "export"])
+    parser.add_argument("directory", help="directory of <collection>.ndjson[.gz] files")
+    parser.add_argument("--collections", help="comma-separated collections (default: all)")
+    parser.add_argument("--batch-size", type=int, default=5000)
+    parser.add_argument("--concurrency", type=int, default=4, help="import batches in flight")
+    parser.add_argument("--mode", choices=["insert", "upsert"], default="insert",
+                        help="insert skips existing _ids; upsert replaces them")
+    parser.add_argument("--drop", action="store_true", help="empty each collection before importing")
+    parser.add_argument("--gzip", action="store_true", help="compress exported files")
+    parser.add_argument("--memory", action="store_true", help="use a throwaway in-memory database")
+    parser.add_argument("--quiet", action="store_true", help="no progress lines")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Development-mode index advisor.
+
+Wraps a database so that every repository read is explained once per query
+shape in the background, and any plan that falls back to a collection scan
+is reported. Enable with INDEX_ADVISOR=true; never enable in production, as
+each new query shape costs an extra explain round trip.
+"""
+from typing import Any, Dict, Optional, Set, Tuple
+import asyncio
+
+
+def query_shape(filter_dict: Optional[Dict[str, Any]]) -> Any:
+    """Replace literal values with placeholders so queries differing only in values share a shape"""
+    if isinstance(filter_dict, dict):
+        return tuple(sorted(
+            (key, query_shape(value) if isinstance(value, (dict, list)) else 1)
+            for key, value in filter_dict.items()
+        ))
+    if isinstance(filter_dict, list):
+        return tuple(query_shape(value) for value in filter_dict)
+    return 1
+
+
+def has_collscan(plan: Any) -> bool:
+    """Whether any stage of an explain() plan tree is a COLLSCAN"""
+    if isinstance(plan, dict):
+        if plan.get("stage") == "COLLSCAN":
+            return True
+        return any(has_collscan(value) for value in plan.values())
+    if isinstance(plan, list):
+        return any(has_collscan(value) for value in plan)
+    return False
+
+
+class IndexAdvisor:
+    """Database wrapper that explains each distinct read and reports collection scans"""
+
+    def __init__(self, database):
+        self.database = database
+        self.collections: Dict[str, "AdvisedCollection"] = {}
+        self.checked: Set[Tuple[Any, ...]] = set()
+        self.tasks: Set[asyncio.Task] = set()
+
+    def __getitem__(self, name):
+        if name not in self.collections:
+            self.collections[name] = AdvisedCollection(self, self.database[name], name)
+        return self.collections[name]
+
+    def __getattr__(self, name):
+        return getattr(self.database, name)
+
+    def check(self, collection, name: str, filter_dict, sort_args, sort_kwargs) -> None:
+        """Schedule an explain for this query shape unless it has been seen already"""
+        # An unfiltered, unsorted read is a scan by definition
+        if not filter_dict and not sort_args and not sort_kwargs:
+            return
+        shape = (name, query_shape(filter_dict), repr(sort_args), repr(sorted(sort_kwargs.items())))
+        if shape in self.checked:
+            return
+        self.checked.add(shape)
+        task = asyncio.ensure_future(self._explain(collection, name, filter_dict, sort_args, sort_kwargs))
+        self.tasks.add(task)
+        task.add_done_callback(self.tasks.discard)
+
+    async def _explain(self, collection, name, filter_dict, sort_args, sort_kwargs) -> None:
+        try:
+            cursor = collection.find(filter_dict)
+            if sort_args or sort_kwargs:
+                cursor = cursor.sort(*sort_args, **sort_kwargs)
+            plan = await cursor.explain()
+        except Exception as e:
+            print(f"⚠ Index advisor could not explain {name}.find({filter_dict}): {e}")
+            return
+        if has_collscan(plan.get("queryPlanner", plan)):
+            sort = f".sort{sort_args}" if sort_args else ""
+            print(f"⚠ COLLSCAN: {name}.find({filter_dict}){sort} is not covered by an index. "
+                  f"Declare one in the repository's INDEXES.")
+
+
+class AdvisedCollection:
+    """Collection proxy that reports the plans of find() and find_one()"""
+
+    def __init__(self, advisor: IndexAdvisor, collection, name: str):
+        self.advisor = advisor
+        self.collection = collection
+        self.name = name
+
+    def __getattr__(self, name):
+        return getattr(self.collection, name)
+
+    def find(self, filter_dict=None, *args, **kwargs):
+        return AdvisedCursor(self, self.collection.find(filter_dict, *args, **kwargs), filter_dict or {})
+
+    async def find_one(self, filter_dict=None, *args, **kwargs):
+        self.advisor.check(self.collection, self.name, filter_dict or {}, (), {})
+        return await self.collection.find_one(filter_dict, *args, **kwargs)
+
+
+class AdvisedCursor:
+    """Cursor proxy that reports its plan when it is first read"""
+
+    def __init__(self, collection: AdvisedCollection, cursor, filter_dict):
+        self._collection = collection
+        self._cursor = cursor
+        self._filter = filter_dict
+        self._sort_args: Tuple[Any, ...] = ()
+        self._sort_kwargs: Dict[str, Any] = {}
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+    def sort(self, *args, **kwargs):
+        self._cursor = self._cursor.sort(*args, **kwargs)
+        self._sort_args, self._sort_kwargs = args, kwargs
+        return self
+
+    def skip(self, count):
+        self._cursor = self._cursor.skip(count)
+        return self
+
+    def limit(self, count):
+        self._cursor = self._cursor.limit(count)
+        return self
+
+    def _check(self):
+        collection = self._collection
+        collection.advisor.check(collection.collection, collection.name, self._filter, self._sort_args, self._sort_kwargs)
+
+    async def to_list(self, length=None):
+        self._check()
+        return await self._cursor.to_list(length)
+
+    def __aiter__(self):
+        self._check()
+        return self._cursor.__aiter__()
@@ -0,0 +1,64 @@
+"""
+Index declarations collected from the repositories.
+
+Each repository declares the indexes its queries rely on in an INDEXES
+mapping of collection name -> list of key specs, next to the queries
+themselves, and its text index (at most one per collection) in TEXT_INDEXES
+as collection name -> field weights. ensure_indexes() applies all of them;
+create_index is idempotent, so it is safe to run on every startup.
+"""
+from typing import Dict, List, Tuple
+import hashlib
+import json
+from backend.app.db.repositories.follow_repository import FollowRepository, TimelineRepository
+from backend.app.db.repositories.job_repository import JobRepository
+from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.training_repository import TrainingRepository, OpportunityRepository
+from backend.app.db.repositories.upload_session_repository import UploadSessionRepository
+from backend.app.db.repositories.user_repository import UserRepository
+
+IndexSpec = List[Tuple[str, int]]
+
+REPOSITORIES = [
+    PostRepository, UserRepository, TrainingRepository, OpportunityRepository, FollowRepository, TimelineRepository,
+    JobRepository, UploadSessionRepository
+]
+
+
+def index_registry() -> Dict[str, List[IndexSpec]]:
+    """All declared indexes grouped by collection"""
+    registry: Dict[str, List[IndexSpec]] = {}
+    for repository in REPOSITORIES:
+        for collection, specs in getattr(repository, "INDEXES", {}).items():
+            for spec in specs:
+                if spec not in registry.setdefault(collection, []):
+                    registry[collection].append(spec)
+    return registry
+
+
+def text_index_registry() -> Dict[str, Dict[str, int]]:
+    """Declared text index weights by collection"""
+    registry: Dict[str, Dict[str, int]] = {}
+    for repository in REPOSITORIES:
+        for collection, weights in getattr(repository, "TEXT_INDEXES", {}).items():
+            registry.setdefault(collection, {}).update(weights)
+    return registry
+
+
+def index_fingerprint() -> str:
+    """Digest of every declared index, to tell whether a database has them all"""
+    raw = json.dumps([index_registry(), text_index_registry()], sort_keys=True)
+    return hashlib.sha256(raw.encode()).hexdigest()
+
+
+async def ensure_indexes(database) -> None:
+    """Create every declared index on the given database"""
+    for collection, specs in index_registry().items():
+        for spec in specs:
+            await database[collection].create_index(spec)
+    for collection, weights in text_index_registry().items():
+        await database[collection].create_index(
+            [(field, "text") for field in weights],
+            name=f"{collection}_text",
+            weights=weights
+        )
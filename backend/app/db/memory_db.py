@@ -1,68 +1,1060 @@
 """
 In-memory storage for when MongoDB is not available.
 This provides the same interface as MongoDB collections.
+
+Documents live in a dict keyed by _id, so inserts and _id lookups are O(1).
+Secondary indexes declared with create_index() are kept as sorted arrays of
+key tuples: equality on an index prefix and range bounds on the next key
+become bisect lookups, and a sort that matches the index order is served by
+walking the array and stopping at the limit instead of sorting everything.
+
+Text indexes are inverted indexes scored with BM25 and answer $text queries.
+
+aggregate() covers the pipeline stages the repositories use; a leading
+$match/$sort goes through the same index planner as find().
 """
+from bisect import bisect_left, insort
+from datetime import datetime
+from itertools import product
+from types import SimpleNamespace
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, DuplicateKeyError, OperationFailure
+import math
+import re
+
+
+# Greater than any normalized value; used as an open upper bound in bisects
+_MAX = (99,)
+
+# Marks a condition that does not pin a field to a single value
+_NO_EQ = object()
+
+_WORD = re.compile(r"[^\W_]+")
+
+# A small English stop list, in the spirit of Mongo's default text language
+_STOP_WORDS = frozenset(
+    "a an and are as at be but by for from has have in is it its of on or that the this to was were will with".split()
+)
+
+
+def _norm(value):
+    """Map a value onto a totally ordered key following Mongo's type bracketing"""
+    # Exact-type checks first: strings and numbers are nearly every key
+    kind = type(value)
+    if kind is str:
+        return (2, value)
+    if kind is int or kind is float:
+        return (1, value)
+    if value is None:
+        return (0,)
+    if isinstance(value, bool):
+        return (8, value)
+    if isinstance(value, (int, float)):
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    if isinstance(value, ObjectId):
+        return (7, value)
+    if isinstance(value, datetime):
+        return (9, value)
+    if isinstance(value, dict):
+        return (3, repr(value))
+    return (4, repr(value))
+
+
+def _compare(value, operand, op):
+    """Comparison operators only match values of the same type bracket"""
+    left, right = _norm(value), _norm(operand)
+    if left[0] != right[0]:
+        return False
+    if op == '$lt':
+        return left < right
+    if op == '$lte':
+        return left <= right
+    if op == '$gt':
+        return left > right
+    return left >= right
+
+
+def _values(item, key):
+    """Candidate values of a field for matching; arrays match on any element"""
+    value = item.get(key)
+    if isinstance(value, list):
+        return value + [value]
+    return [value]
+
+
+def _match_condition(item, key, condition):
+    if not (isinstance(condition, dict) and condition and all(k.startswith('$') for k in condition)):
+        return condition in _values(item, key)
+    for op, operand in condition.items():
+        if op == '$eq':
+            ok = operand in _values(item, key)
+        elif op == '$ne':
+            ok = operand not in _values(item, key)
+        elif op == '$in':
+            ok = any(v in operand for v in _values(item, key))
+        elif op == '$nin':
+            ok = not any(v in operand for v in _values(item, key))
+        elif op == '$exists':
+            ok = (key in item) == bool(operand)
+        elif op in ('$lt', '$lte', '$gt', '$gte'):
+            ok = any(_compare(v, operand, op) for v in _values(item, key))
+        else:
+            raise OperationFailure(f"Unsupported query operator: {op}")
+        if not ok:
+            return False
+    return True
+
+
+def _matches(item, filter_dict):
+    """Evaluate a Mongo query document against a stored document"""
+    for key, condition in (filter_dict or {}).items():
+        if key == '$text':
+            # Resolved by the text index before matching
+            continue
+        if key == '$or':
+            if not any(_matches(item, clause) for clause in condition):
+                return False
+        elif key == '$and':
+            if not all(_matches(item, clause) for clause in condition):
+                return False
+        elif not _match_condition(item, key, condition):
+            return False
+    return True
+
+
+def _equality_value(condition):
+    """The value a condition pins a field to, or _NO_EQ if it doesn't"""
+    if isinstance(condition, dict) and any(k.startswith('$') for k in condition):
+        if list(condition) == ['$eq']:
+            return condition['$eq']
+        return _NO_EQ
+    if isinstance(condition, (list, dict)):
+        return _NO_EQ
+    return condition
+
+
+def _bounds(filter_dict, field):
+    """
+    Normalized (low, low_inclusive, high, high_inclusive) range a query implies
+    for a field. None means unbounded on that side.
+    """
+    low, low_inc, high, high_inc = None, True, None, True
+
+    def narrow(b):
+        nonlocal low, low_inc, high, high_inc
+        b_low, b_low_inc, b_high, b_high_inc = b
+        if b_low is not None and (low is None or b_low > low or (b_low == low and not b_low_inc)):
+            low, low_inc = b_low, b_low_inc
+        if b_high is not None and (high is None or b_high < high or (b_high == high and not b_high_inc)):
+            high, high_inc = b_high, b_high_inc
+
+    for key, condition in (filter_dict or {}).items():
+        if key == '$and':
+            for clause in condition:
+                narrow(_bounds(clause, field))
+        elif key == '$or':
+            branches = [_bounds(clause, field) for clause in condition]
+            if not branches or any(b[0] is None for b in branches):
+                union_low, union_low_inc = None, True
+            else:
+                union_low = min(b[0] for b in branches)
+                union_low_inc = any(b[1] for b in branches if b[0] == union_low)
+            if not branches or any(b[2] is None for b in branches):
+                union_high, union_high_inc = None, True
+            else:
+                union_high = max(b[2] for b in branches)
+                union_high_inc = any(b[3] for b in branches if b[2] == union_high)
+            narrow((union_low, union_low_inc, union_high, union_high_inc))
+        elif key == field:
+            eq = _equality_value(condition)
+            if eq is not _NO_EQ:
+                narrow((_norm(eq), True, _norm(eq), True))
+                continue
+            if not isinstance(condition, dict):
+                continue
+            for op, operand in condition.items():
+                if op == '$lt':
+                    narrow((None, True, _norm(operand), False))
+                elif op == '$lte':
+                    narrow((None, True, _norm(operand), True))
+                elif op == '$gt':
+                    narrow((_norm(operand), False, None, True))
+                elif op == '$gte':
+                    narrow((_norm(operand), True, None, True))
+                elif op == '$in' and operand:
+                    norms = [_norm(v) for v in operand]
+                    narrow((min(norms), True, max(norms), True))
+    return low, low_inc, high, high_inc
+
+
+def _is_meta(value):
+    return isinstance(value, dict) and '$meta' in value
+
+
+def _project(item, projection, score=None):
+    if not projection:
+        return dict(item)
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    meta = [k for k, v in projection.items() if _is_meta(v)]
+    include = [k for k, v in projection.items() if v and k != '_id' and not _is_meta(v)]
+    if include:
+        doc = {k: item[k] for k in include if k in item}
+        if projection.get('_id', 1) and '_id' in item:
+            doc['_id'] = item['_id']
+    else:
+        doc = {k: v for k, v in item.items() if k in meta or projection.get(k, 1)}
+    for k in meta:
+        doc[k] = score or 0.0
+    return doc
+
+
+def _tokens(text):
+    """Lowercased words of a string, without stop words"""
+    return [word for word in _WORD.findall(text.lower()) if word not in _STOP_WORDS]
+
+
+def _parent(document, field):
+    """Innermost document and last key of a dotted path, copying the embedded documents on the way"""
+    *path, last = field.split('.')
+    for part in path:
+        child = document.get(part)
+        document[part] = dict(child) if isinstance(child, dict) else {}
+        document = document[part]
+    return document, last
+
+
+def _updated(item, update_dict, inserting=False):
+    """Copy of a document with Mongo update operators applied"""
+    updated = dict(item)
+    for op, fields in update_dict.items():
+        if op == '$set' or (op == '$setOnInsert' and inserting):
+            for field, value in fields.items():
+                parent, key = _parent(updated, field)
+                parent[key] = value
+        elif op == '$setOnInsert':
+            continue
+        elif op == '$inc':
+            for field, amount in fields.items():
+                parent, key = _parent(updated, field)
+                parent[key] = (parent.get(key) or 0) + amount
+        elif op == '$unset':
+            for field in fields:
+                parent, key = _parent(updated, field)
+                parent.pop(key, None)
+        elif op == '$push':
+            for field, value in fields.items():
+                updated[field] = list(updated.get(field) or []) + [value]
+        elif op == '$addToSet':
+            for field, value in fields.items():
+                current = list(updated.get(field) or [])
+                if value not in current:
+                    current.append(value)
+                updated[field] = current
+        else:
+            raise OperationFailure(f"Unsupported update operator: {op}")
+    return updated
+
+
+def _expression(item, expression):
+    """Evaluate an aggregation expression: "$field.path", "$$ROOT", a literal, or a document of those"""
+    if isinstance(expression, str) and expression.startswith('$'):
+        if expression == '$$ROOT':
+            return item
+        value = item
+        for part in expression[1:].split('.'):
+            value = value.get(part) if isinstance(value, dict) else None
+        return value
+    if isinstance(expression, dict):
+        return {key: _expression(item, value) for key, value in expression.items()}
+    return expression
+
+
+def _sorted(items, sort):
+    """Documents ordered by a list of (field, direction) pairs"""
+    items = list(items)
+    for field, direction in reversed(sort):
+        items.sort(key=lambda x, f=field: _norm(_expression(x, '$' + f)), reverse=direction == -1)
+    return items
+
+
+def _accumulate(op, operand, items):
+    """Value of a $group accumulator over the documents of one group"""
+    if op == '$sum':
+        values = (_expression(item, operand) for item in items)
+        return sum(v for v in values if isinstance(v, (int, float)) and not isinstance(v, bool))
+    if op == '$first':
+        return _expression(items[0], operand) if items else None
+    if op == '$push':
+        return [_expression(item, operand) for item in items]
+    if op == '$addToSet':
+        values = []
+        for item in items:
+            value = _expression(item, operand)
+            if value not in values:
+                values.append(value)
+        return values
+    if op in ('$max', '$min'):
+        values = [v for v in (_expression(item, operand) for item in items) if v is not None]
+        if not values:
+            return None
+        pick = max if op == '$max' else min
+        return pick(values, key=_norm)
+    if op == '$topN':
+        ranked = _sorted(items, list(operand['sortBy'].items()))
+        return [_expression(item, operand['output']) for item in ranked[:operand['n']]]
+    raise OperationFailure(f"Unsupported accumulator: {op}")
+
+
+def _reshape(item, projection):
+    """$project: inclusion/exclusion flags plus computed fields"""
+    flags = {k: v for k, v in projection.items() if isinstance(v, (bool, int))}
+    computed = {k: v for k, v in projection.items() if k not in flags}
+    doc = _project(item, flags) if flags else {'_id': item.get('_id')}
+    if not flags and not projection.get('_id', 1):
+        doc.pop('_id', None)
+    for key, expression in computed.items():
+        doc[key] = _expression(item, expression)
+    return doc
+
+
+def _run_stages(documents, stages):
+    """Apply aggregation stages to a list of documents"""
+    for stage in stages:
+        (name, spec), = stage.items()
+        if name == '$match':
+            documents = [item for item in documents if _matches(item, spec)]
+        elif name == '$sort':
+            documents = _sorted(documents, list(spec.items()))
+        elif name == '$skip':
+            documents = documents[spec:]
+        elif name == '$limit':
+            documents = documents[:spec]
+        elif name == '$project':
+            documents = [_reshape(item, spec) for item in documents]
+        elif name == '$unwind':
+            field = (spec if isinstance(spec, str) else spec['path'])[1:]
+            unwound = []
+            for item in documents:
+                value = item.get(field)
+                if isinstance(value, list):
+                    unwound.extend({**item, field: element} for element in value)
+                elif value is not None:
+                    unwound.append(item)
+            documents = unwound
+        elif name == '$group':
+            groups = {}
+            for item in documents:
+                key = _expression(item, spec['_id'])
+                # Compound keys are documents, which are not hashable
+                slot = repr(key) if isinstance(key, (dict, list)) else key
+                groups.setdefault(slot, (key, []))[1].append(item)
+            documents = [
+                {'_id': key, **{field: _accumulate(*next(iter(accumulator.items())), members)
+                                for field, accumulator in spec.items() if field != '_id'}}
+                for key, members in groups.values()
+            ]
+        elif name == '$count':
+            documents = [{spec: len(documents)}]
+        else:
+            raise OperationFailure(f"Unsupported aggregation stage: {name}")
+    return documents
+
+
+class SortedKeyList:
+    """
+    Sorted list split into bounded sublists, so an insert or delete shifts at
+    most a few hundred pointers instead of the whole index.
+    """
+
+    LOAD = 512
+
+    def __init__(self):
+        self.lists = []
+        self.maxes = []
+
+    def add(self, key):
+        if not self.maxes:
+            self.lists.append([key])
+            self.maxes.append(key)
+            return
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            # Time-ordered keys arrive in order; appending skips the bisect
+            i -= 1
+            self.lists[i].append(key)
+            self.maxes[i] = key
+        else:
+            insort(self.lists[i], key)
+        sub = self.lists[i]
+        if len(sub) > 2 * self.LOAD:
+            half = sub[self.LOAD:]
+            del sub[self.LOAD:]
+            self.maxes[i] = sub[-1]
+            self.lists.insert(i + 1, half)
+            self.maxes.insert(i + 1, half[-1])
+
+    def update(self, keys):
+        """Add many keys. A batch that is large next to the list re-sorts it once instead of inserting one by one."""
+        keys = sorted(keys)
+        size = sum(len(sub) for sub in self.lists)
+        if len(keys) * 4 < size:
+            for key in keys:
+                self.add(key)
+            return
+        # Two sorted runs: timsort merges them in linear time
+        merged = [key for sub in self.lists for key in sub] + keys
+        merged.sort()
+        self.lists = [merged[i:i + self.LOAD] for i in range(0, len(merged), self.LOAD)]
+        self.maxes = [sub[-1] for sub in self.lists]
+
+    def remove(self, key):
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return
+        sub = self.lists[i]
+        j = bisect_left(sub, key)
+        if j < len(sub) and sub[j] == key:
+            del sub[j]
+            if sub:
+                self.maxes[i] = sub[-1]
+            else:
+                del self.lists[i]
+                del self.maxes[i]
+
+    def _position(self, key):
+        """(sublist, offset) of the first element >= key"""
+        if key is None or not self.maxes:
+            return 0, 0
+        i = bisect_left(self.maxes, key)
+        if i == len(self.maxes):
+            return i, 0
+        return i, bisect_left(self.lists[i], key)
+
+    def irange(self, low=None, high=None, reverse=False):
+        """Yield elements with low <= element < high (None means unbounded)"""
+        i, j = self._position(low)
+        k, l = (len(self.lists), 0) if high is None else self._position(high)
+        if (i, j) >= (k, l):
+            return
+        if not reverse:
+            while (i, j) < (k, l):
+                sub = self.lists[i]
+                end = l if i == k else len(sub)
+                yield from sub[j:end]
+                i, j = i + 1, 0
+        else:
+            if l == 0:
+                k, l = k - 1, len(self.lists[k - 1])
+            while (k, l) > (i, j):
+                sub = self.lists[k]
+                begin = j if k == i else 0
+                yield from reversed(sub[begin:l])
+                if k == 0:
+                    break
+                k, l = k - 1, len(self.lists[k - 1])
+
+
+class SortedIndex:
+    """Ordered (optionally compound, multikey) index over one or more fields"""
+
+    def __init__(self, name, fields, unique=False):
+        self.name = name
+        self.fields = fields
+        self.unique = unique
+        self.multikey = False
+        self.entries = SortedKeyList()
+
+    def keys_for(self, item):
+        values = [item.get(field) for field in self.fields]
+        id_key = _norm(item.get('_id'))
+        if list not in map(type, values):
+            return [(*map(_norm, values), id_key)]
+        self.multikey = True
+        components = [
+            [_norm(v) for v in value] or [_norm(None)] if isinstance(value, list) else [_norm(value)]
+            for value in values
+        ]
+        return [key + (id_key,) for key in product(*components)]
+
+    def add(self, item):
+        for key in self.keys_for(item):
+            if self.unique:
+                for existing in self.entries.irange(key[:-1], key[:-1] + (_MAX,)):
+                    raise DuplicateKeyError(f"E11000 duplicate key error index: {self.name}")
+            self.entries.add(key)
+
+    def add_many(self, items):
+        self.entries.update([key for item in items for key in self.keys_for(item)])
+
+    def remove(self, item):
+        for key in self.keys_for(item):
+            self.entries.remove(key)
+
+    def scan(self, prefix, bounds, descending):
+        """Yield _ids in index order for entries matching an equality prefix and a range on the next field"""
+        low, low_inc, high, high_inc = bounds
+        start, stop = prefix, prefix + (_MAX,)
+        if len(prefix) < len(self.fields):
+            if low is not None:
+                start = max(start, prefix + ((low,) if low_inc else (low, _MAX)))
+            if high is not None:
+                stop = min(stop, prefix + ((high, _MAX) if high_inc else (high,)))
+        seen = set() if self.multikey else None
+        for entry in self.entries.irange(start, stop, reverse=descending):
+            id_key = entry[-1]
+            if seen is not None:
+                if id_key in seen:
+                    continue
+                seen.add(id_key)
+            yield id_key[1] if len(id_key) > 1 else None
+
+
+class TextIndex:
+    """
+    Inverted index over string fields with BM25 ranking. Field weights scale
+    term frequencies, so a hit in a heavily weighted field counts as several.
+    """
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self, name, fields, weights=None):
+        self.name = name
+        self.fields = fields
+        self.weights = {field: (weights or {}).get(field, 1) for field in fields}
+        self.postings = {}
+        self.lengths = {}
+        self.total_length = 0
+
+    def terms_for(self, item):
+        terms = {}
+        get = terms.get
+        for field, weight in self.weights.items():
+            value = item.get(field)
+            for text in value if isinstance(value, list) else [value]:
+                if isinstance(text, str):
+                    for token in _tokens(text):
+                        terms[token] = get(token, 0) + weight
+        return terms
+
+    def keys_for(self, item):
+        # Only compared to detect changes, so the raw field values will do
+        return tuple(item.get(field) for field in self.fields)
+
+    def add(self, item):
+        terms = self.terms_for(item)
+        if not terms:
+            return
+        doc_id = item['_id']
+        postings = self.postings
+        for term, frequency in terms.items():
+            posting = postings.get(term)
+            if posting is None:
+                postings[term] = {doc_id: frequency}
+            else:
+                posting[doc_id] = frequency
+        length = sum(terms.values())
+        self.lengths[doc_id] = length
+        self.total_length += length
+
+    def add_many(self, items):
+        for item in items:
+            self.add(item)
+
+    def remove(self, item):
+        doc_id = item['_id']
+        length = self.lengths.pop(doc_id, None)
+        if length is None:
+            return
+        self.total_length -= length
+        for term in self.terms_for(item):
+            postings = self.postings.get(term)
+            if postings is not None:
+                postings.pop(doc_id, None)
+                if not postings:
+                    del self.postings[term]
+
+    def search(self, query):
+        """Scores of documents matching any term of a $search string; -term excludes"""
+        words = query.split()
+        wanted = {token for word in words if not word.startswith('-') for token in _tokens(word)}
+        excluded = {token for word in words if word.startswith('-') for token in _tokens(word[1:])}
+        count = len(self.lengths)
+        if not count:
+            return {}
+        average = self.total_length / count
+        scores = {}
+        for term in wanted:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+            for doc_id, frequency in postings.items():
+                norm = self.K1 * (1 - self.B + self.B * self.lengths[doc_id] / average)
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * frequency * (self.K1 + 1) / (frequency + norm)
+        for term in excluded:
+            for doc_id in self.postings.get(term, ()):
+                scores.pop(doc_id, None)
+        return scores
+
 
 class InMemoryCollection:
+    # Batches at least this large are indexed in one pass per index (see _insert_bulk)
+    BULK_INSERT_MIN = 256
+
     def __init__(self):
-        self.data = []
-    
-    async def find(self, filter_dict=None):
-        return InMemoryCursor([
-            item for item in self.data
-            if not filter_dict or all(item.get(k) == v for k, v in filter_dict.items())
-        ])
-    
-    async def find_one(self, filter_dict):
-        for item in self.data:
-            if all(item.get(k) == v for k, v in filter_dict.items()):
-                return item
+        self.documents = {}
+        # Uniqueness of _id is enforced by the documents dict itself
+        self.indexes = {'_id_': SortedIndex('_id_', ['_id'])}
+
+    @property
+    def data(self):
+        return list(self.documents.values())
+
+    async def create_index(self, keys, name=None, unique=False, weights=None, **kwargs):
+        """Declare a secondary index. Idempotent, like Mongo's createIndex."""
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        fields = [field for field, _ in keys]
+        name = name or "_".join(f"{field}_{direction}" for field, direction in keys)
+        if name not in self.indexes:
+            if any(direction == 'text' for _, direction in keys):
+                if self._text_index() is not None:
+                    raise OperationFailure("only one text index per collection allowed")
+                index = TextIndex(name, fields, weights)
+            else:
+                index = SortedIndex(name, fields, unique=unique)
+            if unique:
+                for item in self.documents.values():
+                    index.add(item)
+            else:
+                index.add_many(self.documents.values())
+            self.indexes[name] = index
+        return name
+
+    async def drop_index(self, name):
+        self.indexes.pop(name, None)
+
+    def index_information(self):
+        return {
+            name: {'key': [(f, 'text' if isinstance(index, TextIndex) else 1) for f in index.fields]}
+            for name, index in self.indexes.items()
+        }
+
+    def find(self, filter_dict=None, projection=None):
+        return InMemoryCursor(self, filter_dict or {}, projection)
+
+    def aggregate(self, pipeline):
+        stages = list(pipeline)
+        filter_dict, sort = {}, None
+        if stages and '$match' in stages[0]:
+            filter_dict = stages.pop(0)['$match']
+        if stages and '$sort' in stages[0]:
+            sort = list(stages.pop(0)['$sort'].items())
+        documents = [dict(item) for item in self._query(filter_dict, sort, 0, 0)]
+        return InMemoryCommandCursor(_run_stages(documents, stages))
+
+    async def find_one(self, filter_dict=None, projection=None):
+        for item, score in self._scored_query(filter_dict or {}, None, 0, 1):
+            return _project(item, projection, score)
         return None
-    
+
+    async def count_documents(self, filter_dict=None):
+        if not filter_dict:
+            return len(self.documents)
+        return sum(1 for _ in self._query(filter_dict, None, 0, 0))
+
     async def insert_one(self, document):
-        self.data.insert(0, document)
-        return type('Result', (), {'inserted_id': document.get('_id')})()
-    
-    async def update_one(self, filter_dict, update_dict):
-        for item in self.data:
-            if all(item.get(k) == v for k, v in filter_dict.items()):
-                if '$set' in update_dict:
-                    item.update(update_dict['$set'])
-                return type('Result', (), {'matched_count': 1})()
-        return type('Result', (), {'matched_count': 0})()
-    
+        self._insert(document)
+        return SimpleNamespace(inserted_id=document['_id'], acknowledged=True)
+
+    async def insert_many(self, documents, ordered=True):
+        """Insert documents; like Mongo, unordered inserts carry on past duplicate keys and report them at the end"""
+        documents = list(documents)
+        if len(documents) >= self.BULK_INSERT_MIN and not any(
+            getattr(index, 'unique', False) for index in self.indexes.values()
+        ):
+            return self._insert_bulk(documents, ordered)
+        inserted, errors = [], []
+        for position, document in enumerate(documents):
+            try:
+                self._insert(document)
+            except DuplicateKeyError as e:
+                errors.append({'index': position, 'code': 11000, 'errmsg': str(e)})
+                if ordered:
+                    break
+                continue
+            inserted.append(document['_id'])
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(inserted)})
+        return SimpleNamespace(inserted_ids=inserted, acknowledged=True)
+
+    async def update_one(self, filter_dict, update_dict, upsert=False):
+        for item in self._query(filter_dict, None, 0, 1):
+            modified = self._apply(item, update_dict)
+            return SimpleNamespace(matched_count=1, modified_count=int(modified), upserted_id=None)
+        if upsert:
+            document = self._upsert_document(filter_dict, update_dict)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document['_id'])
+        return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+
+    async def find_one_and_update(self, filter_dict, update_dict, projection=None, sort=None,
+                                  upsert=False, return_document=False):
+        """Atomically update one document; return_document=True (ReturnDocument.AFTER) returns the new state"""
+        for item in self._query(filter_dict, sort, 0, 1):
+            before = _project(item, projection)
+            self._apply(item, update_dict)
+            return _project(item, projection) if return_document else before
+        if upsert:
+            document = self._upsert_document(filter_dict, update_dict)
+            return _project(document, projection) if return_document else None
+        return None
+
+    async def find_one_and_delete(self, filter_dict, projection=None, sort=None):
+        for item in self._query(filter_dict, sort, 0, 1):
+            document = _project(item, projection)
+            self._remove(item)
+            return document
+        return None
+
+    async def update_many(self, filter_dict, update_dict, upsert=False):
+        matched = modified = 0
+        for item in list(self._query(filter_dict, None, 0, 0)):
+            matched += 1
+            modified += int(self._apply(item, update_dict))
+        if not matched and upsert:
+            document = self._upsert_document(filter_dict, update_dict)
+            return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=document['_id'])
+        return SimpleNamespace(matched_count=matched, modified_count=modified, upserted_id=None)
+
+    async def bulk_write(self, requests, ordered=True):
+        """Apply pymongo write models (InsertOne, UpdateOne, UpdateMany, DeleteOne, DeleteMany)"""
+        inserted = matched = modified = deleted = upserted = 0
+        for request in requests:
+            kind = type(request).__name__
+            if kind == 'InsertOne':
+                self._insert(request._doc)
+                inserted += 1
+            elif kind in ('UpdateOne', 'UpdateMany', 'ReplaceOne'):
+                update = request._doc if kind != 'ReplaceOne' else {'$set': request._doc}
+                method = self.update_many if kind == 'UpdateMany' else self.update_one
+                result = await method(request._filter, update, upsert=bool(request._upsert))
+                matched += result.matched_count
+                modified += result.modified_count
+                upserted += int(result.upserted_id is not None)
+            elif kind in ('DeleteOne', 'DeleteMany'):
+                method = self.delete_many if kind == 'DeleteMany' else self.delete_one
+                deleted += (await method(request._filter)).deleted_count
+            else:
+                raise OperationFailure(f"Unsupported write model: {kind}")
+        return SimpleNamespace(inserted_count=inserted, matched_count=matched, modified_count=modified,
+                               deleted_count=deleted, upserted_count=upserted, acknowledged=True)
+
     async def delete_one(self, filter_dict):
-        for i, item in enumerate(self.data):
-            if all(item.get(k) == v for k, v in filter_dict.items()):
-                self.data.pop(i)
-                return type('Result', (), {'deleted_count': 1})()
-        return type('Result', (), {'deleted_count': 0})()
-    
-    def sort(self, field, direction):
-        # Sort in place and return self for chaining
-        reverse = direction == -1
-        self.data.sort(key=lambda x: x.get(field, ''), reverse=reverse)
-        return self
+        for item in self._query(filter_dict, None, 0, 1):
+            self._remove(item)
+            return SimpleNamespace(deleted_count=1)
+        return SimpleNamespace(deleted_count=0)
+
+    async def delete_many(self, filter_dict):
+        items = list(self._query(filter_dict or {}, None, 0, 0))
+        for item in items:
+            self._remove(item)
+        return SimpleNamespace(deleted_count=len(items))
+
+    # -- storage ----------------------------------------------------------
+
+    def _insert(self, document):
+        if '_id' not in document:
+            document['_id'] = ObjectId()
+        if document['_id'] in self.documents:
+            raise DuplicateKeyError(f"E11000 duplicate key error: _id {document['_id']!r}")
+        item = dict(document)
+        added = []
+        try:
+            for index in self.indexes.values():
+                index.add(item)
+                added.append(index)
+        except DuplicateKeyError:
+            for index in added:
+                index.remove(item)
+            raise
+        self.documents[item['_id']] = item
+        return item
+
+    def _insert_bulk(self, documents, ordered):
+        """
+        insert_many for large batches: store every document, then add the
+        batch to each index at once rather than one document at a time.
+        Only used without secondary unique indexes, where the _id check
+        is the only way an insert can fail.
+        """
+        items, errors = [], []
+        for position, document in enumerate(documents):
+            if '_id' not in document:
+                document['_id'] = ObjectId()
+            if document['_id'] in self.documents:
+                errors.append({'index': position, 'code': 11000,
+                               'errmsg': f"E11000 duplicate key error: _id {document['_id']!r}"})
+                if ordered:
+                    break
+                continue
+            item = dict(document)
+            self.documents[item['_id']] = item
+            items.append(item)
+        for index in self.indexes.values():
+            index.add_many(items)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nInserted': len(items)})
+        return SimpleNamespace(inserted_ids=[item['_id'] for item in items], acknowledged=True)
+
+    def _remove(self, item):
+        for index in self.indexes.values():
+            index.remove(item)
+        del self.documents[item['_id']]
+
+    def _apply(self, item, update_dict):
+        """Apply update operators in place, keeping indexes in step"""
+        updated = _updated(item, update_dict)
+        if updated == item:
+            return False
+        for index in self.indexes.values():
+            if index.keys_for(item) != index.keys_for(updated):
+                index.remove(item)
+                index.add(updated)
+        item.clear()
+        item.update(updated)
+        return True
+
+    def _upsert_document(self, filter_dict, update_dict):
+        seed = {}
+        for key, condition in filter_dict.items():
+            if not key.startswith('$'):
+                value = _equality_value(condition)
+                if value is not _NO_EQ:
+                    seed[key] = value
+        document = _updated(seed, update_dict, inserting=True)
+        return self._insert(document)
+
+    # -- query planning ---------------------------------------------------
+
+    def _text_index(self):
+        for index in self.indexes.values():
+            if isinstance(index, TextIndex):
+                return index
+        return None
+
+    def _plan(self, filter_dict, sort):
+        """
+        Pick the index that pins the longest equality prefix, preferring one
+        whose remaining fields match the requested sort. Returns
+        (index, prefix, bounds, descending, serves_sort) or None for a full scan.
+        """
+        equalities = {}
+        for key, condition in filter_dict.items():
+            if not key.startswith('$'):
+                value = _equality_value(condition)
+                if value is not _NO_EQ:
+                    equalities[key] = value
+        best, best_score = None, None
+        for index in self.indexes.values():
+            if isinstance(index, TextIndex):
+                continue
+            prefix = []
+            for field in index.fields:
+                if field not in equalities:
+                    break
+                prefix.append(_norm(equalities[field]))
+            rest = index.fields[len(prefix):]
+            serves_sort, descending = False, False
+            if sort:
+                sort_fields = [field for field, _ in sort]
+                directions = {direction for _, direction in sort}
+                if len(directions) == 1 and rest[:len(sort_fields)] == sort_fields:
+                    serves_sort, descending = True, directions.pop() == -1
+            bounds = _bounds(filter_dict, rest[0]) if rest else (None, True, None, True)
+            ranged = bounds[0] is not None or bounds[2] is not None
+            if not prefix and not serves_sort and not ranged:
+                continue
+            score = (len(prefix), serves_sort, ranged)
+            if best_score is None or score > best_score:
+                best, best_score = (index, tuple(prefix), bounds, descending, serves_sort), score
+        return best
+
+    def _query(self, filter_dict, sort, skip, limit):
+        """Yield stored documents matching a query in sort order"""
+        for item, _ in self._scored_query(filter_dict, sort, skip, limit):
+            yield item
+
+    def _scored_query(self, filter_dict, sort, skip, limit):
+        """Yield (document, text score) pairs; the score is None outside $text queries"""
+        if '$text' in filter_dict:
+            yield from self._text_query(filter_dict, sort, skip, limit)
+            return
+        for item in self._indexed_query(filter_dict, sort, skip, limit):
+            yield item, None
+
+    def _text_query(self, filter_dict, sort, skip, limit):
+        index = self._text_index()
+        if index is None:
+            raise OperationFailure("text index required for $text query")
+        scores = index.search(filter_dict['$text'].get('$search', ''))
+        matching = [
+            (self.documents[doc_id], score) for doc_id, score in scores.items()
+            if _matches(self.documents[doc_id], filter_dict)
+        ]
+        for field, direction in reversed(sort or []):
+            if _is_meta(direction):
+                matching.sort(key=lambda pair: pair[1], reverse=True)
+            else:
+                matching.sort(key=lambda pair, f=field: _norm(pair[0].get(f)), reverse=direction == -1)
+        end = skip + limit if limit else None
+        yield from matching[skip:end]
+
+    def _indexed_query(self, filter_dict, sort, skip, limit):
+        if '_id' in filter_dict:
+            doc_id = _equality_value(filter_dict['_id'])
+            if doc_id is not _NO_EQ:
+                item = self.documents.get(doc_id)
+                if item is not None and _matches(item, filter_dict) and not skip:
+                    yield item
+                return
+
+        ids = filter_dict['_id'].get('$in') if isinstance(filter_dict.get('_id'), dict) else None
+        plan = None if isinstance(ids, (list, tuple)) else self._plan(filter_dict, sort)
+        if isinstance(ids, (list, tuple)):
+            # Point lookups in the primary dict instead of a range scan of _id_,
+            # in the _id order that scan would give
+            serves_sort = False
+            found = {
+                doc_id: self.documents[doc_id] for doc_id in ids
+                if not isinstance(doc_id, (dict, list)) and doc_id in self.documents
+            }
+            candidates = (found[doc_id] for doc_id in sorted(found, key=_norm))
+        elif plan:
+            index, prefix, bounds, descending, serves_sort = plan
+            # Snapshot the ids: callers may write between yields (streamed
+            # cursors), and a document removed meanwhile is skipped
+            scanned = list(index.scan(prefix, bounds, descending))
+            candidates = (item for item in map(self.documents.get, scanned) if item is not None)
+        else:
+            serves_sort = False
+            candidates = iter(list(self.documents.values()))
+        matching = (item for item in candidates if _matches(item, filter_dict))
+
+        if sort and not serves_sort:
+            matching = list(matching)
+            for field, direction in reversed(sort):
+                matching.sort(key=lambda x, f=field: _norm(x.get(f)), reverse=direction == -1)
+            matching = iter(matching)
+
+        produced = 0
+        for position, item in enumerate(matching):
+            if position < skip:
+                continue
+            yield item
+            produced += 1
+            if limit and produced >= limit:
+                return
 
 
 class InMemoryCursor:
-    def __init__(self, data):
-        self.data = data
-    
-    async def to_list(self, length):
-        return self.data[:length]
-    
-    def sort(self, field, direction):
-        reverse = direction == -1
-        self.data.sort(key=lambda x: x.get(field, ''), reverse=reverse)
+    """Lazy cursor mirroring motor's: find() is synchronous, to_list() and iteration are async"""
+
+    def __init__(self, collection, filter_dict, projection=None):
+        self.collection = collection
+        self.filter = filter_dict
+        self.projection = projection
+        self.sort_spec = None
+        self.skip_count = 0
+        self.limit_count = 0
+        self._results = None
+
+    def sort(self, field, direction=1):
+        # Accept both sort("field", -1) and sort([("a", -1), ("b", -1)])
+        self.sort_spec = list(field) if isinstance(field, (list, tuple)) else [(field, direction)]
+        return self
+
+    def skip(self, count):
+        self.skip_count = count
         return self
 
+    def limit(self, count):
+        self.limit_count = count
+        return self
+
+    def _iterate(self, length=None):
+        limit = self.limit_count
+        if length is not None and (not limit or length < limit):
+            limit = length
+        for item, score in self.collection._scored_query(self.filter, self.sort_spec, self.skip_count, limit):
+            yield _project(item, self.projection, score)
+
+    async def to_list(self, length=None):
+        return list(self._iterate(length))
+
+    async def explain(self):
+        """Report the chosen plan in the shape of Mongo's explain output"""
+        doc_id = _equality_value(self.filter.get('_id', _NO_EQ)) if '_id' in self.filter else _NO_EQ
+        if '$text' in self.filter:
+            stage = {'stage': 'TEXT_MATCH', 'indexName': getattr(self.collection._text_index(), 'name', None)}
+        elif doc_id is not _NO_EQ:
+            stage = {'stage': 'IDHACK'}
+        else:
+            plan = self.collection._plan(self.filter, self.sort_spec)
+            if plan is None:
+                stage = {'stage': 'COLLSCAN'}
+            else:
+                index, _, _, descending, serves_sort = plan
+                stage = {'stage': 'IXSCAN', 'indexName': index.name,
+                         'direction': 'backward' if descending else 'forward'}
+                if self.sort_spec and not serves_sort:
+                    stage = {'stage': 'SORT', 'inputStage': stage}
+        return {'queryPlanner': {'winningPlan': stage}}
+
+    def __aiter__(self):
+        self._results = self._iterate()
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class InMemoryCommandCursor:
+    """Result of aggregate(), mirroring motor's command cursor"""
+
+    def __init__(self, documents):
+        self.documents = documents
+        self._results = None
+
+    async def to_list(self, length=None):
+        return self.documents[:length] if length else list(self.documents)
+
+    def __aiter__(self):
+        self._results = iter(self.documents)
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._results)
+        except StopIteration:
+            raise StopAsyncIteration
+
 
 class InMemoryDatabase:
     def __init__(self):
         self.collections = {}
-    
+
     def __getitem__(self, name):
         if name not in self.collections:
             self.collections[name] = InMemoryCollection()
         return self.collections[name]
+
+    async def list_collection_names(self):
+        return list(self.collections)
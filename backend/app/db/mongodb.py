@@ -1,52 +1,136 @@
-from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo.read_preferences import read_pref_mode_from_name, make_read_preference
 from backend.app.core.config import get_settings
 from backend.app.db.memory_db import InMemoryDatabase
-import sys
+from backend.app.db.indexes import ensure_indexes, index_fingerprint
+from backend.app.db.bulk_data import import_directory, print_results
+from backend.app.db.index_advisor import IndexAdvisor
+from backend.app.db.pool_monitor import PoolMonitor
+from backend.app.db.versions import CollectionVersions
+from backend.app.db.repositories.training_repository import TrainingRepository
+from pymongo import UpdateOne
+from datetime import datetime
+from typing import Any, Dict, Optional
+import asyncio
+import time
 
 settings = get_settings()
 
+# Bump when seed_data changes so existing databases are re-seeded
+SEED_VERSION = 4
+
 class Database:
-    client: AsyncIOMotorClient = None
+    client = None
     connected: bool = False
     memory_db: InMemoryDatabase = None
+    # Read preference -> index advisor wrapping the handle for it
+    advisors: Dict[Optional[str], IndexAdvisor] = {}
+    pool_monitor: PoolMonitor = None
 
-    def connect(self):
+    async def connect(self):
+        """Connect and ping MongoDB, falling back to in-memory storage if it is unreachable"""
+        self.advisors = {}
         try:
-            self.client = AsyncIOMotorClient(settings.mongodb_url, serverSelectionTimeoutMS=5000)
-            # Test connection
-            self.client.server_info()
+            if not settings.mongodb_url:
+                raise ValueError("MONGODB_URL is not set")
+            # Imported here so in-memory mode and import time never pay for motor
+            from motor.motor_asyncio import AsyncIOMotorClient
+            self.pool_monitor = PoolMonitor()
+            self.client = AsyncIOMotorClient(
+                settings.mongodb_url,
+                maxPoolSize=settings.mongodb_max_pool_size,
+                minPoolSize=settings.mongodb_min_pool_size,
+                maxIdleTimeMS=settings.mongodb_max_idle_time_ms,
+                waitQueueTimeoutMS=settings.mongodb_wait_queue_timeout_ms,
+                serverSelectionTimeoutMS=settings.mongodb_server_selection_timeout_ms,
+                connectTimeoutMS=settings.mongodb_connect_timeout_ms,
+                socketTimeoutMS=settings.mongodb_socket_timeout_ms,
+                event_listeners=[self.pool_monitor]
+            )
+            await self.client.admin.command("ping")
             self.connected = True
             print("✓ Connected to MongoDB")
-            self._seed_db() # Seed even if connected
         except Exception as e:
             print(f"✗ MongoDB connection failed: {e}")
             print("⚠ Running with in-memory storage - data will not persist!")
+            if self.client:
+                self.client.close()
+            self.client = None
             self.connected = False
             self.memory_db = InMemoryDatabase()
-            self._seed_db()
-
-    def _seed_db(self):
-        """Seed database with sample data"""
-        import asyncio
-        # Create a new loop if needed or use existing
+        if not self.connected and settings.fixtures_path:
+            # Before indexes exist, so each index is built with one sort
+            print(f"Loading fixtures from {settings.fixtures_path}")
+            print_results(await import_directory(self.get_db(), settings.fixtures_path, quiet=True))
+        # Seed even if connected
+        await self.bootstrap()
+    
+    async def ping(self) -> Dict[str, Any]:
+        """Round trip to the server, reporting latency"""
+        started = time.perf_counter()
+        await asyncio.wait_for(
+            self.client.admin.command("ping"),
+            timeout=settings.mongodb_server_selection_timeout_ms / 1000
+        )
+        return {"latency_ms": round((time.perf_counter() - started) * 1000, 2)}
+    
+    async def readiness(self) -> Dict[str, Any]:
+        """Whether the database can serve requests, with connection pool status"""
+        if not self.connected:
+            ready = self.memory_db is not None
+            return {"ready": ready, "database": "memory", "persistent": False}
+        status = {"database": "mongodb", "persistent": True}
         try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            
-        if loop.is_running():
-            # We are likely in the startup event loop
-            asyncio.create_task(self.seed_data())
-        else:
-            loop.run_until_complete(self.seed_data())
+            status.update(await self.ping())
+            status["ready"] = True
+        except Exception as e:
+            status.update(ready=False, error=str(e))
+        status["pool"] = {
+            "max_size": settings.mongodb_max_pool_size,
+            "min_size": settings.mongodb_min_pool_size,
+            "servers": self.pool_monitor.stats(),
+        }
+        topology = self.client.topology_description
+        status["topology"] = {
+            "type": topology.topology_type_name,
+            "servers": {
+                f"{address[0]}:{address[1]}": server.server_type_name
+                for address, server in topology.server_descriptions().items()
+            },
+        }
+        return status
+    
+    async def bootstrap(self):
+        """
+        Create declared indexes, then seed. A marker document records what
+        was applied, so restarts against the same database skip both unless
+        the declared indexes or SEED_VERSION have changed.
+        """
+        database = self.get_db()
+        marker = {"seed_version": SEED_VERSION, "indexes": index_fingerprint()}
+        state = await database["app_meta"].find_one({"_id": "bootstrap"})
+        if state and all(state.get(key) == value for key, value in marker.items()):
+            print("✓ Indexes and seed data already applied")
+            return
+        try:
+            await ensure_indexes(database)
+            print("✓ Indexes ensured")
+        except Exception as e:
+            print(f"✗ Index creation failed: {e}")
+            await self.seed_data()
+            return
+        await self.seed_data()
+        await database["app_meta"].update_one(
+            {"_id": "bootstrap"},
+            {"$set": {**marker, "applied_at": datetime.utcnow().isoformat()}},
+            upsert=True
+        )
     
     async def seed_data(self):
-        """Async seed function"""
+        """Upsert the sample data; the three collections are written concurrently"""
         db = self.get_db()
         
         # Seed sample user (Upsert)
-        await db["users"].update_one(
+        seed_user = db["users"].update_one(
             {"_id": "u1"},
             {"$set": {
                 "name": "Lee Chong Wei",
@@ -65,6 +149,8 @@ class Database:
                 "years_of_experience": 25,
                 "age_category": "Senior",
                 "academy": "Bukit Jalil Sports School",
+                # Followers pull u1's posts rather than having them fanned out
+                "celebrity": True,
                 "skills": [
                     {"name": "Smash", "endorsements": 1500},
                     {"name": "Net Play", "endorsements": 1200},
@@ -89,22 +175,26 @@ class Database:
             upsert=True
         )
         
-        # Seed sample posts (Check if exists first to avoid dupes if no ID, but we use ID p1)
-        if not await db["posts"].find_one({"_id": "p1"}):
-            await db["posts"].insert_one({
-                "_id": "p1",
+        # Seed sample post, only if missing so its likes and comments are kept
+        seed_post = db["posts"].update_one(
+            {"_id": "p1"},
+            {"$setOnInsert": {
                 "author_id": "u1",
                 "content": "Great training session today! Focusing on speed and agility. 🏸 #badminton #training",
                 "media_url": None,
                 "type": "text",
                 "likes": 245,
-                "comments": 12
-            })
+                "comments": 12,
+                "created_at": "2024-01-01T00:00:00"
+            }},
+            upsert=True
+        )
 
         # Seed training videos
         videos = [
             {
                 "_id": "v1",
+                "created_at": "2024-01-01T00:00:00",
                 "title": "Advanced Footwork Drills",
                 "author": "An Se Young",
                 "description": "Master the court coverage with these essential footwork patterns.",
@@ -112,12 +202,14 @@ class Database:
                 "thumbnail_url": "https://img.youtube.com/vi/QIBIvy9hB8I/mqdefault.jpg",
                 "duration": "10:15",
                 "views": "1.2M",
+                "view_count": 1200000,
                 "type": "link",
                 "categories": ["footwork", "technique"],
                 "analysis": None
             },
             {
                 "_id": "v2",
+                "created_at": "2024-01-02T00:00:00",
                 "title": "Ultimate Smash Masterclass",
                 "author": "Lee Chong Wei",
                 "description": "Learn the technique behind one of the fastest smashes in the world.",
@@ -125,12 +217,14 @@ class Database:
                 "thumbnail_url": "https://img.youtube.com/vi/s3cMVBRmySc/mqdefault.jpg",
                 "duration": "12:45",
                 "views": "3.5M",
+                "view_count": 3500000,
                 "type": "link",
                 "categories": ["technique"],
                 "analysis": None
             },
             {
                 "_id": "v3",
+                "created_at": "2024-01-03T00:00:00",
                 "title": "Net Play Secrets",
                 "author": "Kento Momota",
                 "description": "Dominate the front court with deceptive net shots.",
@@ -138,12 +232,14 @@ class Database:
                 "thumbnail_url": "https://img.youtube.com/vi/Zj_jdy1GWOc/mqdefault.jpg",
                 "duration": "08:30",
                 "views": "890K",
+                "view_count": 890000,
                 "type": "link",
                 "categories": ["technique"],
                 "analysis": None
             },
             {
                 "_id": "v4",
+                "created_at": "2024-01-04T00:00:00",
                 "title": "Master Footwork",
                 "author": "Lin Dan",
                 "description": "Legendary footwork techniques from the GOAT.",
@@ -151,12 +247,14 @@ class Database:
                 "thumbnail_url": "https://img.youtube.com/vi/yxBVlMncudg/mqdefault.jpg",
                 "duration": "15:20",
                 "views": "2.1M",
+                "view_count": 2100000,
                 "type": "link",
                 "categories": ["footwork"],
                 "analysis": None
             },
             {
                 "_id": "v5",
+                "created_at": "2024-01-05T00:00:00",
                 "title": "4 Corner Footwork Tutorial",
                 "author": "Badminton Insight",
                 "description": "Step-by-step guide to mastering movement to all four corners.",
@@ -164,12 +262,14 @@ class Database:
                 "thumbnail_url": "https://img.youtube.com/vi/R_Qz-D18fV0/mqdefault.jpg",
                 "duration": "09:45",
                 "views": "560K",
+                "view_count": 560000,
                 "type": "link",
                 "categories": ["footwork"],
                 "analysis": None
             },
             {
                 "_id": "v6",
+                "created_at": "2024-01-06T00:00:00",
                 "title": "Offensive Net Footwork",
                 "author": "Basicfeather",
                 "description": "Aggressive footwork to dominate the net area.",
@@ -177,29 +277,54 @@ class Database:
                 "thumbnail_url": "https://img.youtube.com/vi/0V1t2IHEFxQ/mqdefault.jpg",
                 "duration": "07:12",
                 "views": "320K",
+                "view_count": 320000,
                 "type": "link",
                 "categories": ["footwork"],
                 "analysis": None
             }
         ]
         
-        for video in videos:
-            await db["training_videos"].update_one(
-                {"_id": video["_id"]},
-                {"$set": video},
-                upsert=True
-            )
+        seed_videos = db["training_videos"].bulk_write(
+            [UpdateOne({"_id": video["_id"]}, {"$set": video}, upsert=True) for video in videos],
+            ordered=False
+        )
+        await asyncio.gather(seed_user, seed_post, seed_videos)
+        
+        # Videos written before view counts were numeric, and facets for
+        # the seeded videos, which bypass TrainingRepository.create
+        training_repo = TrainingRepository(db)
+        await training_repo.backfill_view_counts()
+        await training_repo.rebuild_facets()
+        
+        # Seeding may have changed documents behind the repositories' backs
+        await CollectionVersions(db).bump("users", "posts", "training_videos")
 
     def close(self):
         if self.client:
             self.client.close()
             print("Disconnected from MongoDB")
 
-    def get_db(self):
+    def get_db(self, read_preference: Optional[str] = None):
+        """
+        The database handle. A read preference name (e.g. secondaryPreferred)
+        routes reads through this handle to replica set secondaries; writes
+        always go to the primary. Ignored in in-memory mode.
+        """
+        if read_preference == "primary" or not self.connected:
+            read_preference = None
+        if settings.index_advisor and read_preference in self.advisors:
+            return self.advisors[read_preference]
         if self.connected:
-            return self.client[settings.db_name]
+            options = {}
+            if read_preference:
+                options["read_preference"] = make_read_preference(read_pref_mode_from_name(read_preference), None)
+            database = self.client.get_database(settings.db_name, **options)
         else:
-            return self.memory_db
+            database = self.memory_db
+        if settings.index_advisor:
+            self.advisors[read_preference] = IndexAdvisor(database)
+            return self.advisors[read_preference]
+        return database
 
 db = Database()
 
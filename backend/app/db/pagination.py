@@ -0,0 +1,69 @@
+"""
+Keyset (cursor) pagination helpers.
+
+A cursor is the sort key of the last document on a page, encoded as an
+opaque URL-safe token. The next page is then a range read on the index
+that backs the sort instead of a skip over everything already served.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+import base64
+import json
+
+
+# Newest first; _id breaks ties between documents created in the same instant
+TIMELINE_SORT = [("created_at", -1), ("_id", -1)]
+
+# Oldest first, for threads read top to bottom
+THREAD_SORT = [("created_at", 1), ("_id", 1)]
+
+
+def encode_cursor(document: Dict[str, Any]) -> str:
+    """Encode the sort key of a document as an opaque cursor"""
+    raw = json.dumps([document.get("created_at"), document["_id"]], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], str]:
+    """Decode a cursor produced by encode_cursor. Raises ValueError if malformed."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, doc_id = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if not isinstance(doc_id, str) or not (created_at is None or isinstance(created_at, str)):
+        raise ValueError(f"Invalid cursor: {cursor}")
+    return created_at, doc_id
+
+
+def before_filter(cursor: str, id_field: str = "_id") -> Dict[str, Any]:
+    """
+    Build the query that selects documents sorting strictly after the cursor
+    in TIMELINE_SORT. id_field names the tie-breaker when documents refer to
+    posts rather than being them (e.g. timeline entries keyed by post_id).
+    """
+    created_at, doc_id = decode_cursor(cursor)
+    clauses: List[Dict[str, Any]] = [{"created_at": created_at, id_field: {"$lt": doc_id}}]
+    if created_at is not None:
+        clauses.append({"created_at": {"$lt": created_at}})
+        # Legacy documents without a timestamp sort last
+        clauses.append({"created_at": None})
+    return {"$or": clauses}
+
+
+def after_filter(cursor: str) -> Dict[str, Any]:
+    """Build the query that selects documents sorting strictly after the cursor in THREAD_SORT"""
+    created_at, doc_id = decode_cursor(cursor)
+    clauses: List[Dict[str, Any]] = [{"created_at": created_at, "_id": {"$gt": doc_id}}]
+    if created_at is not None:
+        clauses.append({"created_at": {"$gt": created_at}})
+    else:
+        # Legacy documents without a timestamp sort first
+        clauses.append({"created_at": {"$ne": None}})
+    return {"$or": clauses}
+
+
+def next_cursor(page: List[Dict[str, Any]], limit: int) -> Optional[str]:
+    """Cursor for the page after this one, or None when this is the last page"""
+    if len(page) < limit:
+        return None
+    return encode_cursor(page[-1])
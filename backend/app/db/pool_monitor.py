@@ -0,0 +1,62 @@
+"""
+Connection pool bookkeeping from pymongo's CMAP events.
+
+The driver does not expose live pool occupancy, so a listener registered on
+the client counts open, checked-out and waiting connections per server for
+the readiness endpoint.
+"""
+from pymongo import monitoring
+from typing import Any, Dict
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Counts connections per server address"""
+
+    def __init__(self):
+        self.pools: Dict[str, Dict[str, int]] = {}
+
+    def _pool(self, address) -> Dict[str, int]:
+        key = f"{address[0]}:{address[1]}"
+        if key not in self.pools:
+            self.pools[key] = {"open": 0, "checked_out": 0, "waiting": 0, "checkout_failures": 0, "cleared": 0}
+        return self.pools[key]
+
+    def stats(self) -> Dict[str, Any]:
+        return {address: dict(pool) for address, pool in self.pools.items()}
+
+    def pool_created(self, event):
+        self._pool(event.address)
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self._pool(event.address)["cleared"] += 1
+
+    def pool_closed(self, event):
+        self.pools.pop(f"{event.address[0]}:{event.address[1]}", None)
+
+    def connection_created(self, event):
+        self._pool(event.address)["open"] += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self._pool(event.address)["open"] -= 1
+
+    def connection_check_out_started(self, event):
+        self._pool(event.address)["waiting"] += 1
+
+    def connection_check_out_failed(self, event):
+        pool = self._pool(event.address)
+        pool["waiting"] -= 1
+        pool["checkout_failures"] += 1
+
+    def connection_checked_out(self, event):
+        pool = self._pool(event.address)
+        pool["waiting"] -= 1
+        pool["checked_out"] += 1
+
+    def connection_checked_in(self, event):
+        self._pool(event.address)["checked_out"] -= 1
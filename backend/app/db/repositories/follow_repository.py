@@ -0,0 +1,159 @@
+from typing import List, Optional, Dict, Any, Iterable, Set
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+from backend.app.db.pagination import TIMELINE_SORT, before_filter
+from backend.app.db.versions import CollectionVersions
+from datetime import datetime
+
+# Timeline entries are ordered like posts, with the post id breaking ties
+HOME_SORT = [("created_at", -1), ("post_id", -1)]
+
+
+class FollowRepository:
+    """
+    Repository for the follow graph. Each edge is one document keyed
+    "<follower>:<followee>", so following twice is a duplicate key rather
+    than a second edge. Edges to accounts on the pull path (see
+    TimelineService) carry `celebrity: true`.
+    """
+    
+    INDEXES = {
+        "follows": [
+            # Followers of an account: listing and fan-out
+            [("followee_id", 1), ("created_at", -1), ("_id", -1)],
+            # Accounts a user follows: listing
+            [("follower_id", 1), ("created_at", -1), ("_id", -1)],
+            # Pull-path accounts a user follows, read with every home timeline page
+            [("follower_id", 1), ("celebrity", 1)],
+        ],
+    }
+    
+    def __init__(self, db):
+        self.db = db
+        self.collection = db["follows"]
+        self.versions = CollectionVersions(db)
+    
+    async def follow(self, follower_id: str, followee_id: str, celebrity: bool = False) -> bool:
+        """Create the edge; False if it already exists"""
+        edge = {
+            "_id": f"{follower_id}:{followee_id}",
+            "follower_id": follower_id,
+            "followee_id": followee_id,
+            "celebrity": celebrity,
+            "created_at": datetime.utcnow().isoformat()
+        }
+        try:
+            await self.collection.insert_one(edge)
+        except DuplicateKeyError:
+            return False
+        await self.versions.bump("follows")
+        return True
+    
+    async def unfollow(self, follower_id: str, followee_id: str) -> bool:
+        """Remove the edge; False if there was none"""
+        result = await self.collection.delete_one({"_id": f"{follower_id}:{followee_id}"})
+        if not result.deleted_count:
+            return False
+        await self.versions.bump("follows")
+        return True
+    
+    async def get_followers(self, user_id: str, limit: int = 100, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of edges to a user, newest first, starting after the `before` cursor"""
+        query = {"followee_id": user_id}
+        if before:
+            query.update(before_filter(before))
+        return await self.collection.find(query).sort(TIMELINE_SORT).limit(limit).to_list(limit)
+    
+    async def get_following(self, user_id: str, limit: int = 100, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of edges from a user, newest first, starting after the `before` cursor"""
+        query = {"follower_id": user_id}
+        if before:
+            query.update(before_filter(before))
+        return await self.collection.find(query).sort(TIMELINE_SORT).limit(limit).to_list(limit)
+    
+    def stream_follower_ids(self, user_id: str):
+        """Cursor over the edges to a user, only their follower ids, for fan-out"""
+        return self.collection.find({"followee_id": user_id}, {"follower_id": 1})
+    
+    async def get_celebrity_followees(self, user_id: str) -> List[str]:
+        """Ids of all the pull-path accounts a user follows"""
+        cursor = self.collection.find({"follower_id": user_id, "celebrity": True}, {"followee_id": 1})
+        return [edge["followee_id"] async for edge in cursor]
+    
+    async def get_followed_among(self, user_id: str, candidate_ids: Iterable[str]) -> Set[str]:
+        """Which of the candidate accounts a user follows"""
+        candidates = list(set(candidate_ids))
+        if not candidates:
+            return set()
+        cursor = self.collection.find({"follower_id": user_id, "followee_id": {"$in": candidates}}, {"followee_id": 1})
+        return {edge["followee_id"] for edge in await cursor.to_list(len(candidates))}
+    
+    async def mark_celebrity(self, user_id: str) -> None:
+        """Move every edge to a user onto the pull path"""
+        await self.collection.update_many({"followee_id": user_id}, {"$set": {"celebrity": True}})
+        await self.versions.bump("follows")
+
+
+class TimelineRepository:
+    """
+    Repository for materialized home timelines: one small entry per
+    (owner, post), written when a post is fanned out. Entries hold the
+    post's sort key and author, not the post, which is read at page time.
+    """
+    
+    INDEXES = {
+        "timelines": [
+            [("owner_id", 1), ("created_at", -1), ("post_id", -1)],
+            # Removing an account's posts on unfollow
+            [("owner_id", 1), ("author_id", 1)],
+        ],
+    }
+    
+    def __init__(self, db):
+        self.db = db
+        self.collection = db["timelines"]
+        self.versions = CollectionVersions(db)
+    
+    @staticmethod
+    def entry(owner_id: str, post: Dict[str, Any]) -> Dict[str, Any]:
+        return {
+            "_id": f"{owner_id}:{post['_id']}",
+            "owner_id": owner_id,
+            "post_id": post["_id"],
+            "author_id": post["author_id"],
+            "created_at": post.get("created_at")
+        }
+    
+    async def get_page(self, owner_id: str, limit: int = 100, before: Optional[str] = None) -> List[Dict[str, Any]]:
+        """A page of a home timeline, newest first: one range read on the owner's index prefix"""
+        query = {"owner_id": owner_id}
+        if before:
+            query.update(before_filter(before, id_field="post_id"))
+        return await self.collection.find(query).sort(HOME_SORT).limit(limit).to_list(limit)
+    
+    async def add(self, entries: List[Dict[str, Any]]) -> int:
+        """Insert entries in one unordered batch; entries already present are skipped"""
+        if not entries:
+            return 0
+        try:
+            await self.collection.insert_many(entries, ordered=False)
+            added = len(entries)
+        except BulkWriteError as e:
+            errors = e.details.get("writeErrors", [])
+            if any(error.get("code") != 11000 for error in errors):
+                raise
+            added = len(entries) - len(errors)
+        await self.versions.bump("timelines")
+        return added
+    
+    async def add_post(self, owner_ids: Iterable[str], post: Dict[str, Any]) -> int:
+        """Put one post on many timelines"""
+        return await self.add([self.entry(owner_id, post) for owner_id in owner_ids])
+    
+    async def add_posts(self, owner_id: str, posts: List[Dict[str, Any]]) -> int:
+        """Put many posts on one timeline"""
+        return await self.add([self.entry(owner_id, post) for post in posts])
+    
+    async def remove_author(self, owner_id: str, author_id: str) -> None:
+        """Take an account's posts off a timeline"""
+        await self.collection.delete_many({"owner_id": owner_id, "author_id": author_id})
+        await self.versions.bump("timelines")
@@ -0,0 +1,98 @@
+from typing import List, Optional, Dict, Any
+from pymongo import ReturnDocument
+from datetime import datetime, timedelta
+import uuid
+
+# Jobs in these states are picked up once their run_at has passed; for
+# "running" that means the worker holding the lease has gone away
+RUNNABLE = ["queued", "retrying", "running"]
+
+
+class JobRepository:
+    """
+    Repository for background jobs. A job is claimed by moving run_at
+    forward past its timeout, which doubles as a lease: if the process
+    running it dies, the job becomes runnable again when the lease ends.
+    Each claim also stores a fresh lease id, and an attempt's finish or
+    fail only applies while its lease id is still on the job, so a late
+    outcome from an attempt whose lease was taken over (or whose job was
+    re-enqueued, which restarts the attempt count) changes nothing.
+    """
+
+    INDEXES = {
+        "jobs": [
+            # Runnable jobs, oldest first, for the worker sweep
+            [("status", 1), ("run_at", 1)],
+        ],
+    }
+
+    def __init__(self, db):
+        self.db = db
+        self.collection = db["jobs"]
+
+    async def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": job_id})
+
+    async def enqueue(self, job_id: str, kind: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+        """Create or reset a job to run now"""
+        now = datetime.utcnow().isoformat()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id},
+            {
+                "$set": {
+                    "kind": kind, "payload": payload, "status": "queued", "attempts": 0, "lease_id": None,
+                    "run_at": now, "updated_at": now, "error": None, "result": None
+                },
+                "$setOnInsert": {"created_at": now}
+            },
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def get_runnable(self, limit: int) -> List[str]:
+        """Ids of jobs due to run, oldest first"""
+        now = datetime.utcnow().isoformat()
+        cursor = self.collection.find({"status": {"$in": RUNNABLE}, "run_at": {"$lte": now}}, {"_id": 1})
+        return [job["_id"] for job in await cursor.sort("run_at", 1).limit(limit).to_list(limit)]
+
+    async def claim(self, job_id: str, lease_seconds: float) -> Optional[Dict[str, Any]]:
+        """
+        Take a due job for one attempt; None if it is not due or another
+        worker has it. The returned job's lease_id identifies the attempt.
+        """
+        now = datetime.utcnow()
+        return await self.collection.find_one_and_update(
+            {"_id": job_id, "status": {"$in": RUNNABLE}, "run_at": {"$lte": now.isoformat()}},
+            {
+                "$set": {
+                    "status": "running",
+                    "lease_id": uuid.uuid4().hex,
+                    "run_at": (now + timedelta(seconds=lease_seconds)).isoformat(),
+                    "updated_at": now.isoformat()
+                },
+                "$inc": {"attempts": 1}
+            },
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def finish(self, job_id: str, lease_id: str, result: Any = None) -> bool:
+        """Record a successful attempt; False if that attempt no longer holds the job"""
+        outcome = await self.collection.update_one(
+            {"_id": job_id, "status": "running", "lease_id": lease_id},
+            {"$set": {"status": "succeeded", "result": result, "error": None, "updated_at": datetime.utcnow().isoformat()}}
+        )
+        return outcome.matched_count > 0
+
+    async def fail(self, job_id: str, lease_id: str, error: str, retry_in: Optional[float] = None) -> bool:
+        """
+        Record a failed attempt: retried after `retry_in` seconds, or failed
+        for good if None. False if that attempt no longer holds the job.
+        """
+        now = datetime.utcnow()
+        update = {"error": error, "updated_at": now.isoformat()}
+        if retry_in is None:
+            update["status"] = "failed"
+        else:
+            update.update(status="retrying", run_at=(now + timedelta(seconds=retry_in)).isoformat())
+        outcome = await self.collection.update_one({"_id": job_id, "status": "running", "lease_id": lease_id}, {"$set": update})
+        return outcome.matched_count > 0
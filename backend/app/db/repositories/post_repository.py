@@ -1,54 +1,175 @@
 from typing import List, Optional, Dict, Any
+from pymongo import ReturnDocument, UpdateOne
+from backend.app.db.pagination import THREAD_SORT, TIMELINE_SORT, after_filter, before_filter
+from backend.app.db.versions import CollectionVersions
 
 
 class PostRepository:
     """Repository for post data access"""
     
+    INDEXES = {
+        "posts": [
+            [("created_at", -1), ("_id", -1)],
+            [("author_id", 1), ("created_at", -1), ("_id", -1)],
+        ],
+        "comments": [
+            # Pages walk it forwards, previews backwards
+            [("post_id", 1), ("created_at", 1), ("_id", 1)],
+        ],
+    }
+    
+    TEXT_INDEXES = {
+        "posts": {"content": 1},
+    }
+    
     def __init__(self, db):
         self.db = db
         self.collection = db["posts"]
         self.comments_collection = db["comments"]
+        self.versions = CollectionVersions(db)
+    
+    async def get_all(
+        self, limit: int = 100, before: Optional[str] = None, projection: Optional[Dict[str, int]] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of posts (feed), newest first, starting after the `before` cursor"""
+        query = before_filter(before) if before else {}
+        if projection:
+            # The sort key is always needed to build the next cursor
+            projection = {**projection, "created_at": 1}
+        return await self.collection.find(query, projection).sort(TIMELINE_SORT).limit(limit).to_list(limit)
     
-    async def get_all(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all posts (feed)"""
-        return await self.collection.find().sort("_id", -1).to_list(limit)
+    def stream_all(self, before: Optional[str] = None, projection: Optional[Dict[str, int]] = None):
+        """Cursor over every post after the `before` cursor, newest first, for streaming with `async for`"""
+        query = before_filter(before) if before else {}
+        return self.collection.find(query, projection).sort(TIMELINE_SORT)
     
     async def get_by_id(self, post_id: str) -> Optional[Dict[str, Any]]:
         """Get post by ID"""
         return await self.collection.find_one({"_id": post_id})
     
-    async def get_by_user_id(self, user_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get posts by user ID"""
-        return await self.collection.find({"author_id": user_id}).sort("_id", -1).to_list(limit)
+    async def get_many(self, post_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Get many posts by ID with one $in query, keyed by ID"""
+        if not post_ids:
+            return {}
+        posts = await self.collection.find({"_id": {"$in": list(post_ids)}}).to_list(len(post_ids))
+        return {post["_id"]: post for post in posts}
+    
+    async def get_by_authors(
+        self, author_ids: List[str], limit: int = 100, before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of posts by any of several authors, newest first, starting after the `before` cursor"""
+        query = {"author_id": {"$in": list(author_ids)}}
+        if before:
+            query.update(before_filter(before))
+        return await self.collection.find(query).sort(TIMELINE_SORT).limit(limit).to_list(limit)
+    
+    async def get_by_user_id(
+        self, user_id: str, limit: int = 100, before: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """Get a page of posts by user ID, newest first, starting after the `before` cursor"""
+        query = {"author_id": user_id}
+        if before:
+            query.update(before_filter(before))
+        return await self.collection.find(query).sort(TIMELINE_SORT).limit(limit).to_list(limit)
+    
+    async def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over post content, best match first, with the relevance in `score`"""
+        cursor = self.collection.find({"$text": {"$search": text}}, {"score": {"$meta": "textScore"}})
+        return await cursor.sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
     
     async def create(self, post_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create new post"""
         await self.collection.insert_one(post_data)
+        await self.versions.bump("posts")
         return post_data
     
-    async def increment_likes(self, post_id: str) -> Optional[int]:
-        """Increment like count for a post"""
+    async def update_media_url(self, post_id: str, media_url: str, variants: Optional[Dict[str, Any]] = None) -> bool:
+        """Set the media URL of a post, and the resized variants of an image"""
         result = await self.collection.update_one(
-            {"_id": post_id},
-            {"$inc": {"likes": 1}}
+            {"_id": post_id}, {"$set": {"media_url": media_url, "media_variants": variants}}
         )
-        if result.matched_count == 0:
-            return None
-        post = await self.get_by_id(post_id)
-        return post["likes"] if post else None
+        await self.versions.bump("posts")
+        return result.matched_count > 0
     
-    async def increment_comments(self, post_id: str) -> None:
-        """Increment comment count for a post"""
-        await self.collection.update_one(
+    async def increment_likes(self, post_id: str) -> Optional[int]:
+        """Increment like count for a post and return the new count"""
+        post = await self.collection.find_one_and_update(
             {"_id": post_id},
-            {"$inc": {"comments": 1}}
+            {"$inc": {"likes": 1}},
+            projection={"likes": 1},
+            return_document=ReturnDocument.AFTER
         )
+        await self.versions.bump("posts")
+        return post["likes"] if post else None
+    
+    async def get_likes(self, post_id: str) -> Optional[int]:
+        """Get the stored like count of a post, or None if it does not exist"""
+        post = await self.collection.find_one({"_id": post_id}, {"likes": 1})
+        return post.get("likes", 0) if post else None
+    
+    async def apply_like_deltas(self, deltas: Dict[str, int]) -> None:
+        """Add accumulated like deltas to many posts in one bulk write"""
+        if deltas:
+            await self.collection.bulk_write(
+                [UpdateOne({"_id": post_id}, {"$inc": {"likes": delta}}) for post_id, delta in deltas.items()],
+                ordered=False
+            )
+            await self.versions.bump("posts")
+    
+    async def get_comments(self, post_id: str, limit: int = 100, after: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Get a page of comments for a post, oldest first, starting after the `after` cursor"""
+        query = {"post_id": post_id}
+        if after:
+            query.update(after_filter(after))
+        return await self.comments_collection.find(query).sort(THREAD_SORT).limit(limit).to_list(limit)
     
-    async def get_comments(self, post_id: str, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get comments for a post"""
-        return await self.comments_collection.find({"post_id": post_id}).sort("created_at", 1).to_list(limit)
+    async def get_comment_previews(self, post_ids: List[str], per_post: int) -> Dict[str, List[Dict[str, Any]]]:
+        """
+        The latest `per_post` comments of each post, newest first, in one
+        aggregation. $topN keeps only the top comments per post while
+        grouping (MongoDB 5.2+), so a busy thread costs no more memory than
+        a quiet one. Posts without comments are absent from the result.
+        """
+        if not post_ids or per_post < 1:
+            return {}
+        pipeline = [
+            {"$match": {"post_id": {"$in": list(post_ids)}}},
+            {"$group": {
+                "_id": "$post_id",
+                "comments": {"$topN": {
+                    "n": per_post,
+                    "sortBy": {"created_at": -1, "_id": -1},
+                    "output": "$$ROOT"
+                }}
+            }},
+        ]
+        groups = await self.comments_collection.aggregate(pipeline).to_list(None)
+        return {group["_id"]: group["comments"] for group in groups}
     
-    async def create_comment(self, comment_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create new comment"""
-        await self.comments_collection.insert_one(comment_data)
+    def stream_comments(self, post_id: str):
+        """Cursor over every comment of a post, oldest first, for streaming with `async for`"""
+        return self.comments_collection.find({"post_id": post_id}).sort(THREAD_SORT)
+    
+    async def add_comment(self, comment_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """
+        Create a comment and bump its post's comment count.
+        
+        The counter update comes first and doubles as the existence check,
+        so nothing is written for a missing post; returns None then. The
+        count is taken back if the comment cannot be inserted.
+        """
+        post_id = comment_data["post_id"]
+        post = await self.collection.find_one_and_update(
+            {"_id": post_id},
+            {"$inc": {"comments": 1}},
+            projection={"_id": 1}
+        )
+        if post is None:
+            return None
+        try:
+            await self.comments_collection.insert_one(comment_data)
+        except Exception:
+            await self.collection.update_one({"_id": post_id}, {"$inc": {"comments": -1}})
+            raise
+        await self.versions.bump("posts", "comments")
         return comment_data
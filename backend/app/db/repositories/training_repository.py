@@ -1,21 +1,181 @@
-from typing import List, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
+from pymongo import UpdateOne
+from backend.app.db.versions import CollectionVersions
+
+# Catalog orderings, each with _id as the tie-breaker
+CATALOG_SORTS = {
+    "latest": [("created_at", -1), ("_id", -1)],
+    "most_viewed": [("view_count", -1), ("_id", -1)],
+}
+
+_COUNT_SUFFIXES = [(1_000_000_000, "B"), (1_000_000, "M"), (1_000, "K")]
+
+
+def format_count(count: int) -> str:
+    """Display form of a view count: 980, 1.2K, 3.5M"""
+    for scale, suffix in _COUNT_SUFFIXES:
+        if count >= scale:
+            return f"{count / scale:.1f}".rstrip("0").rstrip(".") + suffix
+    return str(count)
+
+
+def parse_count(display: Any) -> int:
+    """Inverse of format_count, for documents that only have the display string"""
+    text = str(display or "0").strip().upper()
+    for scale, suffix in _COUNT_SUFFIXES:
+        if text.endswith(suffix):
+            return int(float(text[:-1]) * scale)
+    try:
+        return int(float(text))
+    except ValueError:
+        return 0
 
 
 class TrainingRepository:
-    """Repository for training video data access"""
+    """
+    Repository for training video data access. `view_count` is the
+    numeric counter; `views` is its display form, rewritten whenever view
+    deltas are flushed. Per-category video counts are kept in
+    training_facets, incremented as videos are inserted.
+    """
+    
+    INDEXES = {
+        "training_videos": [
+            # Catalog filtered by category (multikey: one entry per category) or author, in each ordering
+            [("categories", 1), ("created_at", -1), ("_id", -1)],
+            [("categories", 1), ("view_count", -1), ("_id", -1)],
+            [("author", 1), ("created_at", -1), ("_id", -1)],
+            [("author", 1), ("view_count", -1), ("_id", -1)],
+            [("created_at", -1), ("_id", -1)],
+            [("view_count", -1), ("_id", -1)],
+        ],
+        "training_facets": [
+            [("field", 1), ("count", -1)],
+        ],
+    }
+    
+    TEXT_INDEXES = {
+        "training_videos": {"title": 5, "author": 3, "description": 1},
+    }
     
     def __init__(self, db):
         self.db = db
         self.collection = db["training_videos"]
+        self.facets = db["training_facets"]
+        self.versions = CollectionVersions(db)
     
-    async def get_all(self, limit: int = 100) -> List[Dict[str, Any]]:
-        """Get all training videos"""
-        return await self.collection.find().sort("_id", -1).to_list(limit)
+    async def get_all(
+        self,
+        limit: int = 100,
+        category: Optional[str] = None,
+        author: Optional[str] = None,
+        sort: str = "latest"
+    ) -> List[Dict[str, Any]]:
+        """Get training videos, optionally in one category and/or by one author"""
+        query = {}
+        if category:
+            query["categories"] = category
+        if author:
+            query["author"] = author
+        return await self.collection.find(query).sort(CATALOG_SORTS[sort]).limit(limit).to_list(limit)
+    
+    async def get_by_id(self, video_id: str) -> Optional[Dict[str, Any]]:
+        """Get training video by ID"""
+        return await self.collection.find_one({"_id": video_id})
+    
+    async def exists(self, video_id: str) -> bool:
+        return await self.collection.find_one({"_id": video_id}, {"_id": 1}) is not None
+    
+    async def search(self, text: str, limit: int = 20) -> List[Dict[str, Any]]:
+        """Full-text search over training videos, best match first, with the relevance in `score`"""
+        cursor = self.collection.find({"$text": {"$search": text}}, {"score": {"$meta": "textScore"}})
+        return await cursor.sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
     
     async def create(self, video_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Create new training video"""
+        """Create new training video and count it in its categories' facets"""
         await self.collection.insert_one(video_data)
+        await self._count_categories(video_data.get("categories") or [], 1)
+        await self.versions.bump("training_videos", "training_facets")
         return video_data
+    
+    async def _count_categories(self, categories: Iterable[str], delta: int) -> None:
+        requests = [
+            UpdateOne(
+                {"_id": f"categories:{category}"},
+                {"$inc": {"count": delta}, "$setOnInsert": {"field": "categories", "value": category}},
+                upsert=True
+            )
+            for category in set(categories)
+        ]
+        if requests:
+            await self.facets.bulk_write(requests, ordered=False)
+    
+    async def get_category_facets(self) -> List[Dict[str, Any]]:
+        """Videos per category, most populated first"""
+        cursor = self.facets.find({"field": "categories", "count": {"$gt": 0}}, {"_id": 0, "value": 1, "count": 1})
+        return await cursor.sort([("count", -1), ("value", 1)]).to_list(None)
+    
+    async def rebuild_facets(self) -> None:
+        """Recount category facets from the videos themselves, for data written around create()"""
+        counts = await self.collection.aggregate([
+            {"$unwind": "$categories"},
+            {"$group": {"_id": "$categories", "count": {"$sum": 1}}}
+        ]).to_list(None)
+        # Counts are overwritten in place and only vanished values deleted, so
+        # readers never see the facets empty
+        if counts:
+            await self.facets.bulk_write([
+                UpdateOne(
+                    {"_id": f"categories:{row['_id']}"},
+                    {"$set": {"field": "categories", "value": row["_id"], "count": row["count"]}},
+                    upsert=True
+                )
+                for row in counts
+            ], ordered=False)
+        await self.facets.delete_many({"field": "categories", "value": {"$nin": [row["_id"] for row in counts]}})
+        await self.versions.bump("training_facets")
+    
+    async def apply_view_deltas(self, deltas: Dict[str, int]) -> None:
+        """Add accumulated view deltas in one bulk write, then refresh the display counts of those videos"""
+        if not deltas:
+            return
+        await self.collection.bulk_write(
+            [UpdateOne({"_id": video_id}, {"$inc": {"view_count": delta}}) for video_id, delta in deltas.items()],
+            ordered=False
+        )
+        cursor = self.collection.find({"_id": {"$in": list(deltas)}}, {"view_count": 1})
+        counted = await cursor.to_list(len(deltas))
+        if counted:
+            await self.collection.bulk_write(
+                [UpdateOne({"_id": video["_id"]}, {"$set": {"views": format_count(video["view_count"])}}) for video in counted],
+                ordered=False
+            )
+        await self.versions.bump("training_views")
+    
+    async def backfill_view_counts(self) -> int:
+        """Give videos stored with only a display `views` string their numeric view_count"""
+        # Equality with null matches a missing field and, unlike $exists, can use the view_count index
+        cursor = self.collection.find({"view_count": None}, {"views": 1})
+        videos = await cursor.to_list(None)
+        if videos:
+            await self.collection.bulk_write(
+                [UpdateOne({"_id": video["_id"]}, {"$set": {"view_count": parse_count(video.get("views"))}}) for video in videos],
+                ordered=False
+            )
+            await self.versions.bump("training_videos")
+        return len(videos)
+    
+    async def update_video_url(self, video_id: str, video_url: str) -> bool:
+        """Point a training video at an uploaded file"""
+        result = await self.collection.update_one({"_id": video_id}, {"$set": {"video_url": video_url, "type": "file"}})
+        await self.versions.bump("training_videos")
+        return result.matched_count > 0
+    
+    async def update_metadata(self, video_id: str, metadata: Dict[str, Any]) -> bool:
+        """Record duration and resolution read from an uploaded file"""
+        result = await self.collection.update_one({"_id": video_id}, {"$set": metadata})
+        await self.versions.bump("training_videos")
+        return result.matched_count > 0
 
 
 class OpportunityRepository:
@@ -0,0 +1,73 @@
+from typing import List, Optional, Dict, Any
+from pymongo import ReturnDocument
+
+
+class UploadSessionRepository:
+    """
+    Repository for resumable upload sessions. A session records the
+    storage multipart upload behind it and each part received so far,
+    under `parts.<number>`, so an interrupted upload can be resumed from
+    any API instance. Completion claims the session by moving its state
+    to "completing", and a completed session is kept until it expires so
+    that a retried completion can answer with the same video. Sessions
+    are read by _id, apart from the periodic sweep of expired ones.
+    """
+    
+    INDEXES = {
+        "upload_sessions": [
+            # Expired sessions, for the sweep
+            [("expires_at", 1)],
+        ],
+    }
+    
+    def __init__(self, db):
+        self.db = db
+        self.collection = db["upload_sessions"]
+    
+    async def create(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        await self.collection.insert_one(session)
+        return session
+    
+    async def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        return await self.collection.find_one({"_id": upload_id})
+    
+    async def record_part(self, upload_id: str, part_number: int, etag: str, size: int) -> Optional[Dict[str, Any]]:
+        """Record a stored part (replacing an earlier copy of it) and return the updated session"""
+        return await self.collection.find_one_and_update(
+            {"_id": upload_id},
+            {"$set": {f"parts.{part_number}": {"etag": etag, "size": size}}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def claim(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        """Move a session to "completing"; None if another request is completing it or already has"""
+        return await self.collection.find_one_and_update(
+            {"_id": upload_id, "state": {"$nin": ["completing", "completed"]}},
+            {"$set": {"state": "completing"}},
+            return_document=ReturnDocument.AFTER
+        )
+    
+    async def record_assembled(self, upload_id: str, video_url: str) -> None:
+        """Remember the assembled object, so a retried completion does not assemble it again"""
+        await self.collection.update_one({"_id": upload_id}, {"$set": {"video_url": video_url}})
+    
+    async def release(self, upload_id: str) -> None:
+        """Give up a claim after a failed completion, so it can be retried"""
+        await self.collection.update_one({"_id": upload_id, "state": "completing"}, {"$set": {"state": "uploading"}})
+    
+    async def mark_completed(self, upload_id: str) -> None:
+        await self.collection.update_one({"_id": upload_id}, {"$set": {"state": "completed"}})
+    
+    async def get_expired(self, now: str, limit: int) -> List[Dict[str, Any]]:
+        """Sessions that expired before `now`, oldest first"""
+        cursor = self.collection.find({"expires_at": {"$lt": now}})
+        return await cursor.sort("expires_at", 1).limit(limit).to_list(limit)
+    
+    async def delete_in_state(self, upload_id: str, state: Optional[str]) -> bool:
+        """Delete a session unless its state has changed since it was read"""
+        result = await self.collection.delete_one({"_id": upload_id, "state": state})
+        return result.deleted_count > 0
+    
+    async def delete(self, upload_id: str) -> bool:
+        result = await self.collection.delete_one({"_id": upload_id})
+        return result.deleted_count > 0
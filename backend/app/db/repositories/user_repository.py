@@ -1,40 +1,232 @@
-from typing import List, Optional, Dict, Any
+from typing import List, Optional, Dict, Any, Iterable
+from pymongo import ReturnDocument
+from backend.app.core.config import get_settings
+from backend.app.db.versions import CollectionVersions
+from backend.app.infrastructure.cache import TTLCache
+from backend.app.infrastructure.prefix_index import PrefixIndex
+import asyncio
+import time
+
+settings = get_settings()
+
+# Fields embedded as the author of a post
+AUTHOR_SUMMARY_FIELDS = {"name": 1, "headline": 1, "profile_image": 1, "profile_image_variants": 1}
+
+# Shared by every request in the process; kept fresh by update()
+author_summary_cache = TTLCache(settings.author_cache_size, settings.author_cache_ttl_seconds)
+
+# Full user documents, for CachedUserRepository
+user_cache = TTLCache(settings.user_cache_size, settings.user_cache_ttl_seconds)
+
+# Fields a typeahead suggestion is built from
+SUGGEST_FIELDS = {"name": 1, "sport": 1, "academy": 1, "profile_image": 1, "skills": 1}
+
+
+class UserSuggestions:
+    """
+    Typeahead over user names and academies, ranked by total skill
+    endorsements. Loaded from the users collection on first use and kept
+    current by this process's writes; rebuilt every SUGGEST_REBUILD_SECONDS
+    to pick up writes from other instances.
+    """
+    
+    def __init__(self):
+        self.index = PrefixIndex()
+        self.loaded_at: Optional[float] = None
+        self.lock = asyncio.Lock()
+    
+    @staticmethod
+    def entry(user: Dict[str, Any]):
+        endorsements = sum(skill.get("endorsements", 0) for skill in user.get("skills") or [])
+        payload = {
+            "_id": user["_id"],
+            "name": user.get("name"),
+            "sport": user.get("sport"),
+            "academy": user.get("academy"),
+            "profile_image": user.get("profile_image"),
+            "endorsements": endorsements,
+        }
+        return (endorsements, user.get("name") or ""), payload
+    
+    def upsert(self, user: Dict[str, Any]) -> None:
+        """Reindex a user; a no-op until the index has been loaded"""
+        if self.loaded_at is not None:
+            rank, payload = self.entry(user)
+            self.index.add(user["_id"], [user.get("name"), user.get("academy")], rank, payload)
+    
+    async def load(self, collection) -> None:
+        """Build the index from the database unless a fresh one is loaded"""
+        if self.loaded_at is not None and time.monotonic() - self.loaded_at < settings.suggest_rebuild_seconds:
+            return
+        async with self.lock:
+            if self.loaded_at is not None and time.monotonic() - self.loaded_at < settings.suggest_rebuild_seconds:
+                return
+            entries = []
+            async for user in collection.find({}, SUGGEST_FIELDS):
+                rank, payload = self.entry(user)
+                entries.append((user["_id"], [user.get("name"), user.get("academy")], rank, payload))
+            index = PrefixIndex()
+            index.load(entries)
+            # Swap in whole, so lookups during a rebuild use the previous index
+            self.index, self.loaded_at = index, time.monotonic()
+    
+    def search(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        return self.index.search(prefix, limit)
+
+
+user_suggestions = UserSuggestions()
 
 
 class UserRepository:
     """Repository for user data access"""
     
+    TEXT_INDEXES = {
+        "users": {"name": 10, "headline": 4, "sport": 3, "academy": 3, "location": 2},
+    }
+    
     def __init__(self, db):
         self.db = db
         self.collection = db["users"]
+        self.versions = CollectionVersions(db)
+    
+    async def get_all(self, limit: int = 1000, projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Get all users, optionally only the projected fields"""
+        return await self.collection.find({}, projection).to_list(limit)
     
-    async def get_all(self, limit: int = 1000) -> List[Dict[str, Any]]:
-        """Get all users"""
-        return await self.collection.find().to_list(limit)
+    def stream_all(self, projection: Optional[Dict[str, int]] = None):
+        """Cursor over every user, for streaming with `async for`"""
+        return self.collection.find({}, projection)
     
-    async def get_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user by ID"""
-        return await self.collection.find_one({"_id": user_id})
+    async def get_by_id(self, user_id: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """Get user by ID, optionally only the projected fields"""
+        return await self.collection.find_one({"_id": user_id}, projection)
+    
+    async def search(self, text: str, limit: int = 20, projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
+        """Full-text search over users, best match first, with the relevance in `score`"""
+        projection = {**(projection or {}), "score": {"$meta": "textScore"}}
+        cursor = self.collection.find({"$text": {"$search": text}}, projection)
+        return await cursor.sort([("score", {"$meta": "textScore"})]).limit(limit).to_list(limit)
+    
+    async def suggest(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Users whose name or academy has a word starting with prefix, most endorsed first"""
+        await user_suggestions.load(self.collection)
+        return user_suggestions.search(prefix, limit)
+    
+    async def get_author_summaries(self, user_ids: Iterable[str]) -> Dict[str, Dict[str, Any]]:
+        """Get name, headline and profile image for many users, from cache or one $in query"""
+        summaries = {}
+        missing = []
+        for user_id in set(user_ids):
+            summary = author_summary_cache.get(user_id)
+            if summary is None:
+                missing.append(user_id)
+            else:
+                summaries[user_id] = summary
+        if missing:
+            cursor = self.collection.find({"_id": {"$in": missing}}, AUTHOR_SUMMARY_FIELDS)
+            for summary in await cursor.to_list(len(missing)):
+                author_summary_cache.set(summary["_id"], summary)
+                summaries[summary["_id"]] = summary
+        return summaries
     
     async def create(self, user_data: Dict[str, Any]) -> Dict[str, Any]:
         """Create new user"""
         await self.collection.insert_one(user_data)
+        await self.versions.bump("users")
+        user_suggestions.upsert(user_data)
         return user_data
     
     async def update(self, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
-        """Update user"""
-        result = await self.collection.update_one(
+        """Update user and return the updated document"""
+        user = await self.collection.find_one_and_update(
             {"_id": user_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.AFTER
+        )
+        await self.versions.bump("users")
+        if user is None:
+            return None
+        author_summary_cache.invalidate(user_id)
+        user_suggestions.upsert(user)
+        return user
+    
+    async def adjust_follow_counts(self, follower_id: str, followee_id: str, delta: int) -> Optional[int]:
+        """Add delta to both sides' follow counters; returns the followee's new follower count"""
+        # The two counters are independent writes; only the version bump must wait for both
+        followee, _ = await asyncio.gather(
+            self.collection.find_one_and_update(
+                {"_id": followee_id},
+                {"$inc": {"followers_count": delta}},
+                projection={"followers_count": 1},
+                return_document=ReturnDocument.AFTER
+            ),
+            self.collection.update_one({"_id": follower_id}, {"$inc": {"following_count": delta}})
         )
-        if result.matched_count == 0:
+        await self.versions.bump("users")
+        return followee["followers_count"] if followee else None
+    
+    async def update_profile_image(
+        self, user_id: str, image_url: str, variants: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Update user's profile image and its resized variants"""
+        return await self.update(user_id, {"profile_image": image_url, "profile_image_variants": variants})
+    
+    async def update_cover_image(
+        self, user_id: str, image_url: str, variants: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Update user's cover image and its resized variants"""
+        return await self.update(user_id, {"cover_image": image_url, "cover_image_variants": variants})
+
+
+class CachedUserRepository(UserRepository):
+    """
+    UserRepository with a read-through LRU/TTL cache in front of get_by_id.
+    
+    Writes through this repository invalidate the cached document. The
+    cache is per process, so other instances of the API see a change once
+    their TTL expires.
+    """
+    
+    def __init__(self, db, cache: Optional[TTLCache] = None):
+        super().__init__(db)
+        self.cache = cache if cache is not None else user_cache
+    
+    async def get_by_id(self, user_id: str, projection: Optional[Dict[str, int]] = None) -> Optional[Dict[str, Any]]:
+        """
+        Get user by ID, from cache when possible. Only full documents are
+        cached; a projected read is cut from a cached document on a hit and
+        goes to the database uncached on a miss.
+        """
+        user = self.cache.get(user_id)
+        if user is not None:
+            # Hand out copies so callers cannot alter the cached document
+            if projection:
+                return {key: value for key, value in user.items() if key == "_id" or key in projection}
+            return dict(user)
+        if projection:
+            return await super().get_by_id(user_id, projection)
+        user = await super().get_by_id(user_id)
+        if user is None:
             return None
-        return await self.get_by_id(user_id)
+        self.cache.set(user_id, user)
+        return dict(user)
     
-    async def update_profile_image(self, user_id: str, image_url: str) -> Optional[Dict[str, Any]]:
-        """Update user's profile image"""
-        return await self.update(user_id, {"profile_image": image_url})
+    async def update(self, user_id: str, update_data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Update user and drop its cached document"""
+        user = await super().update(user_id, update_data)
+        self.cache.invalidate(user_id)
+        return user
     
-    async def update_cover_image(self, user_id: str, image_url: str) -> Optional[Dict[str, Any]]:
-        """Update user's cover image"""
-        return await self.update(user_id, {"cover_image": image_url})
+    async def adjust_follow_counts(self, follower_id: str, followee_id: str, delta: int) -> Optional[int]:
+        """Adjust follow counters and drop both cached documents"""
+        count = await super().adjust_follow_counts(follower_id, followee_id, delta)
+        self.cache.invalidate(follower_id)
+        self.cache.invalidate(followee_id)
+        return count
+
+
+def get_user_repository(db) -> UserRepository:
+    """The user repository for a request, cached unless USER_CACHE_ENABLED is off"""
+    if settings.user_cache_enabled:
+        return CachedUserRepository(db)
+    return UserRepository(db)
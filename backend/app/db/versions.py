@@ -0,0 +1,46 @@
+"""
+Collection version counters.
+
+Every repository write bumps the version of the collections it touched,
+in a small shared `collection_versions` collection. Read endpoints derive
+their ETags from these versions, so revalidating an unchanged list costs
+one tiny lookup instead of a full query and serialization. The counters
+live in the database rather than the process, so every API instance
+sees the same versions.
+"""
+from typing import Dict, Tuple
+from pymongo import UpdateOne
+import uuid
+
+VERSIONS_COLLECTION = "collection_versions"
+
+
+class CollectionVersions:
+    """Read and bump per-collection version counters"""
+    
+    def __init__(self, db):
+        self.collection = db[VERSIONS_COLLECTION]
+    
+    async def get(self, *names: str) -> Dict[str, Tuple[str, int]]:
+        """(epoch, version) per collection; unversioned collections are omitted"""
+        documents = await self.collection.find({"_id": {"$in": list(names)}}).to_list(len(names))
+        return {doc["_id"]: (doc.get("epoch"), doc.get("version", 0)) for doc in documents}
+    
+    async def bump(self, *names: str) -> None:
+        """
+        Mark collections as changed. Call only once the write has completed:
+        a version bumped earlier can be read alongside the old data, and the
+        stale body would then be cached under the new ETag.
+        """
+        # A random epoch keeps versions unique if the counters are ever reset
+        await self.collection.bulk_write(
+            [
+                UpdateOne(
+                    {"_id": name},
+                    {"$inc": {"version": 1}, "$setOnInsert": {"epoch": uuid.uuid4().hex}},
+                    upsert=True
+                )
+                for name in names
+            ],
+            ordered=False
+        )
@@ -0,0 +1,167 @@
+"""
+Image variants rendered at upload time.
+
+An uploaded image is decoded once and downscaled to each entry of VARIANTS
+(longest edge, never upscaled), and every size is encoded as both WebP and
+JPEG. Decoding and encoding are CPU bound and hold the GIL, so they run in
+a process pool of IMAGE_WORKERS processes rather than on the event loop or
+the upload threads. Pillow is imported in the workers only.
+"""
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional, Tuple
+from fastapi import HTTPException
+from backend.app.core.config import get_settings
+import asyncio
+import multiprocessing
+
+settings = get_settings()
+
+# Leading bytes fetched from storage to read an image's dimensions
+HEADER_BYTES = 256 * 1024
+
+# Variant name -> longest edge in pixels, largest first
+VARIANTS = {"full": 1600, "medium": 640, "thumb": 160}
+
+# Encoded formats -> (Pillow format, content type, file extension)
+FORMATS = {
+    "webp": ("WEBP", "image/webp", "webp"),
+    "jpeg": ("JPEG", "image/jpeg", "jpg"),
+}
+
+IMAGE_TYPES = {"image/jpeg", "image/jpg", "image/png", "image/webp"}
+
+# Largest image decoded. Pillow only warns above MAX_IMAGE_PIXELS and
+# refuses at twice that, so the size is checked explicitly from the header
+MAX_PIXELS = 50_000_000
+
+# variant -> {"width", "height", format -> encoded bytes}
+Rendered = Dict[str, Dict[str, object]]
+
+
+class InvalidImage(ValueError):
+    pass
+
+
+def read_dimensions(head: bytes) -> Optional[Tuple[int, int]]:
+    """(width, height) from the leading bytes of an image, or None if they do not hold its header; runs in a worker process"""
+    from io import BytesIO
+    from PIL import Image
+    # Only the header is parsed; the size is judged by the caller
+    Image.MAX_IMAGE_PIXELS = None
+    try:
+        with Image.open(BytesIO(head)) as image:
+            return image.size
+    except Exception:
+        return None
+
+
+def render_variants(data: bytes, quality: int = 82) -> Rendered:
+    """Decode an image once and encode every variant; runs in a worker process"""
+    from io import BytesIO
+    from PIL import Image, ImageOps
+    Image.MAX_IMAGE_PIXELS = MAX_PIXELS
+    try:
+        image = Image.open(BytesIO(data))
+    except Exception as e:
+        raise InvalidImage("Not a readable image") from e
+    # Only the header has been read; refuse decompression bombs before decoding
+    if image.width * image.height > MAX_PIXELS:
+        raise InvalidImage(f"Image too large (max {MAX_PIXELS} pixels)")
+    try:
+        # Phone photos are stored sideways with an EXIF rotation
+        image = ImageOps.exif_transpose(image)
+        image.load()
+    except Exception as e:
+        raise InvalidImage("Not a readable image") from e
+    if image.mode not in ("RGB", "RGBA"):
+        image = image.convert("RGBA" if "transparency" in image.info or image.mode in ("LA", "PA") else "RGB")
+
+    rendered: Rendered = {}
+    # Each size is scaled from the previous one, which is cheaper than the original
+    current = image
+    for name, edge in VARIANTS.items():
+        if max(current.size) > edge:
+            current = current.copy()
+            current.thumbnail((edge, edge), Image.LANCZOS)
+        variant = {"width": current.width, "height": current.height}
+        for key, (pillow_format, _, _) in FORMATS.items():
+            out = BytesIO()
+            if pillow_format == "JPEG" and current.mode != "RGB":
+                # JPEG has no alpha; flatten onto white
+                flat = Image.new("RGB", current.size, (255, 255, 255))
+                flat.paste(current, mask=current.getchannel("A"))
+                flat.save(out, pillow_format, quality=quality, optimize=True, progressive=True)
+            elif pillow_format == "JPEG":
+                current.save(out, pillow_format, quality=quality, optimize=True, progressive=True)
+            else:
+                current.save(out, pillow_format, quality=quality, method=4)
+            variant[key] = out.getvalue()
+        rendered[name] = variant
+    return rendered
+
+
+class ImageProcessor:
+    """Renders image variants in a lazily started process pool"""
+
+    def __init__(self, workers: int, quality: int):
+        self.workers = workers
+        self.quality = quality
+        self.pool: Optional[ProcessPoolExecutor] = None
+
+    async def render(self, data: bytes) -> Rendered:
+        """Variants of an image; raises 400 if it cannot be decoded"""
+        try:
+            return await self._run(render_variants, data, self.quality)
+        except InvalidImage as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+    async def dimensions(self, head: bytes) -> Optional[Tuple[int, int]]:
+        """(width, height) read from an image's leading bytes, or None if they do not hold its header"""
+        return await self._run(read_dimensions, head)
+
+    async def _run(self, function, *args):
+        if self.pool is None:
+            # spawn: forking a process that runs an event loop and driver threads is unsafe
+            self.pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn"))
+        pool = self.pool
+        loop = asyncio.get_running_loop()
+        try:
+            return await loop.run_in_executor(pool, function, *args)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed for memory); start a fresh pool on the next render
+            print("⚠ Image worker pool broke, restarting it")
+            if self.pool is pool:
+                self.pool = None
+                pool.shutdown(wait=False)
+            raise HTTPException(status_code=503, detail="Image processing unavailable, please retry")
+
+    def shutdown(self):
+        if self.pool is not None:
+            self.pool.shutdown(wait=True)
+            self.pool = None
+
+
+def variant_key(key: str, variant: str, format_key: str) -> str:
+    """Object key of a variant stored alongside the original: covers/u1_cover.jpg -> covers/u1_cover_thumb.webp"""
+    stem = key.rsplit(".", 1)[0] if "." in key.rsplit("/", 1)[-1] else key
+    return f"{stem}_{variant}.{FORMATS[format_key][2]}"
+
+
+def variant_objects(key: str, rendered: Rendered) -> Tuple[Dict[str, Tuple[bytes, str]], Dict[str, Dict[str, object]]]:
+    """
+    The objects to store for rendered variants (key -> (bytes, content type))
+    and the variants description kept on the owning document, with object
+    keys in place of URLs.
+    """
+    objects, described = {}, {}
+    for name, variant in rendered.items():
+        described[name] = {"width": variant["width"], "height": variant["height"]}
+        for format_key, (_, content_type, _) in FORMATS.items():
+            object_key = variant_key(key, name, format_key)
+            objects[object_key] = (variant[format_key], content_type)
+            described[name][format_key] = object_key
+    return objects, described
+
+
+image_processor = ImageProcessor(settings.image_workers, settings.image_quality)
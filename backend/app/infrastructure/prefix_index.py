@@ -0,0 +1,130 @@
+"""In-process prefix index for typeahead suggestions"""
+from bisect import bisect_left, insort
+from heapq import nlargest
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Set, Tuple
+import unicodedata
+
+
+def normalize(text: str) -> str:
+    """Case- and accent-insensitive form of a string, with whitespace collapsed"""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    return " ".join("".join(c for c in decomposed if not unicodedata.combining(c)).split())
+
+
+def index_terms(texts: Iterable[Optional[str]]) -> Set[str]:
+    """Every word of each text, plus each whole text so multi-word prefixes match"""
+    terms = set()
+    for text in texts:
+        if text:
+            text = normalize(text)
+            terms.add(text)
+            terms.update(text.split())
+    terms.discard("")
+    return terms
+
+
+class PrefixIndex:
+    """
+    Sorted array of (term, item id) pairs. A prefix lookup is a bisect to
+    the first matching term plus a walk over the matching run, and the best
+    `top_k` items of each prefix looked up are memoized, so repeated
+    keystrokes are dictionary lookups. Writes patch the memoized lists they
+    affect in place where they can, and drop them where they cannot.
+    """
+
+    def __init__(self, top_k: int = 10, max_prefixes: int = 10000):
+        self.top_k = top_k
+        self.max_prefixes = max_prefixes
+        self.terms: List[Tuple[str, Hashable]] = []
+        self.items: Dict[Hashable, Tuple[Any, Any, List[str]]] = {}
+        self.top: Dict[str, List[Hashable]] = {}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def load(self, entries: Iterable[Tuple[Hashable, Iterable[Optional[str]], Any, Any]]) -> None:
+        """
+        Replace the contents with (item id, texts, rank, payload) entries in
+        one sort, and precompute the single-character prefixes, which match
+        the most items and would be the slowest to compute on demand.
+        """
+        self.clear()
+        for item_id, texts, rank, payload in entries:
+            terms = index_terms(texts)
+            self.terms.extend((term, item_id) for term in terms)
+            self.items[item_id] = (rank, payload, sorted(terms))
+        self.terms.sort()
+        for initial in {term[0] for term, _ in self.terms}:
+            self.top[initial] = self._best(initial)
+
+    def add(self, item_id: Hashable, texts: Iterable[Optional[str]], rank: Any, payload: Any) -> None:
+        """Index an item under its texts, replacing any previous entry"""
+        terms = index_terms(texts)
+        old = self.items.get(item_id)
+        if old is not None:
+            self._unlink(item_id, old[2])
+        for term in terms:
+            insort(self.terms, (term, item_id))
+        self.items[item_id] = (rank, payload, sorted(terms))
+
+        for prefix in self._memoized(terms.union(old[2] if old else ())):
+            ids = self.top[prefix]
+            matches = any(term.startswith(prefix) for term in terms)
+            if item_id in ids:
+                if matches and rank >= old[0]:
+                    ids.sort(key=self._rank, reverse=True)
+                else:
+                    # Something outside the list may now outrank it
+                    del self.top[prefix]
+            elif matches and (len(ids) < self.top_k or rank > self._rank(ids[-1])):
+                ids.append(item_id)
+                ids.sort(key=self._rank, reverse=True)
+                del ids[self.top_k:]
+
+    def remove(self, item_id: Hashable) -> None:
+        entry = self.items.pop(item_id, None)
+        if entry is None:
+            return
+        self._unlink(item_id, entry[2])
+        for prefix in self._memoized(entry[2]):
+            if item_id in self.top[prefix]:
+                del self.top[prefix]
+
+    def clear(self) -> None:
+        self.terms.clear()
+        self.items.clear()
+        self.top.clear()
+
+    def search(self, prefix: str, limit: int = 10) -> List[Any]:
+        """Payloads of the highest ranked items with a term starting with prefix"""
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        ids = self.top.get(prefix)
+        if ids is None:
+            ids = self._best(prefix)
+            if len(self.top) >= self.max_prefixes:
+                self.top.clear()
+            self.top[prefix] = ids
+        return [self.items[item_id][1] for item_id in ids[:min(limit, self.top_k)]]
+
+    def _rank(self, item_id: Hashable) -> Any:
+        return self.items[item_id][0]
+
+    def _best(self, prefix: str) -> List[Hashable]:
+        matches = set()
+        i = bisect_left(self.terms, (prefix,))
+        while i < len(self.terms) and self.terms[i][0].startswith(prefix):
+            matches.add(self.terms[i][1])
+            i += 1
+        return nlargest(self.top_k, matches, key=self._rank)
+
+    def _unlink(self, item_id: Hashable, terms: Iterable[str]) -> None:
+        for term in terms:
+            i = bisect_left(self.terms, (term, item_id))
+            if i < len(self.terms) and self.terms[i] == (term, item_id):
+                del self.terms[i]
+
+    def _memoized(self, terms: Iterable[str]) -> Set[str]:
+        """Memoized prefixes of any of the terms"""
+        return {term[:end] for term in terms for end in range(1, len(term) + 1)}.intersection(self.top)
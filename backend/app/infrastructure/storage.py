@@ -1,57 +1,439 @@
-import boto3
-from botocore.exceptions import NoCredentialsError
+from abc import ABC, abstractmethod
 from fastapi import UploadFile, HTTPException
 from backend.app.core.config import get_settings
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlencode
+import asyncio
+import hashlib
+import hmac
+import shutil
+import threading
+import time
 import uuid
 import os
 
 settings = get_settings()
 
-class Storage:
+
+class BaseStorage(ABC):
+    """
+    Shared upload plumbing. Blocking uploads run on a dedicated, bounded
+    thread pool so they never stall the event loop; admission control caps
+    running plus queued uploads and rejects the rest with 503.
+    """
+
     def __init__(self):
-        # Only initialize S3 client if credentials are provided
-        if settings.aws_access_key_id and settings.aws_secret_access_key:
-            self.s3_client = boto3.client(
-                's3',
-                aws_access_key_id=settings.aws_access_key_id,
-                aws_secret_access_key=settings.aws_secret_access_key,
-                region_name=settings.aws_region
-            )
-            self.bucket_name = settings.s3_bucket_name
-            self.enabled = True
-        else:
-            self.s3_client = None
-            self.bucket_name = None
-            self.enabled = False
+        self.max_concurrency = settings.upload_concurrency
+        self.max_queued = settings.upload_queue_limit
+        self.executor = None
+        self.in_flight = 0
+
+    def object_key(self, file: UploadFile, folder: str, custom_filename: str = None) -> str:
+        # Use custom filename if provided, otherwise generate UUID
+        if custom_filename:
+            return f"{folder}/{custom_filename}"
+        file_extension = os.path.splitext(file.filename)[1]
+        return f"{folder}/{uuid.uuid4()}{file_extension}"
 
+    @abstractmethod
     def upload_file(self, file: UploadFile, folder: str = "uploads", custom_filename: str = None) -> str:
-        if not self.enabled:
+        ...
+
+    @abstractmethod
+    def public_url(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def presign_upload(self, key: str, content_type: str, method: str = "PUT") -> dict:
+        """
+        Credentials for a client to upload one object directly to storage.
+        Returns url and method, plus headers (PUT) or form fields (POST).
+        """
+
+    @abstractmethod
+    def object_exists(self, key: str) -> bool:
+        ...
+
+    @abstractmethod
+    def put_object(self, key: str, data: bytes, content_type: str) -> str:
+        """Store bytes under a key and return their public URL"""
+
+    @abstractmethod
+    def get_object(self, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def object_size(self, key: str) -> int:
+        ...
+
+    @abstractmethod
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        """`length` bytes of an object from `start`, without fetching the rest"""
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Object key behind one of this storage's public URLs, or None for other URLs"""
+        prefix = self.public_url("")
+        return url[len(prefix):] if url and url.startswith(prefix) and len(url) > len(prefix) else None
+
+    # Multipart uploads: parts are numbered from 1 and assembled in order on completion
+
+    @abstractmethod
+    def create_multipart(self, key: str, content_type: str) -> str:
+        """Start a multipart upload and return its upload id"""
+
+    @abstractmethod
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Store one part (replacing any earlier copy) and return its ETag"""
+
+    @abstractmethod
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> str:
+        """Assemble (part number, ETag) pairs into the object and return its public URL"""
+
+    @abstractmethod
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        ...
+
+    async def object_exists_async(self, key: str) -> bool:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), self.object_exists, key)
+
+    async def object_size_async(self, key: str) -> int:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), self.object_size, key)
+
+    async def read_range_async(self, key: str, start: int, length: int) -> bytes:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), self.read_range, key, start, length)
+
+    async def put_objects_async(self, objects: Dict[str, Tuple[bytes, str]]) -> Dict[str, str]:
+        """
+        Store several objects (key -> (bytes, content type)) concurrently on
+        the upload pool; returns key -> URL. Each object counts as one upload
+        for admission control.
+        """
+        keys = list(objects)
+        urls = await asyncio.gather(*(self._admitted(self.put_object, key, *objects[key]) for key in keys))
+        return dict(zip(keys, urls))
+
+    async def get_object_async(self, key: str) -> bytes:
+        """Fetch a whole object; subject to the same admission control as uploads"""
+        return await self._admitted(self.get_object, key)
+
+    def _pool(self) -> ThreadPoolExecutor:
+        if self.executor is None:
+            self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="upload")
+        return self.executor
+
+    async def _admitted(self, function, *args):
+        """Run a blocking transfer on the pool, or raise 503 when the upload queue is full"""
+        if self.in_flight >= self.max_concurrency + self.max_queued:
             raise HTTPException(
                 status_code=503,
-                detail="S3 storage is not configured. Please set AWS credentials in .env file."
+                detail="Upload capacity exhausted, please retry shortly",
+                headers={"Retry-After": "1"}
             )
-        
+        self.in_flight += 1
         try:
-            # Use custom filename if provided, otherwise generate UUID
-            if custom_filename:
-                filename = f"{folder}/{custom_filename}"
-            else:
-                file_extension = os.path.splitext(file.filename)[1]
-                filename = f"{folder}/{uuid.uuid4()}{file_extension}"
-            
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._pool(), function, *args)
+        finally:
+            self.in_flight -= 1
+
+    async def upload_file_async(self, file: UploadFile, folder: str = "uploads", custom_filename: str = None) -> str:
+        """Upload without blocking the event loop. Raises 503 when the upload queue is full."""
+        return await self._admitted(self.upload_file, file, folder, custom_filename)
+
+    async def create_multipart_async(self, key: str, content_type: str) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), self.create_multipart, key, content_type)
+
+    async def upload_part_async(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        """Store one part without blocking the event loop; subject to the same admission control as uploads"""
+        return await self._admitted(self.upload_part, key, upload_id, part_number, data)
+
+    async def complete_multipart_async(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> str:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._pool(), self.complete_multipart, key, upload_id, parts)
+
+    async def abort_multipart_async(self, key: str, upload_id: str) -> None:
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._pool(), self.abort_multipart, key, upload_id)
+
+    def stats(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "max_concurrency": self.max_concurrency,
+            "max_queued": self.max_queued,
+        }
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+            self.executor = None
+
+
+class Storage(BaseStorage):
+    """
+    S3-backed media storage. boto3 is imported and the client built on
+    first use rather than at startup, keeping both off the cold start path.
+    """
+
+    def __init__(self):
+        super().__init__()
+        # Only initialize S3 client if credentials are provided
+        self.enabled = bool(settings.aws_access_key_id and settings.aws_secret_access_key)
+        self.bucket_name = settings.s3_bucket_name if self.enabled else None
+        self._s3_client = None
+        self._client_lock = threading.Lock()
+
+    @property
+    def s3_client(self):
+        # Uploads run on worker threads, so construction is locked
+        if self._s3_client is None and self.enabled:
+            with self._client_lock:
+                if self._s3_client is None:
+                    import boto3
+                    self._s3_client = boto3.client(
+                        's3',
+                        aws_access_key_id=settings.aws_access_key_id,
+                        aws_secret_access_key=settings.aws_secret_access_key,
+                        region_name=settings.aws_region
+                    )
+        return self._s3_client
+
+    def upload_file(self, file: UploadFile, folder: str = "uploads", custom_filename: str = None) -> str:
+        self._require_enabled()
+        from botocore.exceptions import NoCredentialsError
+
+        try:
+            filename = self.object_key(file, folder, custom_filename)
+
             self.s3_client.upload_fileobj(
                 file.file,
                 self.bucket_name,
                 filename,
                 ExtraArgs={'ContentType': file.content_type}
             )
-            
-            # Construct public URL
-            url = f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{filename}"
-            return url
+
+            return self.public_url(filename)
         except NoCredentialsError:
             raise HTTPException(status_code=500, detail="AWS Credentials not found")
         except Exception as e:
             raise HTTPException(status_code=500, detail=str(e))
 
-storage = Storage()
+    def public_url(self, key: str) -> str:
+        return f"https://{self.bucket_name}.s3.{settings.aws_region}.amazonaws.com/{key}"
+
+    def _require_enabled(self):
+        if not self.enabled:
+            raise HTTPException(
+                status_code=503,
+                detail="S3 storage is not configured. Please set AWS credentials in .env file."
+            )
+
+    def presign_upload(self, key: str, content_type: str, method: str = "PUT") -> dict:
+        self._require_enabled()
+        expires_in = settings.presigned_url_expiry_seconds
+        if method == "POST":
+            post = self.s3_client.generate_presigned_post(
+                self.bucket_name,
+                key,
+                Fields={"Content-Type": content_type},
+                Conditions=[
+                    {"Content-Type": content_type},
+                    ["content-length-range", 1, settings.max_upload_bytes]
+                ],
+                ExpiresIn=expires_in
+            )
+            return {"method": "POST", "url": post["url"], "fields": post["fields"], "expires_in": expires_in}
+        url = self.s3_client.generate_presigned_url(
+            "put_object",
+            Params={"Bucket": self.bucket_name, "Key": key, "ContentType": content_type},
+            ExpiresIn=expires_in
+        )
+        return {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}, "expires_in": expires_in}
+
+    def put_object(self, key: str, data: bytes, content_type: str) -> str:
+        self._require_enabled()
+        self.s3_client.put_object(Bucket=self.bucket_name, Key=key, Body=data, ContentType=content_type)
+        return self.public_url(key)
+
+    def get_object(self, key: str) -> bytes:
+        self._require_enabled()
+        return self.s3_client.get_object(Bucket=self.bucket_name, Key=key)["Body"].read()
+
+    def object_size(self, key: str) -> int:
+        self._require_enabled()
+        return self.s3_client.head_object(Bucket=self.bucket_name, Key=key)["ContentLength"]
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        self._require_enabled()
+        byte_range = f"bytes={start}-{start + length - 1}"
+        return self.s3_client.get_object(Bucket=self.bucket_name, Key=key, Range=byte_range)["Body"].read()
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        self._require_enabled()
+        upload = self.s3_client.create_multipart_upload(Bucket=self.bucket_name, Key=key, ContentType=content_type)
+        return upload["UploadId"]
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        self._require_enabled()
+        part = self.s3_client.upload_part(
+            Bucket=self.bucket_name, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data
+        )
+        return part["ETag"]
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> str:
+        self._require_enabled()
+        self.s3_client.complete_multipart_upload(
+            Bucket=self.bucket_name,
+            Key=key,
+            UploadId=upload_id,
+            MultipartUpload={"Parts": [{"PartNumber": number, "ETag": etag} for number, etag in parts]}
+        )
+        return self.public_url(key)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        self._require_enabled()
+        self.s3_client.abort_multipart_upload(Bucket=self.bucket_name, Key=key, UploadId=upload_id)
+
+    def object_exists(self, key: str) -> bool:
+        self._require_enabled()
+        from botocore.exceptions import ClientError
+        try:
+            self.s3_client.head_object(Bucket=self.bucket_name, Key=key)
+            return True
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+
+class LocalStorage(BaseStorage):
+    """
+    Filesystem stand-in for S3, for offline development and load tests.
+    Files are written under LOCAL_STORAGE_PATH and served from /media.
+    LOCAL_STORAGE_LATENCY_MS adds an artificial per-upload delay to mimic
+    network transfer time. Presigned uploads are HMAC-signed URLs pointing
+    at the /uploads/local endpoints, standing in for S3's signed URLs.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.root = os.path.abspath(settings.local_storage_path)
+        self.base_url = settings.local_storage_url.rstrip("/")
+        self.latency = settings.local_storage_latency_ms / 1000
+        self.enabled = True
+
+    def upload_file(self, file: UploadFile, folder: str = "uploads", custom_filename: str = None) -> str:
+        try:
+            filename = self.object_key(file, folder, custom_filename)
+            path = self.path_for(filename)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "wb") as out:
+                shutil.copyfileobj(file.file, out)
+            if self.latency:
+                time.sleep(self.latency)
+            return self.public_url(filename)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+
+    def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def path_for(self, key: str) -> str:
+        """Filesystem path of an object key, refusing keys that escape the storage root"""
+        path = os.path.abspath(os.path.join(self.root, key))
+        if not path.startswith(self.root + os.sep):
+            raise HTTPException(status_code=400, detail="Invalid object key")
+        return path
+
+    def sign(self, key: str, content_type: str, expires: int) -> str:
+        message = f"{key}\n{content_type}\n{expires}".encode()
+        return hmac.new(settings.upload_signing_secret.encode(), message, hashlib.sha256).hexdigest()
+
+    def verify(self, key: str, content_type: str, expires: int, signature: str) -> bool:
+        if expires < time.time():
+            return False
+        return hmac.compare_digest(self.sign(key, content_type, expires), signature)
+
+    def presign_upload(self, key: str, content_type: str, method: str = "PUT") -> dict:
+        expires_in = settings.presigned_url_expiry_seconds
+        expires = int(time.time()) + expires_in
+        signature = self.sign(key, content_type, expires)
+        upload_url = settings.local_upload_url.rstrip("/")
+        if method == "POST":
+            fields = {"key": key, "Content-Type": content_type, "expires": str(expires), "signature": signature}
+            return {"method": "POST", "url": upload_url, "fields": fields, "expires_in": expires_in}
+        query = urlencode({"expires": expires, "signature": signature})
+        return {
+            "method": "PUT",
+            "url": f"{upload_url}/{key}?{query}",
+            "headers": {"Content-Type": content_type},
+            "expires_in": expires_in
+        }
+
+    def object_exists(self, key: str) -> bool:
+        return os.path.isfile(self.path_for(key))
+
+    def put_object(self, key: str, data: bytes, content_type: str) -> str:
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            out.write(data)
+        return self.public_url(key)
+
+    def get_object(self, key: str) -> bytes:
+        with open(self.path_for(key), "rb") as source:
+            return source.read()
+
+    def object_size(self, key: str) -> int:
+        return os.path.getsize(self.path_for(key))
+
+    def read_range(self, key: str, start: int, length: int) -> bytes:
+        with open(self.path_for(key), "rb") as source:
+            source.seek(start)
+            return source.read(length)
+
+    def part_path(self, upload_id: str, part_number: int) -> str:
+        """Staging file of one multipart part, beside (not under) the served storage root"""
+        if not upload_id.isalnum():
+            raise HTTPException(status_code=400, detail="Invalid upload id")
+        return os.path.join(f"{self.root}.multipart", upload_id, f"{part_number:05d}")
+
+    def create_multipart(self, key: str, content_type: str) -> str:
+        upload_id = uuid.uuid4().hex
+        os.makedirs(os.path.dirname(self.part_path(upload_id, 1)), exist_ok=True)
+        return upload_id
+
+    def upload_part(self, key: str, upload_id: str, part_number: int, data: bytes) -> str:
+        path = self.part_path(upload_id, part_number)
+        with open(path, "wb") as out:
+            out.write(data)
+        if self.latency:
+            time.sleep(self.latency)
+        return f'"{hashlib.md5(data).hexdigest()}"'
+
+    def complete_multipart(self, key: str, upload_id: str, parts: List[Tuple[int, str]]) -> str:
+        path = self.path_for(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, "wb") as out:
+            for number, _ in parts:
+                with open(self.part_path(upload_id, number), "rb") as part:
+                    shutil.copyfileobj(part, out)
+        self.abort_multipart(key, upload_id)
+        return self.public_url(key)
+
+    def abort_multipart(self, key: str, upload_id: str) -> None:
+        shutil.rmtree(os.path.dirname(self.part_path(upload_id, 1)), ignore_errors=True)
+
+
+def create_storage() -> BaseStorage:
+    """Storage backend selected by STORAGE_BACKEND (s3 or local)"""
+    if settings.storage_backend == "local":
+        return LocalStorage()
+    return Storage()
+
+
+storage = create_storage()
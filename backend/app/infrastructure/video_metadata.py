@@ -0,0 +1,310 @@
+"""
+Duration and resolution of MP4/MOV and WebM/Matroska files, read from
+their container headers.
+
+Only header bytes are fetched, through a `read(offset, length)` callable,
+so a stored video is probed with a few small ranged reads instead of a
+download. For MP4 that is the top-level box headers plus the moov box
+(mdat is skipped by its size, wherever moov sits); for WebM it is the EBML
+header plus the segment's Info and Tracks elements, found by walking the
+segment or through its SeekHead. Parsing is blocking, so callers run it
+on a worker thread.
+"""
+from typing import Any, Callable, Dict, Iterator, Optional, Tuple
+import struct
+
+Reader = Callable[[int, int], bytes]
+
+# Header elements are small; anything claiming more is not a header
+MAX_HEADER_BYTES = 32 * 1024 * 1024
+
+
+class UnsupportedContainer(ValueError):
+    pass
+
+
+class RangeReader:
+    """Serves small reads from one read-ahead window, so walking headers costs few storage requests"""
+
+    def __init__(self, read: Reader, size: int, block: int = 64 * 1024):
+        self._read = read
+        self.size = size
+        self.block = block
+        self.window_start = 0
+        self.window = b""
+        self.requests = 0
+        self.bytes_read = 0
+
+    def read(self, offset: int, length: int) -> bytes:
+        length = max(0, min(length, self.size - offset))
+        end = offset + length
+        if not (self.window_start <= offset and end <= self.window_start + len(self.window)):
+            fetch = min(max(length, self.block), self.size - offset)
+            self.window = self._read(offset, fetch)
+            self.window_start = offset
+            self.requests += 1
+            self.bytes_read += len(self.window)
+        start = offset - self.window_start
+        return self.window[start:start + length]
+
+
+def probe(read: Reader, size: int) -> Dict[str, Any]:
+    """{"container", "duration" (seconds), "width", "height"} of a video; missing values are None"""
+    reader = RangeReader(read, size)
+    head = reader.read(0, 12)
+    try:
+        if head[:4] == b"\x1a\x45\xdf\xa3":
+            return probe_matroska(reader)
+        if head[4:8] in (b"ftyp", b"moov", b"mdat", b"free", b"wide", b"skip"):
+            return probe_mp4(reader)
+    except (IndexError, struct.error) as e:
+        # Headers cut short by a truncated or corrupt file
+        raise UnsupportedContainer("Truncated or corrupt container") from e
+    raise UnsupportedContainer("Not an MP4 or WebM file")
+
+
+# MP4 / ISO base media
+
+def _boxes(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[bytes, int, int]]:
+    """(type, payload start, payload end) of each box in an in-memory buffer"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset + 8 <= end:
+        size, kind = struct.unpack(">I4s", data[offset:offset + 8])
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", data[offset + 8:offset + 16])[0]
+            header = 16
+        elif size == 0:
+            size = end - offset
+        if size < header:
+            return
+        yield kind, offset + header, min(offset + size, end)
+        offset += size
+
+
+def _child(data: bytes, start: int, end: int, kind: bytes) -> Optional[Tuple[int, int]]:
+    for child_kind, child_start, child_end in _boxes(data, start, end):
+        if child_kind == kind:
+            return child_start, child_end
+    return None
+
+
+def _find_moov(reader: RangeReader) -> bytes:
+    """Walk the top-level box headers to moov, skipping over mdat and the rest by size"""
+    offset = 0
+    while offset + 8 <= reader.size:
+        size, kind = struct.unpack(">I4s", reader.read(offset, 8))
+        header = 8
+        if size == 1:
+            size = struct.unpack(">Q", reader.read(offset + 8, 8))[0]
+            header = 16
+        elif size == 0:
+            size = reader.size - offset
+        if size < header:
+            break
+        if kind == b"moov":
+            if size > MAX_HEADER_BYTES:
+                raise UnsupportedContainer("moov box is implausibly large")
+            return reader.read(offset + header, size - header)
+        offset += size
+    raise UnsupportedContainer("No moov box")
+
+
+def probe_mp4(reader: RangeReader) -> Dict[str, Any]:
+    moov = _find_moov(reader)
+    result: Dict[str, Any] = {"container": "mp4", "duration": None, "width": None, "height": None}
+
+    mvhd = _child(moov, 0, len(moov), b"mvhd")
+    if mvhd:
+        start = mvhd[0]
+        if moov[start] == 1:
+            timescale, duration = struct.unpack(">IQ", moov[start + 20:start + 32])
+        else:
+            timescale, duration = struct.unpack(">II", moov[start + 12:start + 20])
+        if timescale:
+            result["duration"] = duration / timescale
+
+    for kind, start, end in _boxes(moov):
+        if kind != b"trak":
+            continue
+        mdia = _child(moov, start, end, b"mdia")
+        hdlr = mdia and _child(moov, mdia[0], mdia[1], b"hdlr")
+        # Handler type follows version/flags and pre_defined
+        if not hdlr or moov[hdlr[0] + 8:hdlr[0] + 12] != b"vide":
+            continue
+        tkhd = _child(moov, start, end, b"tkhd")
+        if tkhd:
+            offset = tkhd[0] + (88 if moov[tkhd[0]] == 1 else 76)
+            width, height = struct.unpack(">II", moov[offset:offset + 8])
+            # 16.16 fixed point
+            result["width"], result["height"] = width >> 16, height >> 16
+        break
+    return result
+
+
+# Matroska / WebM (EBML)
+
+EBML_HEADER = 0x1A45DFA3
+SEGMENT = 0x18538067
+SEEK_HEAD = 0x114D9B74
+SEEK = 0x4DBB
+SEEK_ID = 0x53AB
+SEEK_POSITION = 0x53AC
+INFO = 0x1549A966
+TIMECODE_SCALE = 0x2AD7B1
+DURATION = 0x4489
+TRACKS = 0x1654AE6B
+TRACK_ENTRY = 0xAE
+TRACK_TYPE = 0x83
+VIDEO = 0xE0
+PIXEL_WIDTH = 0xB0
+PIXEL_HEIGHT = 0xBA
+DOC_TYPE = 0x4282
+CLUSTER = 0x1F43B675
+
+UNKNOWN_SIZE = -1
+
+
+def _vint(data: bytes, offset: int, keep_marker: bool) -> Tuple[int, int]:
+    """(value, length) of an EBML variable-length integer; element ids keep their length marker"""
+    first = data[offset]
+    length = 1
+    while length <= 8 and not first & (0x80 >> (length - 1)):
+        length += 1
+    if length > 8 or offset + length > len(data):
+        raise UnsupportedContainer("Corrupt EBML")
+    value = first if keep_marker else first & (0xFF >> length)
+    for byte in data[offset + 1:offset + length]:
+        value = (value << 8) | byte
+    if not keep_marker and value == (1 << (7 * length)) - 1:
+        value = UNKNOWN_SIZE
+    return value, length
+
+
+def _element_header(data: bytes, offset: int) -> Tuple[int, int, int]:
+    """(id, size, header length) of the element at offset"""
+    element_id, id_length = _vint(data, offset, keep_marker=True)
+    size, size_length = _vint(data, offset + id_length, keep_marker=False)
+    return element_id, size, id_length + size_length
+
+
+def _elements(data: bytes, start: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, int]]:
+    """(id, payload start, payload end) of each element in an in-memory buffer"""
+    end = len(data) if end is None else end
+    offset = start
+    while offset < end:
+        element_id, size, header = _element_header(data, offset)
+        payload_end = end if size == UNKNOWN_SIZE else min(offset + header + size, end)
+        yield element_id, offset + header, payload_end
+        offset = payload_end
+
+
+def _uint(data: bytes) -> int:
+    return int.from_bytes(data, "big") if data else 0
+
+
+def _float(data: bytes) -> Optional[float]:
+    if len(data) == 4:
+        return struct.unpack(">f", data)[0]
+    if len(data) == 8:
+        return struct.unpack(">d", data)[0]
+    return None
+
+
+def _parse_info(data: bytes, result: Dict[str, Any]) -> None:
+    scale, duration = 1_000_000, None
+    for element_id, start, end in _elements(data):
+        if element_id == TIMECODE_SCALE:
+            scale = _uint(data[start:end])
+        elif element_id == DURATION:
+            duration = _float(data[start:end])
+    if duration is not None:
+        # Duration is in timecode-scale units, which are nanoseconds each
+        result["duration"] = duration * scale / 1e9
+
+
+def _parse_tracks(data: bytes, result: Dict[str, Any]) -> None:
+    for element_id, start, end in _elements(data):
+        if element_id != TRACK_ENTRY:
+            continue
+        entry = {child_id: (child_start, child_end) for child_id, child_start, child_end in _elements(data, start, end)}
+        if TRACK_TYPE not in entry or _uint(data[slice(*entry[TRACK_TYPE])]) != 1 or VIDEO not in entry:
+            continue
+        for child_id, child_start, child_end in _elements(data, *entry[VIDEO]):
+            if child_id == PIXEL_WIDTH:
+                result["width"] = _uint(data[child_start:child_end])
+            elif child_id == PIXEL_HEIGHT:
+                result["height"] = _uint(data[child_start:child_end])
+        return
+
+
+def _seek_positions(data: bytes) -> Dict[int, int]:
+    """element id -> position relative to the segment payload"""
+    positions = {}
+    for element_id, start, end in _elements(data):
+        if element_id != SEEK:
+            continue
+        seek = {child_id: data[child_start:child_end] for child_id, child_start, child_end in _elements(data, start, end)}
+        if SEEK_ID in seek and SEEK_POSITION in seek:
+            positions[_uint(seek[SEEK_ID])] = _uint(seek[SEEK_POSITION])
+    return positions
+
+
+def _read_element(reader: RangeReader, offset: int) -> Tuple[int, int, int]:
+    """(id, payload offset, payload size) of the element at a file offset"""
+    element_id, size, header = _element_header(reader.read(offset, 12), 0)
+    return element_id, offset + header, size
+
+
+def probe_matroska(reader: RangeReader) -> Dict[str, Any]:
+    result: Dict[str, Any] = {"container": "matroska", "duration": None, "width": None, "height": None}
+    element_id, payload, size = _read_element(reader, 0)
+    header = reader.read(payload, size)
+    for child_id, start, end in _elements(header):
+        if child_id == DOC_TYPE:
+            result["container"] = header[start:end].rstrip(b"\x00").decode("ascii", "replace")
+
+    element_id, segment_start, segment_size = _read_element(reader, payload + size)
+    if element_id != SEGMENT:
+        raise UnsupportedContainer("No Matroska segment")
+    segment_end = reader.size if segment_size == UNKNOWN_SIZE else min(segment_start + segment_size, reader.size)
+
+    parsers = {INFO: _parse_info, TRACKS: _parse_tracks}
+    seen = set()
+    seek_positions: Dict[int, int] = {}
+    offset = segment_start
+    # Walk the top-level elements up to the first cluster, where media data begins
+    while offset < segment_end and seen != set(parsers):
+        element_id, payload, size = _read_element(reader, offset)
+        if element_id == CLUSTER or size == UNKNOWN_SIZE:
+            break
+        if element_id in parsers or element_id == SEEK_HEAD:
+            if size > MAX_HEADER_BYTES:
+                raise UnsupportedContainer("Header element is implausibly large")
+            data = reader.read(payload, size)
+            if element_id == SEEK_HEAD:
+                seek_positions.update(_seek_positions(data))
+            else:
+                parsers[element_id](data, result)
+                seen.add(element_id)
+        offset = payload + size
+
+    # Info or Tracks written after the clusters are reached through the SeekHead
+    for element_id in set(parsers) - seen:
+        if element_id not in seek_positions:
+            continue
+        found_id, payload, size = _read_element(reader, segment_start + seek_positions[element_id])
+        if found_id == element_id and 0 <= size <= MAX_HEADER_BYTES:
+            parsers[element_id](reader.read(payload, size), result)
+    return result
+
+
+def format_duration(seconds: float) -> str:
+    """Seconds as mm:ss, or h:mm:ss from an hour up"""
+    total = int(round(seconds))
+    hours, remainder = divmod(total, 3600)
+    minutes, seconds = divmod(remainder, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{seconds:02d}"
+    return f"{minutes:02d}:{seconds:02d}"
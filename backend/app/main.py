@@ -1,7 +1,19 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.staticfiles import StaticFiles
 from backend.app.api.v1.router import api_router
+from backend.app.core.config import get_settings
 from backend.app.db.mongodb import db
+from backend.app.infrastructure.storage import storage
+from backend.app.infrastructure.images import image_processor
+from backend.app.services.like_accumulator import like_accumulator
+from backend.app.services.job_worker import job_worker
+from backend.app.services.view_counter import view_counter
+from backend.app.services.chunked_upload_service import upload_sweeper
+from backend.app.db.repositories.user_repository import user_cache, author_summary_cache
+import os
+
+settings = get_settings()
 
 app = FastAPI(
     title="Sports Networking API", 
@@ -15,11 +27,17 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "ETag"],
 )
 
 # Include API router
 app.include_router(api_router)
 
+# Serve uploads written by the local storage stand-in
+if settings.storage_backend == "local":
+    os.makedirs(settings.local_storage_path, exist_ok=True)
+    app.mount("/media", StaticFiles(directory=settings.local_storage_path), name="media")
+
 # Root endpoint
 @app.get("/")
 def read_root():
@@ -30,11 +48,39 @@ def read_root():
 def health_check():
     return {"status": "healthy"}
 
+# Readiness: a real database round trip plus connection pool status
+@app.get("/ready")
+async def readiness_check(response: Response):
+    status = await db.readiness()
+    if not status["ready"]:
+        response.status_code = 503
+    return status
+
+# In-process cache effectiveness
+@app.get("/metrics/cache")
+def cache_metrics():
+    return {"users": user_cache.stats(), "authors": author_summary_cache.stats()}
+
+# Background job queue depth
+@app.get("/metrics/jobs")
+def job_metrics():
+    return job_worker.stats()
+
 # Database Events
 @app.on_event("startup")
 async def startup_db_client():
-    db.connect()
+    await db.connect()
+    like_accumulator.start()
+    view_counter.start()
+    job_worker.start()
+    upload_sweeper.start()
 
 @app.on_event("shutdown")
 async def shutdown_db_client():
+    await like_accumulator.drain()
+    await view_counter.drain()
+    await job_worker.stop()
+    await upload_sweeper.stop()
+    storage.shutdown()
+    image_processor.shutdown()
     db.close()
@@ -0,0 +1,22 @@
+from pydantic import BaseModel, Field, BeforeValidator
+from typing_extensions import Annotated
+from typing import Optional
+
+# Helper for MongoDB ObjectId
+PyObjectId = Annotated[str, BeforeValidator(str)]
+
+
+class Follow(BaseModel):
+    """An edge of the follow graph"""
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    follower_id: str
+    followee_id: str
+    created_at: Optional[str] = None
+
+
+class FollowStatus(BaseModel):
+    """Result of a follow or unfollow"""
+    follower_id: str
+    followee_id: str
+    following: bool
+    followers_count: int = 0
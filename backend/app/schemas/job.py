@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field
+from typing import Any, Dict, Literal, Optional
+
+
+class Job(BaseModel):
+    """A background job and where it stands"""
+    id: str = Field(alias="_id")
+    kind: str
+    status: Literal["queued", "running", "retrying", "succeeded", "failed"]
+    attempts: int = 0
+    payload: Dict[str, Any] = {}
+    result: Optional[Any] = None
+    # Last failure, kept while the job is retried
+    error: Optional[str] = None
+    run_at: Optional[str] = None
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
@@ -0,0 +1,16 @@
+from pydantic import BaseModel
+from typing import Optional
+
+
+class ImageVariant(BaseModel):
+    width: int
+    height: int
+    webp: str
+    jpeg: str
+
+
+class ImageVariants(BaseModel):
+    """Resized copies of an uploaded image, stored next to the original"""
+    thumb: Optional[ImageVariant] = None
+    medium: Optional[ImageVariant] = None
+    full: Optional[ImageVariant] = None
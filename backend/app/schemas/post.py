@@ -1,22 +1,21 @@
 from pydantic import BaseModel, Field
 from typing_extensions import Annotated
-from typing import Optional
+from typing import List, Optional
 from pydantic import BeforeValidator
 from datetime import datetime
+from backend.app.schemas.media import ImageVariants
 import uuid
 
 # Helper for MongoDB ObjectId
 PyObjectId = Annotated[str, BeforeValidator(str)]
 
 
-class Post(BaseModel):
+class AuthorSummary(BaseModel):
     id: Optional[PyObjectId] = Field(alias="_id", default=None)
-    author_id: str
-    content: str
-    media_url: Optional[str] = None
-    type: str
-    likes: int = 0
-    comments: int = 0
+    name: str
+    headline: Optional[str] = None
+    profile_image: Optional[str] = None
+    profile_image_variants: Optional[ImageVariants] = None
 
 
 class Comment(BaseModel):
@@ -25,3 +24,19 @@ class Comment(BaseModel):
     author_id: str
     content: str
     created_at: str = Field(default_factory=lambda: datetime.utcnow().isoformat())
+
+
+class Post(BaseModel):
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    author_id: str
+    content: str
+    media_url: Optional[str] = None
+    media_variants: Optional[ImageVariants] = None
+    type: str
+    likes: int = 0
+    comments: int = 0
+    created_at: Optional[str] = None
+    author: Optional[AuthorSummary] = None
+    # Newest first; only embedded when a feed page asks for previews
+    latest_comments: Optional[List[Comment]] = None
+
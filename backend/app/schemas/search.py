@@ -0,0 +1,24 @@
+from pydantic import BaseModel
+from typing import List
+from backend.app.schemas.user import UserSummary
+from backend.app.schemas.post import Post
+from backend.app.schemas.training import TrainingVideo
+
+
+class UserHit(UserSummary):
+    score: float = 0.0
+
+
+class PostHit(Post):
+    score: float = 0.0
+
+
+class TrainingVideoHit(TrainingVideo):
+    score: float = 0.0
+
+
+class SearchResults(BaseModel):
+    query: str
+    users: List[UserHit] = []
+    posts: List[PostHit] = []
+    videos: List[TrainingVideoHit] = []
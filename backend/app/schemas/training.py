@@ -14,7 +14,24 @@ class TrainingVideo(BaseModel):
     video_url: str
     thumbnail_url: Optional[str] = None
     duration: Optional[str] = "00:00"
+    # Filled in from the file's container headers after upload
+    duration_seconds: Optional[float] = None
+    width: Optional[int] = None
+    height: Optional[int] = None
+    # Display form of view_count, e.g. "1.2M"
     views: Optional[str] = "0"
+    view_count: int = 0
     type: str = "link"
     categories: List[str] = []
+    created_at: Optional[str] = None
     analysis: Optional[List[str]] = None
+
+
+class FacetCount(BaseModel):
+    value: str
+    count: int
+
+
+class TrainingFacets(BaseModel):
+    """Catalog-wide video counts per category"""
+    categories: List[FacetCount] = []
@@ -0,0 +1,59 @@
+from pydantic import BaseModel
+from typing import Dict, List, Literal, Optional
+from backend.app.schemas.media import ImageVariants
+
+UploadTarget = Literal["profile", "cover", "post", "training"]
+
+
+class PresignRequest(BaseModel):
+    target: UploadTarget
+    # User ID for profile/cover, post ID for post, video ID for training
+    owner_id: str
+    filename: str
+    content_type: str
+    method: Literal["PUT", "POST"] = "PUT"
+
+
+class PresignResponse(BaseModel):
+    key: str
+    method: str
+    url: str
+    headers: Optional[Dict[str, str]] = None
+    fields: Optional[Dict[str, str]] = None
+    expires_in: int
+
+
+class UploadCompleteRequest(BaseModel):
+    target: UploadTarget
+    owner_id: str
+    key: str
+
+
+class UploadCompleteResponse(BaseModel):
+    message: str
+    url: str
+    variants: Optional[ImageVariants] = None
+
+
+class ChunkedUploadInit(BaseModel):
+    """A training video to be uploaded in chunks; the video is created when the upload completes"""
+    title: str
+    author: str
+    description: Optional[str] = None
+    categories: List[str] = []
+    filename: str
+    content_type: str
+    # Total size in bytes
+    size: int
+
+
+class ChunkedUploadStatus(BaseModel):
+    upload_id: str
+    video_id: str
+    size: int
+    chunk_size: int
+    # Bytes received contiguously from the start: where to resume
+    offset: int
+    # Offsets of chunks not yet received
+    missing: List[int]
+    expires_at: str
@@ -1,6 +1,7 @@
 from pydantic import BaseModel, Field, BeforeValidator
 from typing_extensions import Annotated
 from typing import List, Optional
+from backend.app.schemas.media import ImageVariants
 
 # Helper for MongoDB ObjectId
 PyObjectId = Annotated[str, BeforeValidator(str)]
@@ -29,6 +30,8 @@ class User(BaseModel):
     category: Optional[str] = None
     profile_image: Optional[str] = None
     cover_image: Optional[str] = None
+    profile_image_variants: Optional[ImageVariants] = None
+    cover_image_variants: Optional[ImageVariants] = None
     email: Optional[str] = None
     username: Optional[str] = None
     # Sport-specific
@@ -41,6 +44,36 @@ class User(BaseModel):
     academy: Optional[str] = None
     skills: List[Skill] = []
     experience: List[Experience] = []
+    # Follow graph
+    followers_count: int = 0
+    following_count: int = 0
+    celebrity: bool = False
+
+
+class UserSummary(BaseModel):
+    """Compact user for list views and `?fields=summary`"""
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: str
+    role: str
+    sport: str
+    headline: Optional[str] = None
+    location: Optional[str] = None
+    profile_image: Optional[str] = None
+    profile_image_variants: Optional[ImageVariants] = None
+
+
+class UserSuggestion(BaseModel):
+    """Typeahead entry for `/users/suggest`"""
+    id: Optional[PyObjectId] = Field(alias="_id", default=None)
+    name: str
+    sport: Optional[str] = None
+    academy: Optional[str] = None
+    profile_image: Optional[str] = None
+    endorsements: int = 0
+
+
+# Named fieldsets accepted by `?fields=` on user reads
+USER_FIELDSETS = {"summary": UserSummary}
 
 
 class ProfileCreateRequest(BaseModel):
@@ -0,0 +1,273 @@
+from fastapi import HTTPException
+from typing import Any, AsyncIterator, Callable, Dict, Optional
+from backend.app.db.repositories.upload_session_repository import UploadSessionRepository
+from backend.app.db.repositories.training_repository import TrainingRepository
+from backend.app.services.media_service import MediaService
+from backend.app.services.training_service import TrainingService
+from backend.app.core.config import get_settings
+from backend.app.db.mongodb import db
+from backend.app.infrastructure.storage import storage
+from datetime import datetime, timedelta
+import asyncio
+import uuid
+import os
+
+settings = get_settings()
+
+# An expired session left "completing" this long is taken to be abandoned
+# by a process that died mid-completion
+COMPLETING_GRACE = timedelta(hours=1)
+
+
+class ChunkedUploadService:
+    """
+    Service for resumable, chunked training video uploads.
+
+    start() opens a storage multipart upload and fixes the chunk size.
+    The client PUTs each chunk at its byte offset; every chunk becomes one
+    multipart part as it arrives, so the API holds at most one chunk per
+    request in memory and nothing is spooled to disk. After a dropped
+    connection, status() reports the offset to resume from. complete()
+    assembles the parts and creates the training video; it is safe to
+    retry, and concurrent calls do not assemble twice. Uploads nobody
+    comes back to are removed, with their stored parts, by a periodic
+    sweep once they expire.
+    """
+
+    def __init__(self, session_repository: UploadSessionRepository, training_repository: TrainingRepository, jobs=None):
+        self.session_repo = session_repository
+        self.training_repo = training_repository
+        self.jobs = jobs
+
+    @staticmethod
+    def part_count(session: Dict[str, Any]) -> int:
+        return max(1, -(-session["size"] // session["chunk_size"]))
+
+    @staticmethod
+    def status(session: Dict[str, Any]) -> Dict[str, Any]:
+        """Public view of a session: where to resume and which chunks are missing"""
+        chunk_size = session["chunk_size"]
+        received = session.get("parts") or {}
+        missing = [
+            (number - 1) * chunk_size
+            for number in range(1, ChunkedUploadService.part_count(session) + 1)
+            if str(number) not in received
+        ]
+        offset = missing[0] if missing else session["size"]
+        return {
+            "upload_id": session["_id"],
+            "video_id": session["video"]["_id"],
+            "size": session["size"],
+            "chunk_size": chunk_size,
+            "offset": offset,
+            "missing": missing,
+            "expires_at": session["expires_at"]
+        }
+
+    async def start(self, upload: Dict[str, Any], storage) -> Dict[str, Any]:
+        """Open a resumable upload for a new training video"""
+        MediaService.validate_content_type(upload["content_type"])
+        if not upload["content_type"].startswith("video/"):
+            raise HTTPException(status_code=400, detail="Chunked uploads are for videos")
+        if upload["size"] <= 0:
+            raise HTTPException(status_code=400, detail="Size must be positive")
+        if upload["size"] > settings.max_upload_bytes:
+            raise HTTPException(status_code=413, detail=f"Upload too large (max {settings.max_upload_bytes} bytes)")
+
+        video_id = str(uuid.uuid4())
+        key = f"training/{video_id}/{uuid.uuid4()}{os.path.splitext(upload['filename'])[1]}"
+        storage_upload_id = await storage.create_multipart_async(key, upload["content_type"])
+        expires_at = datetime.utcnow() + timedelta(hours=settings.chunked_upload_expiry_hours)
+        session = await self.session_repo.create({
+            "_id": uuid.uuid4().hex,
+            "key": key,
+            "storage_upload_id": storage_upload_id,
+            "content_type": upload["content_type"],
+            "size": upload["size"],
+            "chunk_size": settings.chunked_upload_chunk_bytes,
+            "parts": {},
+            # uploading -> completing -> completed
+            "state": "uploading",
+            # The training video created on completion
+            "video": {
+                "_id": video_id,
+                "title": upload["title"],
+                "author": upload["author"],
+                "description": upload.get("description"),
+                "categories": TrainingService.normalize_categories(upload.get("categories"))
+            },
+            "expires_at": expires_at.isoformat()
+        })
+        return self.status(session)
+
+    async def _get_session(self, upload_id: str, storage) -> Dict[str, Any]:
+        session = await self.session_repo.get(upload_id)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        if session["expires_at"] < datetime.utcnow().isoformat():
+            if session.get("state") == "completed":
+                # The parts were assembled into the video; only the record is left
+                await self.session_repo.delete(upload_id)
+                raise HTTPException(status_code=404, detail="Upload not found")
+            await self._discard(session, storage)
+            raise HTTPException(status_code=410, detail="Upload expired, please start again")
+        return session
+
+    async def _get_open_session(self, upload_id: str, storage) -> Dict[str, Any]:
+        """A session still taking chunks"""
+        session = await self._get_session(upload_id, storage)
+        if session.get("state") in ("completing", "completed"):
+            raise HTTPException(status_code=409, detail="Upload is already being completed")
+        return session
+
+    async def _discard(self, session: Dict[str, Any], storage) -> None:
+        await storage.abort_multipart_async(session["key"], session["storage_upload_id"])
+        await self.session_repo.delete(session["_id"])
+
+    async def get_status(self, upload_id: str, storage) -> Dict[str, Any]:
+        return self.status(await self._get_session(upload_id, storage))
+
+    async def write_chunk(self, upload_id: str, offset: int, body: AsyncIterator[bytes], storage) -> Dict[str, Any]:
+        """
+        Store the chunk starting at `offset` as one multipart part. Offsets
+        must fall on chunk boundaries, and every chunk but the last is
+        exactly chunk_size bytes. Re-sending a chunk replaces it.
+        """
+        session = await self._get_open_session(upload_id, storage)
+        chunk_size, size = session["chunk_size"], session["size"]
+        if offset < 0 or offset >= size or offset % chunk_size:
+            raise HTTPException(status_code=400, detail=f"Offset must be a multiple of {chunk_size} below {size}")
+        expected = min(chunk_size, size - offset)
+
+        # Read at most one chunk, failing as soon as the body runs over
+        buffer = bytearray()
+        async for piece in body:
+            buffer += piece
+            if len(buffer) > expected:
+                raise HTTPException(status_code=413, detail=f"Chunk at offset {offset} must be {expected} bytes")
+        if len(buffer) != expected:
+            raise HTTPException(status_code=400, detail=f"Chunk at offset {offset} must be {expected} bytes")
+
+        part_number = offset // chunk_size + 1
+        etag = await storage.upload_part_async(session["key"], session["storage_upload_id"], part_number, bytes(buffer))
+        session = await self.session_repo.record_part(upload_id, part_number, etag, expected)
+        if session is None:
+            raise HTTPException(status_code=404, detail="Upload not found")
+        return self.status(session)
+
+    async def _completed_video(self, session: Dict[str, Any]) -> Dict[str, Any]:
+        video = await self.training_repo.get_by_id(session["video"]["_id"])
+        if video is None:
+            raise HTTPException(status_code=404, detail="Training video not found")
+        return video
+
+    async def complete(self, upload_id: str, storage) -> Dict[str, Any]:
+        """Assemble the parts and create the training video; a repeated call returns the same video"""
+        session = await self._get_session(upload_id, storage)
+        if session.get("state") == "completed":
+            return await self._completed_video(session)
+        status = self.status(session)
+        if status["missing"]:
+            raise HTTPException(status_code=409, detail={"message": "Upload is incomplete", **status})
+
+        # Only one request gets to assemble the parts
+        session = await self.session_repo.claim(upload_id)
+        if session is None:
+            session = await self._get_session(upload_id, storage)
+            if session.get("state") == "completed":
+                return await self._completed_video(session)
+            raise HTTPException(status_code=409, detail="Upload is already being completed")
+
+        try:
+            video_url = session.get("video_url")
+            if video_url is None:
+                parts = [(number, session["parts"][str(number)]["etag"]) for number in range(1, self.part_count(session) + 1)]
+                video_url = await storage.complete_multipart_async(session["key"], session["storage_upload_id"], parts)
+                await self.session_repo.record_assembled(upload_id, video_url)
+            # An earlier attempt may have created the video and failed afterwards
+            video = await self.training_repo.get_by_id(session["video"]["_id"])
+            if video is None:
+                video = await self.training_repo.create({
+                    **session["video"],
+                    "video_url": video_url,
+                    "thumbnail_url": None,
+                    "duration": "00:00",
+                    "views": "0",
+                    "view_count": 0,
+                    "created_at": datetime.utcnow().isoformat(),
+                    "type": "file",
+                    "analysis": None
+                })
+        except Exception:
+            await self.session_repo.release(upload_id)
+            raise
+        await self.session_repo.mark_completed(upload_id)
+        await TrainingService.schedule_metadata(self.jobs, video["_id"], video_url, storage)
+        return video
+
+    async def abort(self, upload_id: str, storage) -> None:
+        """Drop an unfinished upload and its stored parts"""
+        await self._discard(await self._get_open_session(upload_id, storage), storage)
+
+    async def sweep_expired(self, storage, limit: int = 100) -> int:
+        """Remove up to `limit` expired sessions, aborting the stored parts of unfinished ones"""
+        now = datetime.utcnow()
+        swept = 0
+        for session in await self.session_repo.get_expired(now.isoformat(), limit):
+            state = session.get("state")
+            if state == "completing" and session["expires_at"] > (now - COMPLETING_GRACE).isoformat():
+                continue
+            # Whoever deletes the record aborts the upload, so it is aborted once
+            if not await self.session_repo.delete_in_state(session["_id"], state):
+                continue
+            if state != "completed":
+                try:
+                    await storage.abort_multipart_async(session["key"], session["storage_upload_id"])
+                except Exception as e:
+                    print(f"⚠ Could not abort expired upload {session['_id']}: {e}")
+            swept += 1
+        return swept
+
+
+class ExpiredUploadSweeper:
+    """Background task that sweeps expired upload sessions every `interval_seconds`"""
+
+    def __init__(self, service_factory: Callable[[], ChunkedUploadService], storage, interval_seconds: float = 600):
+        self.service_factory = service_factory
+        self.storage = storage
+        self.interval = interval_seconds
+        self.task: Optional[asyncio.Task] = None
+
+    async def run(self) -> None:
+        while True:
+            try:
+                swept = await self.service_factory().sweep_expired(self.storage)
+                if swept:
+                    print(f"✓ Swept {swept} expired upload(s)")
+            except Exception as e:
+                print(f"⚠ Upload sweep failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+
+
+def get_chunked_upload_service(db, jobs=None) -> ChunkedUploadService:
+    return ChunkedUploadService(UploadSessionRepository(db), TrainingRepository(db), jobs)
+
+
+upload_sweeper = ExpiredUploadSweeper(
+    lambda: get_chunked_upload_service(db.get_db()),
+    storage,
+    interval_seconds=settings.chunked_upload_sweep_seconds
+)
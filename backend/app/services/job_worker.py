@@ -0,0 +1,160 @@
+"""
+In-process background job worker.
+
+Jobs are persisted in the `jobs` collection and their ids handed to a
+bounded in-memory queue drained by JOB_WORKERS tasks, so enqueueing costs
+one upsert and the request returns at once. A failed attempt is retried
+with exponential backoff up to JOB_MAX_ATTEMPTS times. When the queue is
+full the job simply waits in the collection: a sweep every
+JOB_SWEEP_SECONDS feeds due jobs (new, retrying, or abandoned by a dead
+process) into the queue as room frees up.
+"""
+from typing import Any, Awaitable, Callable, Dict, Optional, Set
+from backend.app.core.config import get_settings
+from backend.app.db.mongodb import db
+from backend.app.db.repositories.job_repository import JobRepository
+import asyncio
+
+settings = get_settings()
+
+Handler = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+# Added to the job timeout for the lease, so a timed-out attempt can still
+# record its failure before another worker may take the job over
+LEASE_MARGIN_SECONDS = 30
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler when retrying cannot help"""
+
+
+class JobWorker:
+    """Bounded job queue with a fixed pool of worker tasks"""
+
+    def __init__(
+        self,
+        repository_factory: Callable[[], JobRepository],
+        workers: int = 2,
+        queue_limit: int = 100,
+        max_attempts: int = 3,
+        retry_backoff_seconds: float = 5,
+        timeout_seconds: float = 60,
+        sweep_seconds: float = 2
+    ):
+        self.repository_factory = repository_factory
+        self.workers = workers
+        self.queue_limit = queue_limit
+        self.max_attempts = max_attempts
+        self.retry_backoff = retry_backoff_seconds
+        self.timeout = timeout_seconds
+        self.sweep_interval = sweep_seconds
+        self.handlers: Dict[str, Handler] = {}
+        self.queue: Optional[asyncio.Queue] = None
+        # Job ids queued or running in this process
+        self.pending: Set[str] = set()
+        self.tasks = []
+
+    def register(self, kind: str, handler: Handler) -> None:
+        self.handlers[kind] = handler
+
+    async def enqueue(self, kind: str, payload: Dict[str, Any], job_id: str) -> Dict[str, Any]:
+        """Persist a job and queue it; re-enqueueing an id resets that job"""
+        job = await self.repository_factory().enqueue(job_id, kind, payload)
+        self._offer(job_id)
+        return job
+
+    def _offer(self, job_id: str) -> bool:
+        """Queue a job id unless it is already here or the queue is full"""
+        if self.queue is None or job_id in self.pending:
+            return False
+        try:
+            self.queue.put_nowait(job_id)
+        except asyncio.QueueFull:
+            return False
+        self.pending.add(job_id)
+        return True
+
+    async def sweep(self) -> int:
+        """Queue due jobs from the collection, as many as there is room for"""
+        room = self.queue_limit - self.queue.qsize()
+        if room <= 0:
+            return 0
+        job_ids = await self.repository_factory().get_runnable(room + len(self.pending))
+        return sum(self._offer(job_id) for job_id in job_ids)
+
+    async def run_one(self, job_id: str) -> None:
+        repository = self.repository_factory()
+        job = await repository.claim(job_id, self.timeout + LEASE_MARGIN_SECONDS)
+        if job is None:
+            return
+        attempts, lease_id = job["attempts"], job["lease_id"]
+        handler = self.handlers.get(job["kind"])
+        try:
+            if handler is None:
+                raise PermanentJobError(f"No handler for {job['kind']} jobs")
+            result = await asyncio.wait_for(handler(job["payload"]), self.timeout)
+        except Exception as e:
+            error = f"{type(e).__name__}: {e}"
+            if isinstance(e, PermanentJobError) or attempts >= self.max_attempts:
+                print(f"✗ Job {job_id} failed after {attempts} attempt(s): {error}")
+                recorded = await repository.fail(job_id, lease_id, error)
+            else:
+                recorded = await repository.fail(job_id, lease_id, error, retry_in=self.retry_backoff * 2 ** (attempts - 1))
+        else:
+            recorded = await repository.finish(job_id, lease_id, result)
+        if not recorded:
+            print(f"⚠ Job {job_id} attempt {attempts} lost its lease; outcome not recorded")
+
+    async def work(self) -> None:
+        while True:
+            job_id = await self.queue.get()
+            try:
+                await self.run_one(job_id)
+            except Exception as e:
+                # The job stays runnable in the collection and is swept up again
+                print(f"⚠ Job {job_id} could not be run: {e}")
+            finally:
+                self.pending.discard(job_id)
+                self.queue.task_done()
+
+    async def run_sweeps(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                print(f"⚠ Job sweep failed: {e}")
+            await asyncio.sleep(self.sweep_interval)
+
+    def start(self) -> None:
+        if not self.tasks:
+            self.queue = asyncio.Queue(maxsize=self.queue_limit)
+            self.tasks = [asyncio.create_task(self.work()) for _ in range(self.workers)]
+            self.tasks.append(asyncio.create_task(self.run_sweeps()))
+
+    async def stop(self) -> None:
+        """Cancel the workers; interrupted jobs are picked up again once their lease ends"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+        self.queue = None
+        self.pending.clear()
+
+    def stats(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue is not None else 0,
+            "in_process": len(self.pending),
+            "workers": self.workers,
+            "queue_limit": self.queue_limit,
+        }
+
+
+job_worker = JobWorker(
+    lambda: JobRepository(db.get_db()),
+    workers=settings.job_workers,
+    queue_limit=settings.job_queue_limit,
+    max_attempts=settings.job_max_attempts,
+    retry_backoff_seconds=settings.job_retry_backoff_seconds,
+    timeout_seconds=settings.job_timeout_seconds,
+    sweep_seconds=settings.job_sweep_seconds
+)
@@ -0,0 +1,105 @@
+"""
+Write-coalescing like counter.
+
+Likes are counted in memory and answered immediately with an optimistic
+total; a background task flushes the accumulated per-post deltas every
+LIKE_FLUSH_INTERVAL_MS in one unordered bulk write. A hot post therefore
+costs one $inc per interval instead of one per click.
+"""
+from typing import Callable, Dict, Optional
+from backend.app.core.config import get_settings
+from backend.app.db.mongodb import db
+from backend.app.db.repositories.post_repository import PostRepository
+import asyncio
+import time
+
+settings = get_settings()
+
+
+class LikeAccumulator:
+    """In-process like buffer with periodic batched flushes"""
+    
+    def __init__(
+        self,
+        repository_factory: Callable[[], PostRepository],
+        flush_interval_ms: int = 250,
+        max_staleness_ms: int = 5000
+    ):
+        self.repository_factory = repository_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.max_staleness = max_staleness_ms / 1000
+        # post_id -> (stored count, monotonic time it was read)
+        self.base: Dict[str, tuple] = {}
+        # Deltas not yet written, and deltas in the bulk write under way
+        self.pending: Dict[str, int] = {}
+        self.flushing: Dict[str, int] = {}
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+    
+    def count(self, post_id: str) -> int:
+        return self.base[post_id][0] + self.flushing.get(post_id, 0) + self.pending.get(post_id, 0)
+    
+    async def like(self, post_id: str) -> Optional[int]:
+        """Record a like; returns the optimistic count, or None if the post does not exist"""
+        entry = self.base.get(post_id)
+        if entry is None or time.monotonic() - entry[1] > self.max_staleness:
+            # Reads are serialized with flushes so a refreshed count never
+            # double-counts a delta that was being written at the time
+            async with self.lock:
+                likes = await self.repository_factory().get_likes(post_id)
+                if likes is None:
+                    return None
+                self.base[post_id] = (likes, time.monotonic())
+        self.pending[post_id] = self.pending.get(post_id, 0) + 1
+        return self.count(post_id)
+    
+    async def flush(self) -> None:
+        """Write all pending deltas in one bulk write"""
+        async with self.lock:
+            if not self.pending:
+                return
+            self.flushing, self.pending = self.pending, {}
+            try:
+                await self.repository_factory().apply_like_deltas(self.flushing)
+            except Exception as e:
+                print(f"✗ Like flush failed, will retry: {e}")
+                for post_id, delta in self.flushing.items():
+                    self.pending[post_id] = self.pending.get(post_id, 0) + delta
+            else:
+                now = time.monotonic()
+                for post_id, delta in self.flushing.items():
+                    likes, read_at = self.base[post_id]
+                    self.base[post_id] = (likes + delta, read_at)
+                # Forget counts that are stale and have nothing pending
+                for post_id in [p for p, (_, read_at) in self.base.items()
+                                if now - read_at > self.max_staleness and p not in self.pending]:
+                    del self.base[post_id]
+            finally:
+                self.flushing = {}
+    
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+    
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+    
+    async def drain(self) -> None:
+        """Stop the flush loop and write whatever is still pending"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+
+like_accumulator = LikeAccumulator(
+    lambda: PostRepository(db.get_db()),
+    flush_interval_ms=settings.like_flush_interval_ms,
+    max_staleness_ms=settings.like_max_staleness_ms
+)
@@ -1,32 +1,105 @@
 from fastapi import UploadFile, HTTPException
-import os
+from typing import Any, Dict, Optional
+from backend.app.infrastructure.images import (
+    IMAGE_TYPES, FORMATS, HEADER_BYTES, MAX_PIXELS, image_processor, variant_objects
+)
+from backend.app.core.config import get_settings
+import asyncio
+import mimetypes
+
+settings = get_settings()
 
 
 class MediaService:
     """Service for media file validation and upload operations"""
     
+    ALLOWED_TYPES = [
+        "image/jpeg", "image/png", "image/jpg", "image/webp",
+        "video/mp4", "video/webm"
+    ]
+    
     @staticmethod
-    def validate_media_file(file: UploadFile) -> bool:
-        """Validate media file type"""
-        allowed_types = [
-            "image/jpeg", "image/png", "image/jpg", "image/webp",
-            "video/mp4", "video/webm"
-        ]
-        if file.content_type not in allowed_types:
+    def validate_content_type(content_type: str) -> bool:
+        """Validate media content type"""
+        if content_type not in MediaService.ALLOWED_TYPES:
             raise HTTPException(
                 status_code=400,
-                detail=f"Invalid file type. Allowed types: {', '.join(allowed_types)}"
+                detail=f"Invalid file type. Allowed types: {', '.join(MediaService.ALLOWED_TYPES)}"
             )
         return True
     
     @staticmethod
-    def upload_with_custom_filename(file: UploadFile, folder: str, custom_filename: str, storage):
+    def validate_media_file(file: UploadFile) -> bool:
+        """Validate media file type"""
+        return MediaService.validate_content_type(file.content_type)
+    
+    @staticmethod
+    async def upload_with_custom_filename(file: UploadFile, folder: str, custom_filename: str, storage):
         """Upload file with custom filename"""
         MediaService.validate_media_file(file)
-        return storage.upload_file(file, folder=folder, custom_filename=custom_filename)
+        return await storage.upload_file_async(file, folder=folder, custom_filename=custom_filename)
     
     @staticmethod
-    def upload_file(file: UploadFile, folder: str, storage):
+    async def upload_file(file: UploadFile, folder: str, storage):
         """Upload file with generated filename"""
         MediaService.validate_media_file(file)
-        return storage.upload_file(file, folder=folder)
+        return await storage.upload_file_async(file, folder=folder)
+    
+    @staticmethod
+    def is_image(content_type: Optional[str]) -> bool:
+        return content_type in IMAGE_TYPES
+    
+    @staticmethod
+    def _with_urls(variants: Dict[str, Any], urls: Dict[str, str]) -> Dict[str, Any]:
+        """Replace the object keys in a variants description with their URLs"""
+        for variant in variants.values():
+            for format_key in FORMATS:
+                variant[format_key] = urls[variant[format_key]]
+        return variants
+    
+    @staticmethod
+    async def store_variants(key: str, data: bytes, storage) -> Dict[str, Any]:
+        """Render an image's variants and store them alongside `key`; returns them with public URLs"""
+        rendered = await image_processor.render(data)
+        objects, variants = variant_objects(key, rendered)
+        return MediaService._with_urls(variants, await storage.put_objects_async(objects))
+    
+    @staticmethod
+    async def upload_image(file: UploadFile, folder: str, storage, custom_filename: str = None) -> Dict[str, Any]:
+        """
+        Upload an image with its thumb/medium/full variants. The image is
+        decoded before anything is stored, so unreadable files are refused
+        with 400. Returns {"url": original URL, "variants": ...}.
+        """
+        MediaService.validate_media_file(file)
+        if not MediaService.is_image(file.content_type):
+            raise HTTPException(status_code=400, detail="File is not an image")
+        data = await file.read()
+        await file.seek(0)
+        rendered = await image_processor.render(data)
+        key = storage.object_key(file, folder, custom_filename)
+        objects, variants = variant_objects(key, rendered)
+        url, urls = await asyncio.gather(
+            storage.upload_file_async(file, folder=folder, custom_filename=key[len(folder) + 1:]),
+            storage.put_objects_async(objects)
+        )
+        return {"url": url, "variants": MediaService._with_urls(variants, urls)}
+    
+    @staticmethod
+    async def variants_for_stored(key: str, storage) -> Optional[Dict[str, Any]]:
+        """
+        Variants for an image that reached storage by direct upload; None for
+        other media. The object is only fetched once its size and, from a
+        ranged read of its header, its dimensions are within limits.
+        """
+        content_type, _ = mimetypes.guess_type(key)
+        if not MediaService.is_image(content_type):
+            return None
+        size = await storage.object_size_async(key)
+        if size > settings.max_image_bytes:
+            raise HTTPException(status_code=413, detail=f"Image too large (max {settings.max_image_bytes} bytes)")
+        dimensions = await image_processor.dimensions(await storage.read_range_async(key, 0, min(size, HEADER_BYTES)))
+        # A header beyond the first bytes is checked again by the renderer before decoding
+        if dimensions is not None and dimensions[0] * dimensions[1] > MAX_PIXELS:
+            raise HTTPException(status_code=400, detail=f"Image too large (max {MAX_PIXELS} pixels)")
+        return await MediaService.store_variants(key, await storage.get_object_async(key), storage)
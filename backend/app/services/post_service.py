@@ -1,24 +1,166 @@
 from fastapi import HTTPException, UploadFile
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterable, AsyncIterator, List, Optional, Dict, Any, Tuple
 from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.user_repository import UserRepository
+from backend.app.db.repositories.follow_repository import FollowRepository
+from backend.app.db.pagination import next_cursor
+from backend.app.core.config import get_settings
+from backend.app.infrastructure.cache import TTLCache
+from backend.app.services.feed_ranking import FeedRanker, RANK_FIELDS
 from backend.app.services.media_service import MediaService
 from datetime import datetime
+import asyncio
 import uuid
 
+settings = get_settings()
+
+# Posts per batched author and comment preview lookup while streaming
+STREAM_EMBED_BATCH = 500
+
+# Each reader's ranked post ids, so paging through a ranked feed reuses one scoring pass
+ranked_feed_cache = TTLCache(settings.rank_cache_size, settings.rank_cache_ttl_seconds)
+
 
 class PostService:
     """Service for post business logic"""
     
-    def __init__(self, post_repository: PostRepository):
+    def __init__(
+        self,
+        post_repository: PostRepository,
+        user_repository: Optional[UserRepository] = None,
+        like_counter=None,
+        timelines=None,
+        follow_repository: Optional[FollowRepository] = None
+    ):
         self.post_repo = post_repository
+        self.user_repo = user_repository
+        self.like_counter = like_counter
+        # TimelineService that fans new posts out to followers
+        self.timelines = timelines
+        # Author affinity for the ranked feed
+        self.follow_repo = follow_repository
+    
+    async def attach_authors(self, posts: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Embed an author summary in each post with a single batched lookup"""
+        if self.user_repo is None or not posts:
+            return posts
+        authors = await self.user_repo.get_author_summaries(post["author_id"] for post in posts)
+        for post in posts:
+            post["author"] = authors.get(post["author_id"])
+        return posts
+    
+    async def attach_comment_previews(self, posts: List[Dict[str, Any]], per_post: int) -> List[Dict[str, Any]]:
+        """Embed the latest comments of each post with a single batched aggregation"""
+        # The stored counter says which posts have nothing to fetch
+        post_ids = [post["_id"] for post in posts if post.get("comments", 1)]
+        previews = await self.post_repo.get_comment_previews(post_ids, per_post)
+        for post in posts:
+            post["latest_comments"] = previews.get(post["_id"], [])
+        return posts
+    
+    async def embed(self, posts: List[Dict[str, Any]], with_authors: bool, previews: int) -> List[Dict[str, Any]]:
+        """Embed authors and comment previews; the two lookups run concurrently"""
+        lookups = []
+        if with_authors:
+            lookups.append(self.attach_authors(posts))
+        if previews:
+            lookups.append(self.attach_comment_previews(posts, previews))
+        await asyncio.gather(*lookups)
+        return posts
+    
+    async def get_feed(
+        self,
+        limit: int = 100,
+        before: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None,
+        with_authors: bool = True,
+        previews: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of feed posts and the cursor for the next page, with up to `previews` latest comments per post"""
+        try:
+            posts = await self.post_repo.get_all(limit, before, projection)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await self.embed(posts, with_authors, previews), next_cursor(posts, limit)
+    
+    async def get_ranked_feed(
+        self,
+        viewer_id: Optional[str] = None,
+        limit: int = 100,
+        cursor: Optional[str] = None,
+        with_authors: bool = True,
+        previews: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        Get a page of the ranked feed for a reader and the cursor for the
+        next page. The newest RANK_CANDIDATES posts are scored in one batch
+        (see feed_ranking) and the ranking is cached per reader for
+        RANK_CACHE_TTL_SECONDS; the cursor is an offset into it.
+        """
+        try:
+            offset = int(cursor) if cursor else 0
+        except ValueError:
+            offset = -1
+        if offset < 0:
+            raise HTTPException(status_code=400, detail=f"Invalid cursor: {cursor}")
+        ranking = ranked_feed_cache.get(viewer_id)
+        if ranking is None:
+            ranking = await self.rank_candidates(viewer_id)
+            ranked_feed_cache.set(viewer_id, ranking)
+        page_ids = ranking[offset:offset + limit]
+        posts = await self.post_repo.get_many(page_ids)
+        page = [posts[post_id] for post_id in page_ids if post_id in posts]
+        next_page = str(offset + limit) if offset + limit < len(ranking) else None
+        return await self.embed(page, with_authors, previews), next_page
     
-    async def get_feed(self) -> List[Dict[str, Any]]:
-        """Get feed posts"""
-        return await self.post_repo.get_all()
+    async def rank_candidates(self, viewer_id: Optional[str]) -> List[str]:
+        """Post ids of the candidate window, best first for this reader"""
+        candidates = await self.post_repo.get_all(settings.rank_candidates, projection=RANK_FIELDS)
+        followed = set()
+        if viewer_id and self.follow_repo is not None:
+            followed = await self.follow_repo.get_followed_among(viewer_id, (post["author_id"] for post in candidates))
+        return FeedRanker.from_settings().rank(candidates, followed, datetime.utcnow())
     
-    async def get_user_posts(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get posts by user"""
-        return await self.post_repo.get_by_user_id(user_id)
+    def stream_feed(
+        self,
+        before: Optional[str] = None,
+        projection: Optional[Dict[str, int]] = None,
+        with_authors: bool = True,
+        previews: int = 0
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """The whole feed after `before`, newest first, as an async stream"""
+        try:
+            posts = self.post_repo.stream_all(before, projection)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        if not with_authors and not previews:
+            return posts
+        return self.stream_embedded(posts, with_authors, previews)
+    
+    async def stream_embedded(
+        self, posts: AsyncIterable[Dict[str, Any]], with_authors: bool, previews: int
+    ) -> AsyncIterator[Dict[str, Any]]:
+        """Embed authors and comment previews in a stream of posts, batched per STREAM_EMBED_BATCH posts"""
+        batch = []
+        async for post in posts:
+            batch.append(post)
+            if len(batch) >= STREAM_EMBED_BATCH:
+                for embedded in await self.embed(batch, with_authors, previews):
+                    yield embedded
+                batch = []
+        if batch:
+            for embedded in await self.embed(batch, with_authors, previews):
+                yield embedded
+    
+    async def get_user_posts(
+        self, user_id: str, limit: int = 100, before: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of posts by user and the cursor for the next page"""
+        try:
+            posts = await self.post_repo.get_by_user_id(user_id, limit, before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return await self.attach_authors(posts), next_cursor(posts, limit)
     
     async def create_post(
         self, 
@@ -29,9 +171,12 @@ class PostService:
         storage
     ) -> Dict[str, Any]:
         """Create new post"""
-        media_url = None
-        if file:
-            media_url = MediaService.upload_file(file, "posts", storage)
+        media_url = media_variants = None
+        if file and MediaService.is_image(file.content_type):
+            image = await MediaService.upload_image(file, "posts", storage)
+            media_url, media_variants = image["url"], image["variants"]
+        elif file:
+            media_url = await MediaService.upload_file(file, "posts", storage)
         
         post_id = str(uuid.uuid4())
         new_post = {
@@ -39,31 +184,44 @@ class PostService:
             "author_id": user_id,
             "content": content,
             "media_url": media_url,
+            "media_variants": media_variants,
             "type": type,
             "likes": 0,
-            "comments": 0
+            "comments": 0,
+            "created_at": datetime.utcnow().isoformat()
         }
         
-        return await self.post_repo.create(new_post)
+        post = await self.post_repo.create(new_post)
+        if self.timelines is not None:
+            await self.timelines.fan_out(post)
+        return post
     
     async def like_post(self, post_id: str) -> Dict[str, int]:
         """Like a post"""
-        likes_count = await self.post_repo.increment_likes(post_id)
+        if self.like_counter is not None:
+            likes_count = await self.like_counter.like(post_id)
+        else:
+            likes_count = await self.post_repo.increment_likes(post_id)
         if likes_count is None:
             raise HTTPException(status_code=404, detail="Post not found")
         return {"likes": likes_count}
     
-    async def get_comments(self, post_id: str) -> List[Dict[str, Any]]:
-        """Get comments for a post"""
-        return await self.post_repo.get_comments(post_id)
+    async def get_comments(
+        self, post_id: str, limit: int = 100, after: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Get a page of comments for a post, oldest first, and the cursor for the next page"""
+        try:
+            comments = await self.post_repo.get_comments(post_id, limit, after)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return comments, next_cursor(comments, limit)
+    
+    def stream_comments(self, post_id: str) -> AsyncIterator[Dict[str, Any]]:
+        """Every comment of a post, as an async stream"""
+        return self.post_repo.stream_comments(post_id)
     
     async def add_comment(self, post_id: str, author_id: str, content: str) -> Dict[str, Any]:
         """Add comment to a post"""
-        # Verify post exists
-        post = await self.post_repo.get_by_id(post_id)
-        if not post:
-            raise HTTPException(status_code=404, detail="Post not found")
-        
         new_comment = {
             "_id": str(uuid.uuid4()),
             "post_id": post_id,
@@ -72,10 +230,9 @@ class PostService:
             "created_at": datetime.utcnow().isoformat()
         }
         
-        # Create comment
-        comment = await self.post_repo.create_comment(new_comment)
-        
-        # Increment comment count on post
-        await self.post_repo.increment_comments(post_id)
+        # Increments the post's count (checking it exists), then inserts the comment
+        comment = await self.post_repo.add_comment(new_comment)
+        if comment is None:
+            raise HTTPException(status_code=404, detail="Post not found")
         
         return comment
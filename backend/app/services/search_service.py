@@ -0,0 +1,64 @@
+from fastapi import HTTPException
+from typing import Dict, Any, List, Optional
+from backend.app.db.repositories.user_repository import UserRepository
+from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.training_repository import TrainingRepository
+from backend.app.services.post_service import PostService
+from backend.app.core.fieldsets import projection_for
+from backend.app.schemas.user import UserSummary
+import asyncio
+
+SEARCH_TYPES = ("users", "posts", "videos")
+
+# User hits only carry the summary fields
+USER_HIT_FIELDS = projection_for(UserSummary, UserSummary.model_fields)
+
+
+class SearchService:
+    """
+    Service for full-text search across athletes, posts and training videos.
+    Each collection is searched through its text index (BM25 in in-memory
+    mode), and the result types are queried concurrently.
+    """
+    
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        post_repository: PostRepository,
+        training_repository: TrainingRepository
+    ):
+        self.user_repo = user_repository
+        self.post_repo = post_repository
+        self.training_repo = training_repository
+    
+    @staticmethod
+    def parse_types(types: Optional[str]) -> List[str]:
+        """Validate a comma-separated list of result types, defaulting to all of them"""
+        if not types:
+            return list(SEARCH_TYPES)
+        selected = [name.strip() for name in types.split(",") if name.strip()]
+        unknown = [name for name in selected if name not in SEARCH_TYPES]
+        if unknown or not selected:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown search type(s): {', '.join(unknown)}. Allowed: {', '.join(SEARCH_TYPES)}"
+            )
+        return selected
+    
+    async def search(self, query: str, types: List[str], limit: int = 20) -> Dict[str, Any]:
+        """Search the requested types, each ranked best match first"""
+        query = query.strip()
+        if not query:
+            raise HTTPException(status_code=400, detail="Search query must not be empty")
+        searches = {
+            "users": lambda: self.user_repo.search(query, limit, USER_HIT_FIELDS),
+            "posts": lambda: self.search_posts(query, limit),
+            "videos": lambda: self.training_repo.search(query, limit),
+        }
+        results = await asyncio.gather(*(searches[name]() for name in types))
+        return {"query": query, **dict(zip(types, results))}
+    
+    async def search_posts(self, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Matching posts with their author summaries embedded"""
+        posts = await self.post_repo.search(query, limit)
+        return await PostService(self.post_repo, self.user_repo).attach_authors(posts)
@@ -0,0 +1,179 @@
+from fastapi import HTTPException
+from typing import Dict, Any, List, Optional, Tuple
+from backend.app.core.config import get_settings
+from backend.app.db.pagination import encode_cursor, next_cursor
+from backend.app.db.repositories.follow_repository import FollowRepository, TimelineRepository
+from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.user_repository import UserRepository, get_user_repository
+from backend.app.services.post_service import PostService
+from backend.app.services.job_worker import PermanentJobError
+import asyncio
+
+settings = get_settings()
+
+# Timeline entries written per insert_many during fan-out
+FANOUT_BATCH = 1000
+
+TIMELINE_FANOUT_JOB = "timeline_fanout"
+
+
+class TimelineService:
+    """
+    Service for the follow graph and home timelines.
+    
+    Timelines are fanned out on write: a new post is copied, as a small
+    entry, onto the timeline of every follower of its author, so reading a
+    page is one range read on (owner_id, created_at). Accounts with
+    CELEBRITY_FOLLOWER_THRESHOLD followers, or flagged `celebrity`, are the
+    exception: their posts are not fanned out but pulled with one bounded
+    query when a follower reads, and merged with the materialized entries.
+    An account stays on the pull path once it has crossed the threshold.
+    The copies for followers are written by a background job, so creating
+    a post does not wait on them.
+    """
+    
+    def __init__(
+        self,
+        follow_repository: FollowRepository,
+        timeline_repository: TimelineRepository,
+        post_repository: PostRepository,
+        user_repository: UserRepository,
+        jobs=None
+    ):
+        self.follow_repo = follow_repository
+        self.timeline_repo = timeline_repository
+        self.post_repo = post_repository
+        self.user_repo = user_repository
+        self.jobs = jobs
+    
+    async def follow(self, follower_id: str, followee_id: str) -> Dict[str, Any]:
+        """Follow an account and copy its recent posts onto the follower's timeline"""
+        if follower_id == followee_id:
+            raise HTTPException(status_code=400, detail="Users cannot follow themselves")
+        follower, followee = await asyncio.gather(
+            self.user_repo.get_by_id(follower_id, {"_id": 1}),
+            self.user_repo.get_by_id(followee_id, {"celebrity": 1, "followers_count": 1})
+        )
+        if not follower or not followee:
+            raise HTTPException(status_code=404, detail="User not found")
+        celebrity = bool(followee.get("celebrity"))
+        count = followee.get("followers_count", 0)
+        if await self.follow_repo.follow(follower_id, followee_id, celebrity):
+            count = await self.user_repo.adjust_follow_counts(follower_id, followee_id, 1) or 0
+            if not celebrity and count >= settings.celebrity_follower_threshold:
+                await asyncio.gather(
+                    self.user_repo.update(followee_id, {"celebrity": True}),
+                    self.follow_repo.mark_celebrity(followee_id)
+                )
+            elif not celebrity and settings.timeline_backfill_posts:
+                recent = await self.post_repo.get_by_user_id(followee_id, settings.timeline_backfill_posts)
+                await self.timeline_repo.add_posts(follower_id, recent)
+        return {"follower_id": follower_id, "followee_id": followee_id, "following": True, "followers_count": count}
+    
+    async def unfollow(self, follower_id: str, followee_id: str) -> Dict[str, Any]:
+        """Unfollow an account and take its posts off the follower's timeline"""
+        count = None
+        if await self.follow_repo.unfollow(follower_id, followee_id):
+            count, _ = await asyncio.gather(
+                self.user_repo.adjust_follow_counts(follower_id, followee_id, -1),
+                self.timeline_repo.remove_author(follower_id, followee_id)
+            )
+        else:
+            followee = await self.user_repo.get_by_id(followee_id, {"followers_count": 1})
+            if not followee:
+                raise HTTPException(status_code=404, detail="User not found")
+            count = followee.get("followers_count", 0)
+        return {"follower_id": follower_id, "followee_id": followee_id, "following": False, "followers_count": count or 0}
+    
+    async def get_followers(
+        self, user_id: str, limit: int = 100, before: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """A page of a user's followers and the cursor for the next page"""
+        try:
+            edges = await self.follow_repo.get_followers(user_id, limit, before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return edges, next_cursor(edges, limit)
+    
+    async def get_following(
+        self, user_id: str, limit: int = 100, before: Optional[str] = None
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """A page of the accounts a user follows and the cursor for the next page"""
+        try:
+            edges = await self.follow_repo.get_following(user_id, limit, before)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        return edges, next_cursor(edges, limit)
+    
+    async def fan_out(self, post: Dict[str, Any]) -> int:
+        """
+        Put a new post on its author's timeline, and queue the job that puts
+        it on every follower's (done inline without a job worker)
+        """
+        written = await self.timeline_repo.add_post([post["author_id"]], post)
+        if self.jobs is None:
+            return written + await self.fan_out_to_followers(post)
+        await self.jobs.enqueue(TIMELINE_FANOUT_JOB, {"post_id": post["_id"]}, f"{TIMELINE_FANOUT_JOB}:{post['_id']}")
+        return written
+    
+    async def fan_out_post(self, post_id: str) -> int:
+        """Job body: fan a stored post out to its author's followers"""
+        post = await self.post_repo.get_by_id(post_id)
+        if post is None:
+            raise PermanentJobError(f"Post {post_id} no longer exists")
+        return await self.fan_out_to_followers(post)
+    
+    async def fan_out_to_followers(self, post: Dict[str, Any]) -> int:
+        """Put a post on every follower's timeline, unless its author is on the pull path; safe to repeat"""
+        author_id = post["author_id"]
+        author = await self.user_repo.get_by_id(author_id, {"celebrity": 1, "followers_count": 1})
+        if author and (author.get("celebrity") or author.get("followers_count", 0) >= settings.celebrity_follower_threshold):
+            return 0
+        written = 0
+        batch = []
+        async for edge in self.follow_repo.stream_follower_ids(author_id):
+            batch.append(edge["follower_id"])
+            if len(batch) >= FANOUT_BATCH:
+                written += await self.timeline_repo.add_post(batch, post)
+                batch = []
+        written += await self.timeline_repo.add_post(batch, post)
+        return written
+    
+    async def get_home_timeline(
+        self, user_id: str, limit: int = 100, before: Optional[str] = None, previews: int = 0
+    ) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """
+        A page of a user's home timeline, newest first, and the cursor for
+        the next page. The materialized entries and the posts of followed
+        pull-path accounts are read concurrently and merged.
+        """
+        try:
+            entries, celebrities = await asyncio.gather(
+                self.timeline_repo.get_page(user_id, limit, before),
+                self.follow_repo.get_celebrity_followees(user_id)
+            )
+            pulled = await self.post_repo.get_by_authors(celebrities, limit, before) if celebrities else []
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+        
+        # Merge on the shared (created_at, post id) key; entries from before an
+        # account went on the pull path may duplicate pulled posts
+        keys = {entry["post_id"]: entry.get("created_at") for entry in entries}
+        keys.update((post["_id"], post.get("created_at")) for post in pulled)
+        # Timestamp-less legacy posts sort last, as in before_filter
+        page = sorted(keys.items(), key=lambda item: (item[1] is not None, item[1] or "", item[0]), reverse=True)[:limit]
+        cursor = encode_cursor({"_id": page[-1][0], "created_at": page[-1][1]}) if len(page) == limit else None
+        
+        posts = {post["_id"]: post for post in pulled}
+        missing = [post_id for post_id, _ in page if post_id not in posts]
+        posts.update(await self.post_repo.get_many(missing))
+        timeline = [posts[post_id] for post_id, _ in page if post_id in posts]
+        await PostService(self.post_repo, self.user_repo).embed(timeline, True, previews)
+        return timeline, cursor
+
+
+def get_timeline_service(db, jobs=None) -> TimelineService:
+    """A TimelineService over one database handle"""
+    return TimelineService(
+        FollowRepository(db), TimelineRepository(db), PostRepository(db), get_user_repository(db), jobs=jobs
+    )
@@ -2,19 +2,52 @@ from fastapi import HTTPException, UploadFile
 from typing import List, Optional, Dict, Any
 from backend.app.db.repositories.training_repository import TrainingRepository, OpportunityRepository
 from backend.app.services.media_service import MediaService
+from backend.app.services.job_worker import PermanentJobError
+from backend.app.infrastructure.video_metadata import probe, format_duration, UnsupportedContainer
+from datetime import datetime
+import asyncio
 import uuid
 import re
 
+VIDEO_METADATA_JOB = "video_metadata"
+
 
 class TrainingService:
     """Service for training video business logic"""
     
-    def __init__(self, training_repository: TrainingRepository):
+    def __init__(self, training_repository: TrainingRepository, jobs=None, view_counter=None):
         self.training_repo = training_repository
+        self.jobs = jobs
+        self.view_counter = view_counter
+    
+    async def get_training_videos(
+        self,
+        limit: int = 100,
+        category: Optional[str] = None,
+        author: Optional[str] = None,
+        sort: str = "latest"
+    ) -> List[Dict[str, Any]]:
+        """Get training videos, optionally filtered by category and author"""
+        return await self.training_repo.get_all(limit, self.normalize_category(category), author, sort)
+    
+    async def get_facets(self) -> Dict[str, Any]:
+        """Video counts per category"""
+        return {"categories": await self.training_repo.get_category_facets()}
+    
+    async def record_view(self, video_id: str) -> None:
+        """Count a view; it is written with the next batched flush"""
+        if not await self.view_counter.record(video_id):
+            raise HTTPException(status_code=404, detail="Training video not found")
+    
+    @staticmethod
+    def normalize_category(category: Optional[str]) -> Optional[str]:
+        return category.strip().lower() if category and category.strip() else None
     
-    async def get_training_videos(self) -> List[Dict[str, Any]]:
-        """Get all training videos"""
-        return await self.training_repo.get_all()
+    @staticmethod
+    def normalize_categories(categories: Optional[List[str]]) -> List[str]:
+        """Lowercased, de-duplicated categories in their given order"""
+        normalized = (TrainingService.normalize_category(category) for category in categories or [])
+        return list(dict.fromkeys(category for category in normalized if category))
     
     async def create_training_video(
         self,
@@ -24,7 +57,8 @@ class TrainingService:
         type: str,
         video_url: Optional[str],
         file: Optional[UploadFile],
-        storage
+        storage,
+        categories: Optional[List[str]] = None
     ) -> Dict[str, Any]:
         """Create new training video"""
         final_video_url = video_url
@@ -33,7 +67,7 @@ class TrainingService:
         if type == 'file':
             if not file:
                 raise HTTPException(status_code=400, detail="File is required for file upload type")
-            final_video_url = MediaService.upload_file(file, "training", storage)
+            final_video_url = await MediaService.upload_file(file, "training", storage)
             thumbnail_url = None
         
         elif type == 'link':
@@ -56,11 +90,45 @@ class TrainingService:
             "thumbnail_url": thumbnail_url,
             "duration": "00:00",
             "views": "0",
+            "view_count": 0,
+            "created_at": datetime.utcnow().isoformat(),
             "type": type,
+            "categories": self.normalize_categories(categories),
             "analysis": None
         }
         
-        return await self.training_repo.create(new_video)
+        video = await self.training_repo.create(new_video)
+        if type == 'file':
+            await self.schedule_metadata(self.jobs, video_id, final_video_url, storage)
+        return video
+    
+    @staticmethod
+    async def schedule_metadata(jobs, video_id: str, video_url: str, storage) -> Optional[str]:
+        """Queue duration/resolution extraction for an uploaded video; returns the job id"""
+        key = storage.key_for_url(video_url)
+        if jobs is None or key is None:
+            return None
+        job_id = f"{VIDEO_METADATA_JOB}:{video_id}"
+        await jobs.enqueue(VIDEO_METADATA_JOB, {"video_id": video_id, "key": key}, job_id)
+        return job_id
+    
+    async def extract_metadata(self, video_id: str, key: str, storage) -> Dict[str, Any]:
+        """Read a stored video's container headers and record its duration and resolution"""
+        def probe_stored():
+            return probe(lambda start, length: storage.read_range(key, start, length), storage.object_size(key))
+        
+        try:
+            metadata = await asyncio.get_running_loop().run_in_executor(None, probe_stored)
+        except UnsupportedContainer as e:
+            raise PermanentJobError(str(e)) from e
+        
+        update = {"width": metadata["width"], "height": metadata["height"]}
+        if metadata["duration"] is not None:
+            update["duration"] = format_duration(metadata["duration"])
+            update["duration_seconds"] = round(metadata["duration"], 3)
+        if not await self.training_repo.update_metadata(video_id, update):
+            raise PermanentJobError(f"Training video {video_id} no longer exists")
+        return metadata
     
     @staticmethod
     def extract_youtube_id(url: str) -> Optional[str]:
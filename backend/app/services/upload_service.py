@@ -0,0 +1,96 @@
+from fastapi import HTTPException
+from typing import Dict, Any
+from backend.app.db.repositories.user_repository import UserRepository
+from backend.app.db.repositories.post_repository import PostRepository
+from backend.app.db.repositories.training_repository import TrainingRepository
+from backend.app.services.media_service import MediaService
+from backend.app.services.training_service import TrainingService
+import uuid
+import os
+
+
+class UploadService:
+    """
+    Service for direct-to-storage uploads.
+    
+    The client asks for a presigned URL, uploads the bytes straight to
+    storage, then calls complete() so the public URL is recorded on the
+    owning document. The API only ever handles small JSON.
+    """
+    
+    def __init__(
+        self,
+        user_repository: UserRepository,
+        post_repository: PostRepository,
+        training_repository: TrainingRepository,
+        jobs=None
+    ):
+        self.user_repo = user_repository
+        self.post_repo = post_repository
+        self.training_repo = training_repository
+        self.jobs = jobs
+    
+    @staticmethod
+    def key_prefix(target: str, owner_id: str) -> str:
+        """Object key prefix that uploads for an owner must use"""
+        if target == "profile":
+            return f"profiles/{owner_id}_profile"
+        if target == "cover":
+            return f"covers/{owner_id}_cover"
+        if target == "post":
+            return f"posts/{owner_id}/"
+        return f"training/{owner_id}/"
+    
+    async def _owner_exists(self, target: str, owner_id: str) -> bool:
+        if target in ("profile", "cover"):
+            return await self.user_repo.get_by_id(owner_id) is not None
+        if target == "post":
+            return await self.post_repo.get_by_id(owner_id) is not None
+        return await self.training_repo.get_by_id(owner_id) is not None
+    
+    async def presign(
+        self, target: str, owner_id: str, filename: str, content_type: str, method: str, storage
+    ) -> Dict[str, Any]:
+        """Issue a presigned upload for an owner's media"""
+        MediaService.validate_content_type(content_type)
+        if not await self._owner_exists(target, owner_id):
+            raise HTTPException(status_code=404, detail=f"{target.capitalize()} owner not found")
+        
+        file_extension = os.path.splitext(filename)[1]
+        prefix = self.key_prefix(target, owner_id)
+        # Profile and cover keep a consistent name so new uploads overwrite old ones
+        if target in ("profile", "cover"):
+            key = f"{prefix}{file_extension}"
+        else:
+            key = f"{prefix}{uuid.uuid4()}{file_extension}"
+        
+        return {"key": key, **storage.presign_upload(key, content_type, method)}
+    
+    async def complete(self, target: str, owner_id: str, key: str, storage) -> Dict[str, str]:
+        """Record the URL of a finished direct upload on its owner"""
+        prefix = self.key_prefix(target, owner_id)
+        remainder = key[len(prefix):]
+        if not key.startswith(prefix) or "/" in remainder or ".." in key:
+            raise HTTPException(status_code=400, detail="Key does not belong to this upload target")
+        if not await storage.object_exists_async(key):
+            raise HTTPException(status_code=409, detail="Upload has not reached storage")
+        
+        url = storage.public_url(key)
+        variants = None
+        if target in ("profile", "cover", "post"):
+            # The bytes never passed through the API, so variants are rendered from storage
+            variants = await MediaService.variants_for_stored(key, storage)
+        if target == "profile":
+            updated = await self.user_repo.update_profile_image(owner_id, url, variants) is not None
+        elif target == "cover":
+            updated = await self.user_repo.update_cover_image(owner_id, url, variants) is not None
+        elif target == "post":
+            updated = await self.post_repo.update_media_url(owner_id, url, variants)
+        else:
+            updated = await self.training_repo.update_video_url(owner_id, url)
+        if not updated:
+            raise HTTPException(status_code=404, detail=f"{target.capitalize()} owner not found")
+        if target == "training":
+            await TrainingService.schedule_metadata(self.jobs, owner_id, url, storage)
+        
+        return {"message": "Upload completed", "url": url, "variants": variants}
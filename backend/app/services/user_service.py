@@ -1,5 +1,5 @@
 from fastapi import HTTPException, UploadFile
-from typing import List, Optional, Dict, Any
+from typing import AsyncIterator, List, Optional, Dict, Any
 from backend.app.db.repositories.user_repository import UserRepository
 from backend.app.services.media_service import MediaService
 import uuid
@@ -12,20 +12,28 @@ class UserService:
     def __init__(self, user_repository: UserRepository):
         self.user_repo = user_repository
     
-    async def get_users(self) -> List[Dict[str, Any]]:
+    async def get_users(self, projection: Optional[Dict[str, int]] = None) -> List[Dict[str, Any]]:
         """Get all users"""
-        return await self.user_repo.get_all()
+        return await self.user_repo.get_all(projection=projection)
     
-    async def get_user(self, user_id: str) -> Dict[str, Any]:
+    def stream_users(self, projection: Optional[Dict[str, int]] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Every user, as an async stream"""
+        return self.user_repo.stream_all(projection)
+    
+    async def suggest_users(self, prefix: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Typeahead suggestions for a name or academy prefix"""
+        return await self.user_repo.suggest(prefix, limit)
+    
+    async def get_user(self, user_id: str, projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Get user by ID"""
-        user = await self.user_repo.get_by_id(user_id)
+        user = await self.user_repo.get_by_id(user_id, projection)
         if not user:
             raise HTTPException(status_code=404, detail="User not found")
         return user
     
-    async def get_profile(self, user_id: str) -> Dict[str, Any]:
+    async def get_profile(self, user_id: str, projection: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
         """Get user profile"""
-        user = await self.user_repo.get_by_id(user_id)
+        user = await self.user_repo.get_by_id(user_id, projection)
         if not user:
             raise HTTPException(status_code=404, detail="Profile not found")
         return user
@@ -60,8 +68,8 @@ class UserService:
             raise HTTPException(status_code=404, detail="Profile not found")
         return updated_user
     
-    async def upload_profile_image(self, user_id: str, file: UploadFile, storage) -> Dict[str, str]:
-        """Upload profile image"""
+    async def upload_profile_image(self, user_id: str, file: UploadFile, storage) -> Dict[str, Any]:
+        """Upload profile image with its resized variants"""
         # Verify user exists
         user = await self.user_repo.get_by_id(user_id)
         print(f"IN upload_profile_image: {user_id}, user: {user}")
@@ -73,16 +81,17 @@ class UserService:
         custom_filename = f"{user_id}_profile{file_extension}"
         
         # Upload to S3
-        image_url = MediaService.upload_with_custom_filename(file, "profiles", custom_filename, storage)
+        image = await MediaService.upload_image(file, "profiles", storage, custom_filename)
+        image_url = image["url"]
         print(f"IN upload_profile_image: image_url: {image_url}")
         
         # Update DB
-        await self.user_repo.update_profile_image(user_id, image_url)
+        await self.user_repo.update_profile_image(user_id, image_url, image["variants"])
         
-        return {"message": "Profile image uploaded", "image_url": image_url}
+        return {"message": "Profile image uploaded", "image_url": image_url, "variants": image["variants"]}
     
-    async def upload_cover_image(self, user_id: str, file: UploadFile, storage) -> Dict[str, str]:
-        """Upload cover image"""
+    async def upload_cover_image(self, user_id: str, file: UploadFile, storage) -> Dict[str, Any]:
+        """Upload cover image with its resized variants"""
         # Verify user exists
         user = await self.user_repo.get_by_id(user_id)
         if not user:
@@ -93,9 +102,10 @@ class UserService:
         custom_filename = f"{user_id}_cover{file_extension}"
         
         # Upload to S3
-        image_url = MediaService.upload_with_custom_filename(file, "covers", custom_filename, storage)
+        image = await MediaService.upload_image(file, "covers", storage, custom_filename)
+        image_url = image["url"]
         
         # Update DB
-        await self.user_repo.update_cover_image(user_id, image_url)
+        await self.user_repo.update_cover_image(user_id, image_url, image["variants"])
         
-        return {"message": "Cover image uploaded", "image_url": image_url}
+        return {"message": "Cover image uploaded", "image_url": image_url, "variants": image["variants"]}
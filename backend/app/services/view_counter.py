@@ -0,0 +1,89 @@
+"""
+Write-coalescing training video view counter.
+
+Views are counted in memory and acknowledged at once; a background task
+flushes the accumulated per-video deltas every VIEW_FLUSH_INTERVAL_MS in
+one unordered bulk $inc, so a popular video costs one write per interval
+instead of one per play. Counts are not read back on the request path,
+which keeps it write-only. Only views of existing videos are counted:
+ids already checked are remembered in a TTL cache, so an unknown id costs
+one read and cannot grow the buffer.
+"""
+from typing import Callable, Dict, Optional
+from backend.app.core.config import get_settings
+from backend.app.db.mongodb import db
+from backend.app.db.repositories.training_repository import TrainingRepository
+from backend.app.infrastructure.cache import TTLCache
+import asyncio
+
+settings = get_settings()
+
+
+class ViewCounter:
+    """In-process view buffer with periodic batched flushes"""
+
+    def __init__(
+        self,
+        repository_factory: Callable[[], TrainingRepository],
+        flush_interval_ms: int = 1000,
+        known: Optional[TTLCache] = None
+    ):
+        self.repository_factory = repository_factory
+        self.flush_interval = flush_interval_ms / 1000
+        self.pending: Dict[str, int] = {}
+        # video id -> True for videos known to exist
+        self.known = known if known is not None else TTLCache()
+        self.lock = asyncio.Lock()
+        self.task: Optional[asyncio.Task] = None
+
+    def add(self, video_id: str, count: int = 1) -> None:
+        self.pending[video_id] = self.pending.get(video_id, 0) + count
+
+    async def record(self, video_id: str) -> bool:
+        """Count a view of an existing video; False, counting nothing, if there is no such video"""
+        if video_id not in self.pending and not self.known.get(video_id):
+            if not await self.repository_factory().exists(video_id):
+                return False
+            self.known.set(video_id, True)
+        self.add(video_id)
+        return True
+
+    async def flush(self) -> None:
+        """Write all pending deltas in one bulk write"""
+        async with self.lock:
+            if not self.pending:
+                return
+            flushing, self.pending = self.pending, {}
+            try:
+                await self.repository_factory().apply_view_deltas(flushing)
+            except Exception as e:
+                print(f"✗ View flush failed, will retry: {e}")
+                for video_id, delta in flushing.items():
+                    self.add(video_id, delta)
+
+    async def run(self) -> None:
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def drain(self) -> None:
+        """Stop the flush loop and write whatever is still pending"""
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        await self.flush()
+
+
+view_counter = ViewCounter(
+    lambda: TrainingRepository(db.get_db()),
+    flush_interval_ms=settings.view_flush_interval_ms,
+    known=TTLCache(settings.view_known_cache_size, settings.view_known_cache_ttl_seconds)
+)
@@ -0,0 +1,114 @@
+"""
+Measure cold start: module import cost and time to first response.
+
+    python -m backend.benchmarks.cold_start [--runs 5] [--port 8765] [--write]
+
+Import cost comes from `python -X importtime -c "import backend.app.main"`,
+summarized by top-level package and by the slowest individual modules.
+Time to first response starts a fresh uvicorn process per run and polls
+/health and then /feed until each answers, timing from process launch.
+Run with the environment the service boots with (MONGODB_URL etc.).
+--write saves the report to backend/benchmarks/cold_start_report.md, which
+is tracked so regressions show up in review.
+"""
+from typing import Dict, List, Tuple
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+REPORT_PATH = os.path.join(os.path.dirname(__file__), "cold_start_report.md")
+
+
+def import_profile() -> List[Tuple[str, int, int, int]]:
+    """(module, self us, cumulative us, nesting depth) for each import of the app"""
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import backend.app.main"],
+        capture_output=True, text=True, check=True
+    )
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def summarize_imports(rows: List[Tuple[str, int, int, int]], top: int = 15) -> List[str]:
+    by_package: Dict[str, int] = {}
+    for name, self_us, _, _ in rows:
+        package = name.split(".")[0]
+        by_package[package] = by_package.get(package, 0) + self_us
+    total = next((cumulative for name, _, cumulative, _ in rows if name == "backend.app.main"), 0)
+    lines = [f"Total import of backend.app.main: {total / 1000:.0f} ms", "", "| package | self time (ms) |", "|---|---:|"]
+    for package, self_us in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"| {package} | {self_us / 1000:.1f} |")
+    lines += ["", "| slowest modules | self (ms) | cumulative (ms) |", "|---|---:|---:|"]
+    for name, self_us, cumulative_us, _ in sorted(rows, key=lambda row: -row[1])[:top]:
+        lines.append(f"| {name} | {self_us / 1000:.1f} | {cumulative_us / 1000:.1f} |")
+    return lines
+
+
+def wait_for(url: str, deadline: float) -> float:
+    """Poll url until it answers 200; returns the time it did"""
+    while time.monotonic() < deadline:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                if response.status == 200:
+                    return time.monotonic()
+        except OSError:
+            pass
+        time.sleep(0.005)
+    raise TimeoutError(f"{url} did not answer in time")
+
+
+def first_response(port: int) -> Tuple[float, float]:
+    """Seconds from process launch to the first /health and the first /feed response"""
+    started = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "backend.app.main:app", "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        health = wait_for(f"http://127.0.0.1:{port}/health", started + 60)
+        feed = wait_for(f"http://127.0.0.1:{port}/feed", started + 60)
+        return health - started, feed - started
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--write", action="store_true", help=f"save the report to {REPORT_PATH}")
+    args = parser.parse_args()
+
+    lines = ["# Cold start report", "", "Generated by `python -m backend.benchmarks.cold_start --write`.", ""]
+    lines += ["## Imports", ""] + summarize_imports(import_profile())
+
+    timings = [first_response(args.port) for _ in range(args.runs)]
+    health = statistics.median(t[0] for t in timings) * 1000
+    feed = statistics.median(t[1] for t in timings) * 1000
+    lines += [
+        "", "## Time to first response", "",
+        f"Median of {args.runs} fresh uvicorn processes, from launch:", "",
+        f"- first /health: {health:.0f} ms",
+        f"- first /feed: {feed:.0f} ms",
+    ]
+
+    report = "\n".join(lines) + "\n"
+    print(report)
+    if args.write:
+        with open(REPORT_PATH, "w") as out:
+            out.write(report)
+
+
+if __name__ == "__main__":
+    main()
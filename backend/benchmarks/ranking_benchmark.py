@@ -0,0 +1,84 @@
+"""
+Time the ranked feed's scoring pass.
+
+    python -m backend.benchmarks.ranking_benchmark [--candidates 10000] [--rounds 50]
+
+Builds candidate posts shaped like the RANK_FIELDS projection the feed
+reads, then reports the mean and p95 time of FeedRanker.rank (feature
+extraction, scoring and ordering) and of the vectorized scoring step alone,
+next to a pure-Python loop computing the same scores as a reference.
+"""
+from datetime import datetime, timedelta
+from typing import Callable, List
+import argparse
+import math
+import random
+import statistics
+import time
+from backend.app.services.feed_ranking import FeedRanker
+
+
+def make_candidates(count: int, now: datetime) -> List[dict]:
+    """Newest-first candidates spread over a week, with skewed engagement"""
+    rng = random.Random(7)
+    return [
+        {
+            "_id": f"post-{i}",
+            "author_id": f"user-{rng.randrange(count // 10 or 1)}",
+            "likes": int(rng.paretovariate(1.2)) - 1,
+            "comments": int(rng.paretovariate(1.5)) - 1,
+            "created_at": (now - timedelta(seconds=i * 604800 / count)).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn: Callable[[], object], rounds: int) -> List[float]:
+    """Milliseconds per call, one sample per round"""
+    fn()
+    samples = []
+    for _ in range(rounds):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def report(name: str, samples: List[float]) -> None:
+    p95 = sorted(samples)[int(len(samples) * 0.95) - 1]
+    print(f"  {name:<32} mean {statistics.mean(samples):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--candidates", type=int, default=10000)
+    parser.add_argument("--rounds", type=int, default=50)
+    args = parser.parse_args()
+
+    now = datetime.utcnow()
+    candidates = make_candidates(args.candidates, now)
+    followed = {f"user-{i}" for i in range(0, args.candidates // 10, 7)}
+    ranker = FeedRanker()
+    features = ranker.features(candidates, followed, now)
+
+    def python_rank():
+        def score(post):
+            age = (now - datetime.fromisoformat(post["created_at"])).total_seconds() / 3600
+            engagement = (1 + ranker.likes_weight * math.log1p(post["likes"])
+                          + ranker.comments_weight * math.log1p(post["comments"])
+                          + ranker.affinity_weight * (post["author_id"] in followed))
+            return engagement * 2 ** (-max(age, 0) / ranker.half_life_hours)
+        return [post["_id"] for post in sorted(candidates, key=score, reverse=True)]
+
+    ranked = ranker.rank(candidates, followed, now)
+    assert ranked[:100] == python_rank()[:100], "vectorized ranking differs from the reference"
+
+    print(f"{args.candidates} candidates, {args.rounds} rounds")
+    report("FeedRanker.rank (end to end)", timed(lambda: ranker.rank(candidates, followed, now), args.rounds))
+    report("features only", timed(lambda: ranker.features(candidates, followed, now), args.rounds))
+    report("scores only", timed(lambda: ranker.scores(*features), args.rounds))
+    report("pure Python reference", timed(python_rank, max(args.rounds // 5, 3)))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Compare list serialization paths on a 1000-user payload.
+
+    python -m backend.benchmarks.serialization_benchmark [--users 1000] [--rounds 30]
+
+Measures FastAPI's response_model path (validate, dump to Python, json.dumps)
+against the validated TypeAdapter and trusted orjson paths in
+backend.app.core.serialization, and checks that all three produce the same
+bytes.
+"""
+from typing import List
+import argparse
+import asyncio
+import time
+import orjson
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_model_field
+from backend.app.schemas.user import User
+from backend.app.core.serialization import list_adapter, projector
+
+
+def make_users(count: int) -> List[dict]:
+    """Users shaped like the seeded profile, with skills and experience"""
+    return [
+        {
+            "_id": f"user-{i}",
+            "name": f"Athlete {i}",
+            "role": "athlete",
+            "sport": "Badminton",
+            "headline": "National team player | Brand ambassador | Coach",
+            "bio": "Professional badminton player with over 20 years of experience. " * 5,
+            "location": "Kuala Lumpur, Malaysia",
+            "category": "Singles",
+            "profile_image": f"https://cdn.example.com/profiles/user-{i}.jpg",
+            "cover_image": f"https://cdn.example.com/covers/user-{i}.jpg",
+            "age": 20 + i % 20,
+            "weight": "60 kg",
+            "height": "172 cm",
+            "playing_hand": "Right",
+            "years_of_experience": i % 25,
+            "age_category": "Senior",
+            "academy": "Bukit Jalil Sports School",
+            "skills": [{"name": name, "endorsements": i * 7 % 1500}
+                       for name in ("Smash", "Net Play", "Defense", "Footwork")],
+            "experience": [
+                {"role": "National Team Player", "org": "Badminton Association",
+                 "years": "2000 - 2019", "description": "Represented the country in 4 Olympic Games."},
+                {"role": "Brand Ambassador", "org": "Yonex",
+                 "years": "2005 - Present", "description": "Global ambassador for badminton equipment."},
+            ],
+        }
+        for i in range(count)
+    ]
+
+
+def timed(fn, rounds: int) -> float:
+    """Mean milliseconds per call"""
+    fn()
+    start = time.perf_counter()
+    for _ in range(rounds):
+        fn()
+    return (time.perf_counter() - start) / rounds * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=30)
+    args = parser.parse_args()
+
+    users = make_users(args.users)
+    field = create_model_field(name="Response_get_users", type_=List[User], mode="serialization")
+    loop = asyncio.new_event_loop()
+
+    def response_model_path() -> bytes:
+        content = loop.run_until_complete(
+            serialize_response(field=field, response_content=users, is_coroutine=True)
+        )
+        return JSONResponse(content).body
+
+    adapter = list_adapter(User)
+
+    def validated_path() -> bytes:
+        return adapter.dump_json(adapter.validate_python(users), by_alias=True)
+
+    project = projector(User)
+
+    def trusted_path() -> bytes:
+        return orjson.dumps([project(user) for user in users], default=str)
+
+    baseline = response_model_path()
+    assert validated_path() == baseline, "validated output differs from response_model output"
+    assert trusted_path() == baseline, "trusted output differs from response_model output"
+
+    print(f"{args.users} users, {len(baseline) / 1024:.0f} KiB payload, {args.rounds} rounds")
+    reference = timed(response_model_path, args.rounds)
+    print(f"  response_model + JSONResponse  {reference:8.2f} ms")
+    for name, fn in (("TypeAdapter.dump_json", validated_path), ("trusted projection + orjson", trusted_path)):
+        ms = timed(fn, args.rounds)
+        print(f"  {name:<30} {ms:8.2f} ms  ({reference / ms:.1f}x)")
+    loop.close()
+
+
+if __name__ == "__main__":
+    main()